@@ -0,0 +1,336 @@
+"""
+Headless HTTP API over the generation pipeline.
+
+CI can call the same pipeline as the Streamlit form without a browser
+session or UI reruns:
+
+    POST /v1/generate   {"code": "def test_login(page): ...", "api": "sync", ...}
+    GET  /v1/health
+    GET  /v1/stats
+
+At most `max_concurrent` generations run at once and up to `max_queue`
+more wait for a slot; anything beyond that is answered 429 with a
+Retry-After header, so a CI burst queues instead of piling onto the Groq
+rate limit. Every response is JSON; errors are {"error": "..."}.
+
+The dedup index is shared with the Streamlit app when both point at the
+same --dedup-index file: each syncs it before and after flagging a batch,
+so both see the other's test cases and neither overwrites them.
+
+    GROQ_API_KEY=... python api_server.py --port 8080 --max-concurrent 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import pipeline
+from codegen_input import strip_codegen_noise
+from codegen_optimizer import codegen_diff, optimize_codegen
+from model_router import FAST_MODEL, ModelRouter, routing_decisions
+from page_anchors import DEFAULT_VALIDATION_SCOPE
+from step_timing import calibrate_timeouts, load_slow_steps
+from testcase_dedup import DEFAULT_INDEX_PATH, DedupIndex
+from testcase_store import DEFAULT_STORE_PATH, TestCaseStore, function_hash
+from tracing import span, trace
+
+
+@dataclass
+class ApiConfig:
+    max_concurrent: int = 8
+    max_queue: int = 32
+    timeout_s: float = 600.0
+    max_body_bytes: int = 2_000_000
+    store_path: str = DEFAULT_STORE_PATH
+    dedup_index_path: str = DEFAULT_INDEX_PATH
+    trace_dir: str = None    # write a Chrome trace per request when set
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+# Request field -> (type, default); null means the default
+GENERATE_FIELDS = {
+    "code": (str, None),
+    "api": (str, "sync"),
+    "pacing": (str, "adaptive"),
+    "validation_scope": (str, DEFAULT_VALIDATION_SCOPE),
+    "step_timeouts": (dict, None),
+    "slow_steps": ((dict, list), None),
+    "optimize": (bool, False),
+    "test_cases": (bool, True),
+    "fan_out": (bool, True),
+    "drop_duplicates": (bool, False),
+    "reuse_stored": (bool, True),
+    "store": (bool, True),
+}
+CHOICES = {"api": ("sync", "async"), "pacing": ("adaptive", "watch")}
+
+
+def parse_generate_request(body) -> dict:
+    """Validated /v1/generate options with defaults filled in; raises ApiError(400)."""
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    unknown = sorted(set(body) - set(GENERATE_FIELDS))
+    if unknown:
+        raise ApiError(400, f"Unknown fields: {', '.join(unknown)}")
+    options = {}
+    for field, (kind, default) in GENERATE_FIELDS.items():
+        value = body.get(field)
+        if value is None:
+            value = default
+        if value is not None and not isinstance(value, kind):
+            raise ApiError(400, f"'{field}' has the wrong type")
+        if field in CHOICES and value not in CHOICES[field]:
+            raise ApiError(400, f"'{field}' must be one of: {', '.join(CHOICES[field])}")
+        options[field] = value
+    if any(not isinstance(ms, (int, float)) or isinstance(ms, bool) for ms in (options["step_timeouts"] or {}).values()):
+        raise ApiError(400, "'step_timeouts' values must be milliseconds")
+    if not (options["code"] or "").strip():
+        raise ApiError(400, "'code' must contain a Playwright codegen function")
+    return options
+
+
+class GenerationService:
+    """The pipeline plus the shared test case repository and dedup index, behind a concurrency limit."""
+
+    def __init__(self, config: ApiConfig = None):
+        self.config = config or ApiConfig()
+        self.store = TestCaseStore(self.config.store_path)
+        self.history = DedupIndex.load(self.config.dedup_index_path)
+        self._history_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.config.max_concurrent)
+        self.counters = {"in_flight": 0, "queued": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._latencies = []
+
+    async def generate(self, options: dict) -> dict:
+        if self.counters["queued"] >= self.config.max_queue:
+            self.counters["rejected"] += 1
+            raise ApiError(429, "Too many queued generations", {"Retry-After": "5"})
+        self.counters["queued"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.counters["queued"] -= 1
+        self.counters["in_flight"] += 1
+        started = time.perf_counter()
+        try:
+            with trace("api.generate") as request_trace:
+                result = await asyncio.wait_for(self._generate(options), self.config.timeout_s)
+            if self.config.trace_dir:
+                result["trace_file"] = await asyncio.to_thread(request_trace.export, self.config.trace_dir)
+            self.counters["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            self.counters["failed"] += 1
+            raise ApiError(504, f"Generation did not finish within {self.config.timeout_s:.0f}s") from None
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.counters["in_flight"] -= 1
+            self._slots.release()
+            self._latencies = (self._latencies + [time.perf_counter() - started])[-1000:]
+
+    async def _generate(self, options: dict) -> dict:
+        started = time.perf_counter()
+        noise = {}
+        with span("read_input"):
+            code = "\n".join(strip_codegen_noise(options["code"].splitlines(), noise)).strip()
+        changes, diff = [], ""
+        if options["optimize"]:
+            with span("optimize_codegen"):
+                optimized, changes = optimize_codegen(code)
+            diff = codegen_diff(textwrap.dedent(code), optimized)
+            code = optimized.strip()
+
+        step_timeouts = dict(options["step_timeouts"] or {})
+        if options["slow_steps"] is not None:
+            try:
+                step_timeouts.update(calibrate_timeouts(load_slow_steps(options["slow_steps"])))
+            except ValueError as e:
+                raise ApiError(400, f"Invalid slow_steps: {e}") from None
+        script_options = {
+            "api": options["api"],
+            "pacing": options["pacing"],
+            "step_timeouts": step_timeouts,
+            "validation_scope": options["validation_scope"].strip() or None,
+        }
+
+        code_hash = function_hash(code)
+        stored_rows = []
+        if options["test_cases"] and options["reuse_stored"]:
+            stored_rows = await asyncio.to_thread(self.store.latest_for_function, code_hash)
+
+        with routing_decisions() as decisions:
+            script, testcase_response = await pipeline.generate_all(
+                code, testcases=options["test_cases"] and not stored_rows, fan_out=options["fan_out"], **script_options
+            )
+        if not pipeline.is_valid_python(script):
+            raise ApiError(502, f"Script generation failed: {script[:500]}")
+
+        test_cases, source = stored_rows, "stored" if stored_rows else "none"
+        if testcase_response:
+            async with self._history_lock:
+                await asyncio.to_thread(self.history.sync, self.config.dedup_index_path)
+                test_cases = await asyncio.to_thread(
+                    pipeline.prepare_testcases,
+                    testcase_response,
+                    self.history,
+                    options["drop_duplicates"],
+                    datetime.now().strftime("%Y%m%d_%H%M%S") + ":",
+                )
+                if test_cases:
+                    await asyncio.to_thread(self.history.sync, self.config.dedup_index_path)
+            source = "generated" if test_cases else "unparsed"
+            if test_cases and options["store"]:
+                await asyncio.to_thread(self.store.add_test_cases, code_hash, test_cases)
+
+        return {
+            "function_hash": code_hash,
+            "script": script,
+            "test_cases": test_cases,
+            "test_cases_source": source,
+            "raw_test_cases": testcase_response if source == "unparsed" else None,
+            "noise_lines_dropped": noise.get("dropped", 0),
+            "optimizations": changes,
+            "optimization_diff": diff,
+            "routing": [d.as_dict() for d in decisions],
+            "cost_usd": sum(d.cost_usd for d in decisions),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            **self.counters,
+            "max_concurrent": self.config.max_concurrent,
+            "max_queue": self.config.max_queue,
+            "p50_s": latencies[len(latencies) // 2] if latencies else None,
+            "p95_s": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "models": pipeline.model_router.summary() if pipeline.model_router else [],
+        }
+
+
+async def read_body(request, max_bytes: int) -> bytes:
+    """The request body, read until `max_bytes`; raises ApiError(413) beyond it, whatever Content-Length said."""
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise ApiError(413, "Request body too large")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise ApiError(413, "Request body too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def create_app(config: ApiConfig = None) -> Starlette:
+    """ASGI app; the service (store, dedup index, semaphore) is created on startup, inside the server's loop."""
+    config = config or ApiConfig()
+
+    async def generate(request):
+        try:
+            body = json.loads(await read_body(request, config.max_body_bytes))
+        except ValueError:
+            return JSONResponse({"error": "Request body is not valid JSON"}, status_code=400)
+        except ApiError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        try:
+            result = await request.app.state.service.generate(parse_generate_request(body))
+        except ApiError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status, headers=e.headers)
+        except Exception as e:
+            return JSONResponse({"error": f"Generation failed: {e}"}, status_code=500)
+        return JSONResponse(result)
+
+    async def health(request):
+        return JSONResponse({"status": "ok", "client_configured": pipeline.groq_client is not None})
+
+    async def stats(request):
+        return JSONResponse(request.app.state.service.stats())
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Groq calls run in asyncio.to_thread(); size the pool for every
+        # concurrent generation's fan-out instead of the cpu-based default
+        executor = ThreadPoolExecutor(max_workers=4 * config.max_concurrent, thread_name_prefix="groq")
+        asyncio.get_running_loop().set_default_executor(executor)
+        app.state.service = GenerationService(config)
+        try:
+            yield
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Starlette(
+        routes=[
+            Route("/v1/generate", generate, methods=["POST"]),
+            Route("/v1/health", health, methods=["GET"]),
+            Route("/v1/stats", stats, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def configure_from_env():
+    """Same settings the app reads from secrets, from GROQ_* environment variables."""
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise SystemExit("GROQ_API_KEY is not set")
+    default_model = os.environ.get("GROQ_DEFAULT_MODEL") or pipeline.DEFAULT_GROQ_MODEL
+    router = None
+    if os.environ.get("GROQ_ROUTING", "1").lower() not in ("0", "false", "no"):
+        models = [m.strip() for m in os.environ.get("GROQ_ROUTER_MODELS", "").split(",") if m.strip()]
+        router = ModelRouter(models or [FAST_MODEL, default_model])
+    pipeline.configure_client(
+        api_key,
+        default_model,
+        base_url=os.environ.get("GROQ_BASE_URL"),
+        stream=os.environ.get("GROQ_STREAM", "").lower() in ("1", "true", "yes"),
+        router=router,
+    )
+
+
+def main():
+    defaults = ApiConfig()
+    parser = argparse.ArgumentParser(description="Headless HTTP API for script and test case generation")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrent", type=int, default=defaults.max_concurrent)
+    parser.add_argument("--max-queue", type=int, default=defaults.max_queue)
+    parser.add_argument("--timeout-s", type=float, default=defaults.timeout_s)
+    parser.add_argument("--store", default=defaults.store_path, help="Test case repository (SQLite)")
+    parser.add_argument("--dedup-index", default=defaults.dedup_index_path)
+    parser.add_argument("--trace-dir", default=None, help="Write a Chrome trace-event JSON per request here")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    configure_from_env()
+    config = ApiConfig(
+        max_concurrent=args.max_concurrent,
+        max_queue=args.max_queue,
+        timeout_s=args.timeout_s,
+        store_path=args.store,
+        dedup_index_path=args.dedup_index,
+        trace_dir=args.trace_dir,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
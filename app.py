@@ -1,17 +1,29 @@
 import streamlit as st
-import re
 import os
 from datetime import datetime
 import pandas as pd
-from groq import Groq
 import asyncio
 import nest_asyncio
 import sys
-import json
-import time
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment
-from openpyxl.utils import get_column_letter
+import io
+import textwrap
+from pipeline import (
+    TESTCASE_JUNIT,
+    configure_client,
+    generate_all,
+    prepare_testcases,
+    write_testcases,
+)
+from codegen_input import is_oversized, read_codegen_upload, strip_codegen_noise
+from codegen_optimizer import codegen_diff, optimize_codegen
+from download_bundle import build_bundle
+from model_router import FAST_MODEL, ModelRouter, routing_decisions
+from report_writers import DEFAULT_FORMAT, WRITERS, export_filename, write_rows
+from session_store import DEFAULT_BUDGET_MB, ResultCache, SessionResult
+from step_timing import calibrate_timeouts, load_slow_steps
+from testcase_dedup import DEFAULT_INDEX_PATH, DedupIndex
+from testcase_store import EXPORT_FIELDS, TestCaseStore, function_hash
+from tracing import DEFAULT_TRACE_DIR, profiled, span, trace
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
@@ -254,540 +266,279 @@ if not GROQ_API_KEY:
     st.error("❌ GROQ API key not found in config.json")
     st.stop()
 
-groq_client = Groq(api_key=GROQ_API_KEY)
-
-class GroqAgent:
-    def __init__(self, system_prompt, model_name=DEFAULT_GROQ_MODEL):
-        self.system_prompt = system_prompt
-        self.model_name = model_name
-
-    async def generate(self, user_content: str) -> str:
-        try:
-            completion = groq_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.0,
-                max_tokens=8000
-            )
-            return completion.choices[0].message.content.strip()
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-
-TRANSFORM_PROMPT = """
-You are a strict Playwright instrumentation engine.
-
-You will receive ONE Playwright function.
-
-Your job is NOT to rewrite it.
-Your job is NOT to improve it.
-Your job is NOT to create a sample.
-Your job is ONLY to instrument it and add validation
-based on expect(...).to_contain_text() that already exists in the input.
-
-STRICT RULES:
+# Optional: point the client at another Groq/OpenAI-compatible endpoint,
+# e.g. the local fake_llm_server.py for offline load testing
+GROQ_BASE_URL = st.secrets.get("groq_base_url") or os.environ.get("GROQ_BASE_URL")
 
-1. Copy the original function EXACTLY as provided.
-2. Copy EVERY original line EXACTLY as-is.
-3. DO NOT change indentation.
-4. DO NOT change locators.
-5. DO NOT change URLs.
-6. DO NOT remove existing expect statements.
-7. DO NOT modify function signature.
-8. DO NOT invent new steps.
-9. DO NOT change execution order.
 
-You are ONLY allowed to:
 
-- Add try/except around EACH original executable statement
-- Add screenshot capture
-- Add step_logs.append(...)
-- Add step counter increment
-- Add validation using Playwright expect()
-- Add run() wrapper
-
-------------------------------------------------------------
-STABLE PAGE VALIDATION RULE (PLAYWRIGHT NATIVE – NO SPLITTING)
-------------------------------------------------------------
-
-1. First, scan the ORIGINAL function.
-
-2. Extract any text used inside:
-       expect(page.locator("body")).to_contain_text("...")
-
-3. Treat that text as EXPECTED_PAGE_TEXT.
-
-4. DO NOT split text by whitespace.
-   DO NOT use inner_text().
-   DO NOT manually assert string inclusion.
+@st.cache_resource
+def get_model_router():
+    """
+    Process-wide router: the fastest model first, escalating to the configured
+    default model. Set groq_routing = false in secrets to always use the default.
+    """
+    if not st.secrets.get("groq_routing", True):
+        return None
+    return ModelRouter(st.secrets.get("groq_router_models") or [FAST_MODEL, DEFAULT_GROQ_MODEL])
 
-5. Instead, generate stable partial validations by:
 
-   - Extracting 3–6 meaningful anchor phrases from EXPECTED_PAGE_TEXT.
-   - Anchors must be human-readable phrases.
-   - Ignore numeric-only fragments.
-   - Ignore long concatenated text.
-   - Ignore special characters like "•".
-   - Prefer phrases containing words (minimum 3 characters).
-   - Keep phrases as natural UI labels.
+configure_client(GROQ_API_KEY, DEFAULT_GROQ_MODEL, base_url=GROQ_BASE_URL, router=get_model_router())
 
-   Example:
-       From:
-       "Beach HutsA-30 AlphaHawksBay, KarachiFull-day access..."
+DEDUP_INDEX_PATH = DEFAULT_INDEX_PATH
 
-       Extract anchors like:
-       "Beach Huts"
-       "EFERT Guest House Daharki"
-       "Guest Houses"
-    This is an illustrative example only. Apply the script’s extraction rules to generate the anchors.
 
-6. After EACH successful original statement,
-   add validation using Playwright's built-in expect:
+@st.cache_resource
+def get_dedup_index():
+    """Process-wide near-duplicate index over every test case generated so far."""
+    return DedupIndex.load(DEDUP_INDEX_PATH)
 
-       expect(page.locator("body")).to_contain_text(
-           re.compile(r"ANCHOR_TEXT", re.IGNORECASE)
-       )
 
-7. This validation must:
+TESTCASE_EXPORT_STEM = "cleaned_generated_test_cases"
 
-   - Be inside the try block
-   - Come AFTER the original line
-   - NOT replace original expect statements
-   - NOT modify business logic
-   - Use regex with re.IGNORECASE
-   - NEVER use manual string splitting
-   - NEVER use page.locator("body").inner_text()
 
-8. If multiple to_contain_text values exist,
-   always use the MOST RECENT one encountered
-   above the current step.
+def testcase_export_path(fmt: str = DEFAULT_FORMAT) -> str:
+    return export_filename(TESTCASE_EXPORT_STEM, fmt)
 
-9. If no to_contain_text exists in input,
-   use:
-       expect(page.locator("body")).not_to_be_empty()
 
-------------------------------------------------------------
-WAITING RULE FOR NAVIGATION ACTIONS
-------------------------------------------------------------
+def parse_and_export_testcases(test_cases_str: str, drop_duplicates: bool = False, fmt: str = DEFAULT_FORMAT):
+    """
+    Parse the LLM test case output and export it in format `fmt`.
 
-If the original line contains:
-    - page.goto(...)
-    - click()
-    - form submission
-    - navigation-triggering action
-
-Then validation must rely ONLY on Playwright's expect(),
-because it automatically waits for the element.
-
-Do NOT manually wait.
-Do NOT use sleep.
-Do NOT add wait_for_load_state unless present originally.
-
-------------------------------------------------------------
-INSTRUMENTATION PATTERN
-------------------------------------------------------------
-
-For each original statement:
-
-try:
-    ORIGINAL LINE HERE
-
-    # Stable partial validation using anchor phrases
-    expect(page.locator("body")).to_contain_text(
-        re.compile(r"ANCHOR_PHRASE_1", re.IGNORECASE)
+    Near-duplicates are flagged in a "Duplicate Of" column, against earlier
+    rows of the batch and against the project's history. With
+    `drop_duplicates`, in-batch duplicates are removed from the export.
+    """
+    # Flag near-duplicates (in this batch and across previous runs); sync
+    # first to pick up test cases the API server or other sessions added
+    history = get_dedup_index()
+    history.sync(DEDUP_INDEX_PATH)
+    all_data = prepare_testcases(
+        test_cases_str,
+        history=history,
+        drop_duplicates=drop_duplicates,
+        history_prefix=datetime.now().strftime("%Y%m%d_%H%M%S") + ":"
     )
+    if all_data:
+        history.sync(DEDUP_INDEX_PATH)
 
-    page.screenshot(path=f"step_{{step_number}}_PASS.png")
-    step_logs.append(f"Step {{step_number}}: PASS")
-
-except Exception as e:
-    page.screenshot(path=f"step_{{step_number}}_FAIL.png")
-    step_logs.append(f"Step {{step_number}}: FAIL - {{str(e)}}")
-
-step_number += 1
-
-------------------------------------------------------------
-
-Each original line = one try block.
-Do NOT merge steps.
-Do NOT change logic.
-Do NOT remove original expect statements.
-
-------------------------------------------------------------
-AFTER INSTRUMENTING
-------------------------------------------------------------
-
-Add:
-
-- import re
-- step_logs = []
-- step_number = 1
-- run() wrapper
-- sync_playwright
-- browser headless=False
-- args=["--start-maximized"]
-- slow_mo = 1000
-- context with no_viewport=True
-- Excel report writing using xlsxwriter
-
-------------------------------------------------------------
-
-------------------------------------------------------------
-STEP LOG TITLE RULE (FOR EXCEL REPORT)
-------------------------------------------------------------
+    if not all_data:
+        st.warning("⚠️ No test cases parsed. Check LLM output format.")
+        st.expander("Raw LLM Output").code(test_cases_str)
+        return [], None
+    return all_data, export_testcases(all_data, fmt=fmt)
 
-The Excel report must NOT log steps as:
 
-    Step 1
-    Step 2
+def export_testcases(all_data: list, output_path: str = None, fmt: str = DEFAULT_FORMAT):
+    """
+    Write parsed test case rows in format `fmt` (a formatted workbook for Excel).
 
-Instead, use the SAME SANITIZED_ACTION_TITLE
-used for screenshot naming.
+    The export is rendered once in memory; the same bytes are saved to
+    `output_path` and returned for the download buttons and the zip
+    bundle (None if nothing was exported).
+    """
+    if all_data:
+        output_path = output_path or testcase_export_path(fmt)
+        try:
+            buffer = io.BytesIO()
+            write_testcases(all_data, buffer, fmt)
+            export = buffer.getvalue()
+            with open(output_path, "wb") as f:
+                f.write(export)
+            duplicates = sum(1 for d in all_data if d.get('Duplicate Of'))
+            st.success(f"✅ {len(all_data)} test cases exported to {output_path}")
+            if duplicates:
+                st.info(f"🔁 {duplicates} near-duplicate test cases flagged in the 'Duplicate Of' column")
+            return export
+        except Exception as e:
+            st.error(f"Error saving {WRITERS[fmt].label} export: {e}")
+    return None
 
-Format:
 
-    step_logs.append(
-        f"Step{{step_number}}_{{SANITIZED_ACTION_TITLE}}_PASS"
+@st.cache_resource
+def get_result_cache():
+    """
+    Process-wide store of every session's last results; sessions keep only
+    a SessionResult of keys. Budget: session_memory_mb in secrets.
+    """
+    return ResultCache(int(st.secrets.get("session_memory_mb", DEFAULT_BUDGET_MB)) * 1024 * 1024)
+
+
+def remember_result(code_hash: str, script: str, script_filename: str, test_cases: list,
+                    testcase_export: bytes, export_format: str, testcase_response: str,
+                    bundle: bytes = None, bundle_filename: str = None):
+    """Put this submission's results in the shared cache and keep their keys in the session."""
+    cache = get_result_cache()
+    st.session_state.last_result = SessionResult(
+        function_hash=code_hash,
+        script=cache.put(script),
+        rows=cache.put_rows(test_cases) if test_cases else None,
+        export=cache.put(testcase_export) if testcase_export else None,
+        export_format=export_format,
+        response=cache.put(testcase_response) if testcase_response and not test_cases else None,
+        script_filename=script_filename,
+        bundle=cache.put(bundle) if bundle else None,
+        bundle_filename=bundle_filename,
     )
 
-On failure:
 
-    step_logs.append(
-        f"Step{{step_number}}_{{SANITIZED_ACTION_TITLE}}_FAIL - {{str(e)}}"
+def render_testcase_rows(test_cases: list):
+    st.dataframe(
+        pd.DataFrame(test_cases),
+        column_config={
+            "Step-by-step actions": st.column_config.TextColumn(width="medium"),
+            "Expected Result": st.column_config.TextColumn(width="medium"),
+            "Test Case Description": st.column_config.TextColumn(width="medium"),
+        },
+        use_container_width=True,
+        hide_index=True
     )
 
-Rules:
-
-- Use the exact same SANITIZED_ACTION_TITLE
-  generated for screenshot filename.
-- Do NOT remove step_number.
-- Do NOT change execution order.
-- Do NOT change Excel writing logic.
-- Only change the string format inside step_logs.append().
-- Keep PASS/FAIL behavior identical.
-------------------------------------------------------------
-FOLDER ORGANIZATION & NAMED SCREENSHOT RULE
-------------------------------------------------------------
-
-All generated artifacts MUST be saved inside a single execution folder.
-
-1. At runtime, create a folder named:
-
-       test_run_<TIMESTAMP>
 
-   Where TIMESTAMP format is:
-       YYYYMMDD_HHMMSS
-
-   Use:
-       from datetime import datetime
-       import os
-       timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-       output_dir = f"test_run_{{timestamp}}"
-       os.makedirs(output_dir, exist_ok=True)
-
-2. ALL of the following MUST be saved inside this folder:
-
-   - Every screenshot (PASS and FAIL)
-   - The Excel report
-   - A copy of the final executed script itself
-
-3. Screenshot Naming Rule (IMPORTANT):
-
-   DO NOT use step_number alone anymore.
-
-   Instead, create a readable title based on the original statement.
-
-   Screenshot format:
-
-       <STEP_NUMBER>_<SANITIZED_ACTION_TITLE>_PASS.png
-       <STEP_NUMBER>_<SANITIZED_ACTION_TITLE>_FAIL.png
-
-   Where:
-
-   - SANITIZED_ACTION_TITLE is derived from the original line.
-   - Convert to lowercase
-   - Replace spaces with underscores
-   - Remove special characters
-   - Keep it short (max 6 words)
-   - Example transformations:
-
-         page.goto("https://google.com")
-         -> 1_goto_google_PASS.png
-
-         page.get_by_role("button", name="Login").click()
-         -> 2_click_login_button_PASS.png
-
-4. Screenshot path must be:
-
-       page.screenshot(path=os.path.join(output_dir, f"...filename..."))
-
-5. Excel report must be saved as:
-
-       os.path.join(output_dir, "execution_report.xlsx")
-
-6. The currently running script file must also be copied into the folder.
-
-   Use:
-
-       import shutil
-       import sys
-
-       current_script = sys.argv[0]
-       shutil.copy(current_script, os.path.join(output_dir, os.path.basename(current_script)))
-
-7. Do NOT change any existing instrumentation behavior.
-8. Do NOT remove step_number.
-9. Folder creation must happen before execution starts.
-10. All paths must reference output_dir.
-
-------------------------------------------------------------
+def render_last_result(result: SessionResult):
+    """
+    The session's previous submission on later reruns, read back from the
+    shared cache. Evicted rows are reloaded from the repository; an evicted
+    script has to be generated again.
+    """
+    cache = get_result_cache()
+    with st.expander("🗂️ Last generated result", expanded=False):
+        bundle = cache.get(result.bundle)
+        if bundle is not None:
+            st.download_button(
+                label="📦 Download Bundle (.zip: script, test cases, manifest)",
+                data=bundle,
+                file_name=result.bundle_filename,
+                mime="application/zip",
+                on_click="ignore",
+                type="primary",
+                key="last_result_bundle"
+            )
+        script = cache.get(result.script)
+        if script is None:
+            st.info("The script of your last submission was evicted from server memory; generate it again.")
+        else:
+            st.code(script, language="python", line_numbers=True)
+            st.download_button(
+                label="📥 Download Test Script (.py)",
+                data=script,
+                file_name=result.script_filename,
+                mime="text/x-python",
+                on_click="ignore",
+                key="last_result_script"
+            )
 
-CRITICAL OUTPUT RULES
+        test_cases = cache.get_rows(result.rows) if result.rows else None
+        if test_cases is None and result.rows:
+            test_cases = get_testcase_store().latest_for_function(result.function_hash)
+        if test_cases:
+            render_testcase_rows(test_cases)
+        export = cache.get(result.export)
+        if export is not None:
+            writer = WRITERS[result.export_format]
+            st.download_button(
+                label=f"📥 Download Test Cases {writer.label}",
+                data=export,
+                file_name=export_filename("test_cases", result.export_format),
+                mime=writer.mime,
+                on_click="ignore",
+                key="last_result_export"
+            )
+        response = cache.get(result.response)
+        if response is not None:
+            st.code(response, language="text")
+
+
+def render_trace(request_trace, save: bool):
+    """Span summary of one submission, with the trace (and cProfile capture) for download."""
+    path = request_trace.export(DEFAULT_TRACE_DIR) if save else None
+    summary = request_trace.summary()
+    total_ms = next((r["total_ms"] for r in summary if r["span"] == request_trace.name), 0.0)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with st.expander(f"⏱️ Submission timing: {total_ms / 1000:.2f}s"):
+        st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="Download trace (Chrome trace-event JSON)",
+            data=request_trace.to_json(),
+            file_name=f"trace_{stamp}.json",
+            mime="application/json",
+            on_click="ignore"
+        )
+        st.caption("Open in chrome://tracing or ui.perfetto.dev" + (f" · saved to {path}" if path else ""))
+        if request_trace.profile is not None:
+            st.code(request_trace.profile_stats(), language="text")
+            st.download_button(
+                label="Download cProfile capture (.prof)",
+                data=request_trace.profile_bytes(),
+                file_name=f"profile_{stamp}.prof",
+                mime="application/octet-stream",
+                on_click="ignore"
+            )
 
-- Output ONLY valid Python code.
-- No explanations.
-- No markdown.
-- No commentary.
-- No formatting text.
-- No extra text before or after code.
 
-Now instrument this function EXACTLY:
+@st.cache_resource
+def get_testcase_store():
+    """Process-wide repository of every generated test case."""
+    return TestCaseStore()
 
-{input_code}
-"""
 
+def render_testcase_repository():
+    """Faceted search over stored test cases with a streamed export."""
+    store = get_testcase_store()
+    st.markdown("### 🗄️ Test Case Repository")
 
+    query = st.text_input(
+        "Search stored test cases",
+        placeholder="login, checkout, invalid password ...",
+        key="repo_query"
+    )
+    facets = store.facets(query)
+    col1, col2 = st.columns(2)
+    with col1:
+        priorities = st.multiselect(
+            "Priority",
+            options=list(facets["Priority"]),
+            format_func=lambda v: f"{v} ({facets['Priority'][v]})",
+            key="repo_priority"
+        )
+    with col2:
+        testing_types = st.multiselect(
+            "Testing Type",
+            options=list(facets["Testing Type"]),
+            format_func=lambda v: f"{v} ({facets['Testing Type'][v]})",
+            key="repo_testing_type"
+        )
 
-# ────────────────────────────────────────────────
-#     NEW: TEST CASE PLANNING PROMPT (inspired by PlannerOSS)
-# ────────────────────────────────────────────────
-TESTCASE_PLAN_PROMPT = """\
-You are a test case documentation expert. Generate test cases for the provided Playwright script.
-
-For context, use the flow mentioned in the original function, and generate test cases that cover the key features, user interactions, and expected outcomes in the script ONLY.
-
-CRITICAL FORMATTING RULES:
-1. Use EXACTLY this format for each test case (no variations)
-2. Each field MUST start with "* " (asterisk + space)
-3. Each field MUST be on a single line (no multi-line values except Step-by-step actions)
-4. Test Case ID must be TC-1, TC-2, TC-3, etc. (sequential)
-5. Separate test cases with ONE blank line
-
-REQUIRED FORMAT PER TEST CASE:
-
-* High Level Feature: [Category]
-* Test Case ID: TC-[Number]
-* Feature Name: [Specific feature of the script that is being tested. E.g. "Booking Flow", "Login Functionality", etc.]
-* Test Scenario: [Summary of the user interaction or feature being tested in one line]
-* Test Case: [Title]
-* Test Case Description: [Details in one line of the feature being tested.]
-* Step-by-step actions: [Single paragraph with all steps, no numbering]
-* Possible Values: [Data or None]
-* Sources: [Sources or None]
-* Expected Result: [Pass criteria in one line]
-* Data Correctness Checked: [Yes/No]
-* Release/Platform Version: Web
-* Automation Possibility: [Yes/No]
-* Testing Type: [Type]
-* Priority: [High/Medium/Low]
-
-EXAMPLE:
-
- OUTPUT the test cases in the following format:
-        STRICTLY ADHERE TO THIS FORMAT:
-        - Test Case ID: TC-<number>
-        - High Level Feature
-        - Feature Name
-        - Test Scenario
-        - Test Case
-        - Test Case Description
-        - Step-by-step actions
-        - Possible Values (if applicable, Type 'None' if there is none for a specific case)
-        - Sources (if applicable, Type 'N/A' if there is none for a specific case)
-        - Expected Result
-        - Data Correctness Checked (if applicable, Type 'N/A' if there is none for a specific case)
-        - Release/Platform Version (Web/Mobile/IOS/Android etc. If not applicable, write 'N/A')
-        - Automation Possibility
-        - Testing Type
-        - Priority
-
-NOW GENERATE TEST CASES FOR THIS SCRIPT:
-```python
-{{input_code}}
-```
-
-Extract flows from the provided script and generate test cases ONLY for flows that actually exist in the script.
-Do NOT invent features.
-Use actual button names, actual URLs, and actual assertions present in the script.
-Generate all possible testcases that exist (20-25) ONLY FOR FLOWS THAT EXIST IN MY ORIGINAL SCRIPT THAT I INPUT. 
-Donot repeat testcases, give me distinct ones for flows/functionality that exist in my original script.
-
-"""
-
-def clean_generated_code(raw: str) -> str:
-    """
-    Aggressive cleaning: remove ALL non-code content including test case docs.
-    """
-    lines = raw.splitlines()
-    cleaned = []
-    
-    # Skip until we find the first import
-    found_code_start = False
-    
-    for line in lines:
-        stripped = line.strip()
-        
-        # Skip markdown code fences
-        if stripped.startswith('```'):
-            continue
-            
-        # Look for code start
-        if not found_code_start:
-            if stripped.startswith(('from ', 'import ')):
-                found_code_start = True
-            else:
-                continue
-        
-        # After code starts, filter out test case documentation
-        # Skip lines that are clearly test case docs (even as comments)
-        if any(keyword in stripped.lower() for keyword in [
-            'test case id:', 'tc-', 'high level feature:', 'feature name:',
-            'test scenario:', 'test case:', 'test case description:',
-            'step-by-step actions:', 'possible values:', 'sources:',
-            'expected result:', 'data correctness checked:', 
-            'release/platform version:', 'automation possibility:',
-            'testing type:', 'priority:', '**test cases:**'
-        ]):
-            continue
-            
-        # Skip markdown-style bullets/headers (even in comments)
-        if re.match(r'^\s*[#*\-•]\s*[A-Z]', stripped):
-            continue
-            
-        # Skip numbered list items that look like test case headers
-        if re.match(r'^\s*\d+\.\s*\*\*', stripped):
-            continue
-        
-        # Keep the line if it passed all filters
-        cleaned.append(line)
-    
-    result = '\n'.join(cleaned).strip()
-    
-    # Remove any remaining markdown artifacts
-    result = re.sub(r'\*\*(.+?)\*\*', r'\1', result)  # Remove bold
-    
-    return result
+    total = store.count(query, priorities, testing_types)
+    st.caption(f"{total} matching test cases (showing up to 200)")
+    if not total:
+        return
 
-def parse_and_export_testcases(test_cases_str: str):
-    """
-    Parse test cases with improved regex that handles the strict format.
-    """
-    # Split by test case blocks (look for "Test Case ID: TC-")
-    test_blocks = re.split(r'\n(?=\* High Level Feature:)', test_cases_str.strip())
-    
-    all_data = []
-    st.session_state.test_cases_list = []
-    
-    for block in test_blocks:
-        if not block.strip():
-            continue
-            
-        data = {
-            'High Level Feature': '',
-            'Test Case ID': '',
-            'Feature Name': '',
-            'Test Scenario': '',
-            'Test Case': '',
-            'Test Case Description': '',
-            'Step-by-step actions': '',
-            'Possible Values': '',
-            'Sources': '',
-            'Expected Result': '',
-            'Data Correctness Checked': '',
-            'Release/Platform Version': '',
-            'Automation Possibility': '',
-            'Testing Type': '',
-            'Priority': ''
-        }
-        
-        # Extract each field with simple, specific regex
-        patterns = {
-            'High Level Feature': r'\* High Level Feature:\s*(.+?)(?=\n\*|\Z)',
-            'Test Case ID': r'\* Test Case ID:\s*(.+?)(?=\n\*|\Z)',
-            'Feature Name': r'\* Feature Name:\s*(.+?)(?=\n\*|\Z)',
-            'Test Scenario': r'\* Test Scenario:\s*(.+?)(?=\n\*|\Z)',
-            'Test Case': r'\* Test Case:\s*(.+?)(?=\n\*|\Z)',
-            'Test Case Description': r'\* Test Case Description:\s*(.+?)(?=\n\*|\Z)',
-            'Step-by-step actions': r'\* Step-by-step actions:\s*(.+?)(?=\n\*|\Z)',
-            'Possible Values': r'\* Possible Values:\s*(.+?)(?=\n\*|\Z)',
-            'Sources': r'\* Sources:\s*(.+?)(?=\n\*|\Z)',
-            'Expected Result': r'\* Expected Result:\s*(.+?)(?=\n\*|\Z)',
-            'Data Correctness Checked': r'\* Data Correctness Checked:\s*(.+?)(?=\n\*|\Z)',
-            'Release/Platform Version': r'\* Release/Platform Version:\s*(.+?)(?=\n\*|\Z)',
-            'Automation Possibility': r'\* Automation Possibility:\s*(.+?)(?=\n\*|\Z)',
-            'Testing Type': r'\* Testing Type:\s*(.+?)(?=\n\*|\Z)',
-            'Priority': r'\* Priority:\s*(.+?)(?=\n\*|\Z)',
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, block, re.DOTALL | re.IGNORECASE)
-            if match:
-                value = match.group(1).strip()
-                # Clean up any remaining formatting
-                value = re.sub(r'\s+', ' ', value)  # Normalize whitespace
-                data[key] = value
-        
-        # Only add if we found a Test Case ID
-        if data['Test Case ID']:
-            all_data.append(data)
-            st.session_state.test_cases_list.append(data)
-    
-    # Export to Excel
-    output_path = "cleaned_generated_test_cases.xlsx"
-    if all_data:
-        df = pd.DataFrame(all_data)
-        
-        try:
-            df.to_excel(output_path, index=False)
-            
-            # Format Excel
-            wb = load_workbook(output_path)
-            ws = wb.active
-            for col in ws.columns:
-                max_length = 0
-                column = get_column_letter(col[0].column)
-                for cell in col:
-                    cell.alignment = Alignment(wrap_text=True, vertical='top')
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                
-                adjusted_width = min((max_length + 2) * 1.2, 70)
-                ws.column_dimensions[column].width = adjusted_width
-            
-            wb.save(output_path)
-            st.success(f"✅ {len(all_data)} test cases exported to {output_path}")
-            return True
-        except Exception as e:
-            st.error(f"Error saving Excel: {e}")
-            return False
-    else:
-        st.warning("⚠️ No test cases parsed. Check LLM output format.")
-        st.expander("Raw LLM Output").code(test_cases_str)
-        return False
-import streamlit as st
-import asyncio
-import pandas as pd
-from datetime import datetime
+    st.dataframe(
+        pd.DataFrame(store.search(query, priorities, testing_types, limit=200)),
+        use_container_width=True,
+        hide_index=True
+    )
 
-# Assume these already exist in your project
-# TRANSFORM_PROMPT
-# TESTCASE_PLAN_PROMPT
-# GroqAgent
-# clean_generated_code
-# parse_and_export_testcases
+    fmt = st.selectbox(
+        "Export format",
+        options=list(WRITERS),
+        format_func=lambda f: WRITERS[f].label,
+        key="repo_export_format"
+    )
+    if st.button("Prepare export of filtered test cases", key="repo_export"):
+        buffer = io.BytesIO()
+        write_rows(
+            fmt, store.search(query, priorities, testing_types), buffer, EXPORT_FIELDS,
+            title="Test Cases", junit=TESTCASE_JUNIT
+        )
+        st.download_button(
+            label=f"📥 Download {total} Test Cases ({WRITERS[fmt].label})",
+            data=buffer.getvalue(),
+            file_name=export_filename(f"test_case_repository_{datetime.now().strftime('%Y%m%d_%H%M%S')}", fmt),
+            mime=WRITERS[fmt].mime,
+            use_container_width=True
+        )
 
 
 def main():
@@ -964,6 +715,26 @@ def main():
             """
         )
 
+        st.markdown("---")
+
+        st.markdown("### 🔬 Diagnostics")
+        save_traces = st.checkbox(
+            "Save a trace file per submission",
+            value=False,
+            help=f"Chrome trace-event JSON in {DEFAULT_TRACE_DIR}/; the timing expander offers it for download either way."
+        )
+        profile_submissions = st.checkbox(
+            "Capture cProfile",
+            value=False,
+            help="Profiles the app thread (prompt building, cleaning, parsing, export, rendering). "
+                 "Groq calls run in worker threads and only appear as trace spans."
+        )
+        cache_stats = get_result_cache().stats()
+        st.caption(
+            f"Session results: {cache_stats['used_mb']:.1f} of {cache_stats['budget_mb']:.0f} MB, "
+            f"{cache_stats['entries']} entries, {cache_stats['evictions']} evicted"
+        )
+
     # ---------------- Main UI ----------------
     st.markdown('', unsafe_allow_html=True)
     st.markdown('📝 Test Generation', unsafe_allow_html=True)
@@ -981,12 +752,80 @@ def main():
             help="Paste only the function generated by Playwright codegen (sync API)."
         )
 
+        code_file = st.file_uploader(
+            "…or upload a codegen file",
+            type=["py", "txt"],
+            help="For large recordings: the file is read line by line and replaces the pasted code. "
+                 "Functions too large for one prompt are instrumented in chunks."
+        )
+
         extra_context = st.text_input(
             "Additional Context (optional)",
             placeholder="URL = https://myapp.com, should see 'Welcome' message after login, check cart count = 2",
             help="Any URL, login info, expected text, assertions, or special notes"
         )
 
+        script_api = st.radio(
+            "Script API",
+            ["Sync", "Async"],
+            horizontal=True,
+            help="Async emits an async_playwright script that runs each test in its own browser context concurrently."
+        )
+
+        pacing = st.radio(
+            "Pacing",
+            ["Adaptive", "Watch mode"],
+            horizontal=True,
+            help="Adaptive runs at the page's real speed with per-step timeouts; "
+                 "watch mode adds slow_mo=1000 so each action can be followed on screen."
+        )
+
+        validation_scope = st.text_input(
+            "Validation scope (optional)",
+            placeholder="body",
+            help="CSS selector the anchor checks run against, e.g. main or #content. "
+                 "A narrower container than body makes each check cheaper on large pages."
+        )
+
+        slow_steps_file = st.file_uploader(
+            "slow_steps.json from a previous run (optional)",
+            type=["json"],
+            help="Found in the test_run_* folder of an adaptive run; used to give slow steps longer timeouts."
+        )
+
+        optimize_recording = st.checkbox(
+            "Remove redundant codegen steps before instrumenting",
+            value=False,
+            help="Drops click() right before fill() on the same field, Tab presses before a locator action, "
+                 "repeated gotos of the loaded URL and identical repeats of fill/hover/focus. "
+                 "The removed lines are shown as a diff."
+        )
+
+        parallel_flows = st.checkbox(
+            "Generate test cases per flow in parallel",
+            value=True,
+            help="Splits the function into flows (one per page.goto) and generates each flow's test cases concurrently."
+        )
+
+        drop_duplicates = st.checkbox(
+            "Drop near-duplicate test cases",
+            value=False,
+            help="Near-duplicates are always flagged in the 'Duplicate Of' column; enable to remove in-batch duplicates from the export."
+        )
+
+        reuse_stored = st.checkbox(
+            "Reuse stored test cases for a function seen before",
+            value=True,
+            help="Skips test case generation when this exact function is already in the repository."
+        )
+
+        export_format = st.selectbox(
+            "Test case export format",
+            options=list(WRITERS),
+            format_func=lambda f: WRITERS[f].label,
+            help="CSV, JSON Lines and Parquet are fastest; JUnit XML imports into CI and test management tools."
+        )
+
         submitted = st.form_submit_button(
             "🚀 Generate Runnable Test + Test Cases",
             use_container_width=True,
@@ -997,126 +836,195 @@ def main():
 
     # ---------------- Submission Handling ----------------
     if submitted:
-        if not code_input.strip():
-            st.error("⚠️ Please paste a Playwright codegen function first.")
-        else:
-            with st.spinner("🔄 Generating instrumented script & test cases..."):
-
-            # -------- 1. Generate runnable script --------
-                script_prompt = TRANSFORM_PROMPT.format(
-                    input_code=code_input.strip(),
-                    extra_context=extra_context.strip()
-                    if extra_context else "No extra context provided."
-                )
-    
-                script_agent = GroqAgent(
-                    system_prompt="You are a strict Playwright instrumentation engine. Output ONLY valid Python code. No explanations."
-                )
-    
-                script_response = asyncio.run(
-                    script_agent.generate(script_prompt)
-                )
-    
-                generated_code = clean_generated_code(script_response)
-    
-                # -------- 2. Generate test cases --------
-                testcase_prompt = TESTCASE_PLAN_PROMPT.format(
-                    input_code=code_input.strip(),
-                    extra_context=extra_context.strip()
-                    if extra_context else "No extra context provided."
-                )
-    
-                testcase_agent = GroqAgent(
-                    system_prompt="You generate structured QA test cases based strictly on the provided script."
-                )
-    
-                testcase_response = asyncio.run(
-                    testcase_agent.generate(testcase_prompt)
+        with trace("submit") as request_trace, profiled(profile_submissions):
+            noise = {}
+            with span("read_input"):
+                if code_file is not None:
+                    code_input = read_codegen_upload(code_file, stats=noise)
+                else:
+                    code_input = "\n".join(strip_codegen_noise(code_input.splitlines(), noise))
+            if optimize_recording:
+                recorded = textwrap.dedent(code_input)
+                with span("optimize_codegen"):
+                    code_input, changes = optimize_codegen(recorded)
+                if changes:
+                    with st.expander(f"✂️ Removed {len(changes)} redundant steps"):
+                        st.code(codegen_diff(recorded, code_input), language="diff")
+            if is_oversized(code_input):
+                st.info("📦 Large function: it will be instrumented in chunks and test cases generated per flow.")
+
+            if not code_input.strip():
+                st.error("⚠️ Please paste a Playwright codegen function first.")
+            else:
+                with st.spinner("🔄 Generating instrumented script & test cases..."):
+
+                # -------- 1. Generate runnable script --------
+                # -------- 2. Generate test cases (concurrently) --------
+                    store = get_testcase_store()
+                    code_hash = function_hash(code_input)
+                    stored_rows = store.latest_for_function(code_hash) if reuse_stored else []
+
+                    api = script_api.lower()
+                    step_timeouts = {}
+                    if slow_steps_file is not None:
+                        try:
+                            step_timeouts = calibrate_timeouts(load_slow_steps(slow_steps_file.getvalue()))
+                        except ValueError as e:
+                            st.warning(f"Ignoring slow_steps.json: {e}")
+                    script_options = {
+                        "api": api,
+                        "pacing": "watch" if pacing == "Watch mode" else "adaptive",
+                        "step_timeouts": step_timeouts,
+                        "validation_scope": validation_scope.strip() or None,
+                    }
+
+                    with routing_decisions() as decisions, span("generate"):
+                        generated_code, testcase_response = asyncio.run(generate_all(
+                            code_input.strip(), testcases=not stored_rows, fan_out=parallel_flows, **script_options
+                        ))
+
+
+                # -------- Display Generated Script --------
+                st.markdown('', unsafe_allow_html=True)
+                st.markdown('🎉 Generated Runnable Test Script', unsafe_allow_html=True)
+
+                st.code(generated_code, language="python", line_numbers=True)
+
+                if decisions:
+                    with st.expander(
+                        f"🔀 Model routing: {len(decisions)} calls, "
+                        f"${sum(d.cost_usd for d in decisions):.4f} estimated"
+                    ):
+                        st.dataframe(
+                            pd.DataFrame([d.as_dict() for d in decisions]),
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                        st.caption("All sessions since startup, per model:")
+                        st.dataframe(pd.DataFrame(get_model_router().summary()), use_container_width=True, hide_index=True)
+
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                script_filename = f"playwright_test_{timestamp}.py"
+
+                st.download_button(
+                    label="📥 Download Test Script (.py)",
+                    data=generated_code,
+                    file_name=script_filename,
+                    mime="text/x-python",
+                    on_click="ignore",
+                    use_container_width=True
                 )
 
-
-            # -------- Display Generated Script --------
-            st.markdown('', unsafe_allow_html=True)
-            st.markdown('🎉 Generated Runnable Test Script', unsafe_allow_html=True)
-
-            st.code(generated_code, language="python", line_numbers=True)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            script_filename = f"playwright_test_{timestamp}.py"
-
-            st.download_button(
-                label="📥 Download Test Script (.py)",
-                data=generated_code,
-                file_name=script_filename,
-                mime="text/x-python",
-                use_container_width=True
-            )
-
-            st.markdown("### 💡 How to run it")
-            st.code(
-                f"""# Install dependencies (once)
+                st.markdown("### 💡 How to run it")
+                st.code(
+                    f"""# Install dependencies (once)
 pip install playwright pandas openpyxl
 playwright install
 
 # Run the script
 python {script_filename}
 
+# Cross-browser sweep: chromium/firefox/webkit x viewport sizes, in parallel
+python script_runner.py matrix {script_filename} --headless
+
+# Re-run only the failed tests of a run, from their last passing step
+python script_runner.py rerun test_run_<TIMESTAMP> --resume
+
 # Output:
 # → Browser opens (visible)
 # → Steps logged with PASS/FAIL
 # → Excel report: test_results_*.xlsx
 """,
-                language="bash"
-            )
-
-            # -------- Display & Export Test Cases --------
-            st.markdown('', unsafe_allow_html=True)
-            st.markdown('📋 Generated Test Cases', unsafe_allow_html=True)
-
-            # Uses your existing function
-            parse_and_export_testcases(testcase_response)
-
-            # Preview parsed test cases (optional)
-            if (
-                'test_cases_list' in st.session_state
-                and st.session_state.test_cases_list
-            ):
-                df = pd.DataFrame(st.session_state.test_cases_list)
-
-                st.dataframe(
-                    df,
-                    column_config={
-                        "Step-by-step actions": st.column_config.TextColumn(width="medium"),
-                        "Expected Result": st.column_config.TextColumn(width="medium"),
-                        "Test Case Description": st.column_config.TextColumn(width="medium"),
-                    },
-                    use_container_width=True,
-                    hide_index=True
+                    language="bash"
                 )
 
-                # Download Excel
-                try:
-                    with open("cleaned_generated_test_cases.xlsx", "rb") as f:
+                # -------- Display & Export Test Cases --------
+                st.markdown('', unsafe_allow_html=True)
+                st.markdown('📋 Generated Test Cases', unsafe_allow_html=True)
+
+                if stored_rows:
+                    st.info(
+                        f"♻️ Reusing {len(stored_rows)} stored test cases for this function "
+                        f"(generated {stored_rows[0]['Created At']})"
+                    )
+                    test_cases = stored_rows
+                    with span("export_testcases"):
+                        testcase_export = export_testcases(stored_rows, fmt=export_format)
+                else:
+                    with span("export_testcases"):
+                        test_cases, testcase_export = parse_and_export_testcases(
+                            testcase_response, drop_duplicates=drop_duplicates, fmt=export_format
+                        )
+                    if testcase_export:
+                        with span("store.add_test_cases"):
+                            store.add_test_cases(code_hash, test_cases)
+
+                # Preview parsed test cases (optional)
+                if test_cases:
+                    with span("render.dataframe", rows=len(test_cases)):
+                        render_testcase_rows(test_cases)
+
+                    # Download the export
+                    writer = WRITERS[export_format]
+                    if testcase_export:
                         st.download_button(
-                            label="📥 Download Test Cases Excel",
-                            data=f,
-                            file_name=f"test_cases_{timestamp}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            label=f"📥 Download Test Cases {writer.label}",
+                            data=testcase_export,
+                            file_name=export_filename(f"test_cases_{timestamp}", export_format),
+                            mime=writer.mime,
+                            on_click="ignore",
                             use_container_width=True
                         )
-                except FileNotFoundError:
-                    st.warning("Excel file was not created successfully.")
-            else:
-                st.info("No structured test cases detected in response. Raw output:")
-                st.code(testcase_response, language="text")
+                    else:
+                        st.warning(f"{writer.label} file was not created successfully.")
+                else:
+                    st.info("No structured test cases detected in response. Raw output:")
+                    st.code(testcase_response, language="text")
+
+                # -------- Single zip: script, test cases, manifest --------
+                # Entry names carry no timestamp, so identical content maps to one cached zip
+                bundle_files = {"playwright_test.py": generated_code}
+                if testcase_export and test_cases:
+                    bundle_files[export_filename("test_cases", export_format)] = testcase_export
+                bundle_metadata = {
+                    "function_hash": code_hash,
+                    "script_api": api,
+                    "pacing": script_options["pacing"],
+                    "test_case_format": export_format,
+                    "test_cases": len(test_cases),
+                    "models": sorted({d.model for d in decisions}),
+                }
+                with span("bundle"):
+                    bundle = build_bundle(bundle_files, bundle_metadata)
+                bundle_filename = f"playwright_bundle_{timestamp}.zip"
+                st.download_button(
+                    label="📦 Download Bundle (.zip: script, test cases, manifest)",
+                    data=bundle,
+                    file_name=bundle_filename,
+                    mime="application/zip",
+                    on_click="ignore",
+                    type="primary",
+                    use_container_width=True
+                )
 
-            st.markdown('', unsafe_allow_html=True)
-            st.markdown(
-                """
-                ✅ Done! Download script and run locally. Test cases saved as Excel.
+                st.markdown('', unsafe_allow_html=True)
+                st.markdown(
+                    """
+                ✅ Done! Download the bundle (or script and test cases) and run locally.
                 """,
-                unsafe_allow_html=True
-            )
+                    unsafe_allow_html=True
+                )
+                remember_result(
+                    code_hash, generated_code, script_filename, test_cases,
+                    testcase_export, export_format, testcase_response, bundle, bundle_filename
+                )
+
+        render_trace(request_trace, save_traces)
+    elif st.session_state.get("last_result"):
+        render_last_result(st.session_state.last_result)
+
+    st.markdown("---")
+    render_testcase_repository()
 
 
 if __name__ == "__main__":
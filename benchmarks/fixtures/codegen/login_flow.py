@@ -0,0 +1,10 @@
+def test_login(page: Page) -> None:
+    page.goto("https://demo.example.com/login")
+    page.get_by_label("Username").click()
+    page.get_by_label("Username").fill("standard_user")
+    page.get_by_label("Password").fill("secret_sauce")
+    page.get_by_role("button", name="Login").click()
+    expect(page.locator("body")).to_contain_text("Products Sauce Labs Backpack Sauce Labs Bike Light Add to cart")
+    page.get_by_role("button", name="Open Menu").click()
+    page.get_by_role("link", name="Logout").click()
+    expect(page.locator("body")).to_contain_text("Username Password Login")
@@ -0,0 +1,21 @@
+def test_shop_checkout(page: Page) -> None:
+    page.goto("https://shop.example.com/")
+    page.get_by_placeholder("Search products").click()
+    page.get_by_placeholder("Search products").fill("running shoes")
+    page.get_by_placeholder("Search products").press("Enter")
+    expect(page.locator("body")).to_contain_text("Search results for running shoes Filter by size Sort by price")
+    page.get_by_role("link", name="Trail Runner 2").click()
+    page.get_by_label("Size").select_option("42")
+    page.get_by_role("button", name="Add to cart").click()
+    expect(page.locator("body")).to_contain_text("Added to your cart Trail Runner 2 Continue shopping")
+    page.goto("https://shop.example.com/cart")
+    page.get_by_role("spinbutton", name="Quantity").fill("2")
+    page.get_by_role("button", name="Update cart").click()
+    expect(page.locator("body")).to_contain_text("Your cart Subtotal (2 items) Proceed to checkout")
+    page.goto("https://shop.example.com/checkout")
+    page.get_by_label("Email").fill("buyer@example.com")
+    page.get_by_label("Full name").fill("Jane Buyer")
+    page.get_by_label("Address").fill("1 Market Street")
+    page.get_by_label("Postcode").fill("94105")
+    page.get_by_role("button", name="Place order").click()
+    expect(page.locator("body")).to_contain_text("Thank you for your order Order number Estimated delivery")
@@ -0,0 +1,125 @@
+"""
+Load generator for the generation path.
+
+Simulates N concurrent app sessions, each doing what a form submission does
+(script + test case generation, cleaning, parsing, Excel export), against the
+local fake LLM server. Each Streamlit session runs in its own thread, so the
+simulation uses one thread per session. Sweeping several concurrency levels
+shows where throughput stops scaling.
+
+    python benchmarks/loadtest.py --sessions 1,5,10,25 --latency-ms 400 --tokens-per-s 800
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8765 --sessions 20 --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pipeline  # noqa: E402
+from fake_llm_server import add_config_arguments, config_from_args, start_server  # noqa: E402
+from run_benchmarks import _percentile, load_fixture  # noqa: E402
+
+FIXTURES = ("login_flow", "shop_checkout")
+
+
+def run_session(code: str, workdir: str, fan_out: bool) -> dict:
+    """One simulated form submission; returns its latency and outcome."""
+    started = time.perf_counter()
+
+    async def generate_all():
+        return await asyncio.gather(
+            pipeline.generate_script(code),
+            pipeline.generate_testcases(code, fan_out=fan_out),
+        )
+
+    generated_code, testcase_response = asyncio.run(generate_all())
+    rows = pipeline.parse_testcases(testcase_response)
+    if rows:
+        pipeline.write_testcases_excel(rows, os.path.join(workdir, f"cases_{threading.get_ident()}.xlsx"))
+    ok = bool(generated_code) and bool(rows)
+    return {"latency": time.perf_counter() - started, "ok": ok}
+
+
+def _server_stats(base_url: str, reset_peak: bool = False) -> dict:
+    """Server counters; reset_peak restarts max_in_flight so it covers one level only."""
+    request = urllib.request.Request(f"{base_url}/stats/reset", data=b"") if reset_peak else f"{base_url}/stats"
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+
+def run_level(concurrency: int, rounds: int, base_url: str, fan_out: bool) -> dict:
+    codes = [load_fixture(name) for name in FIXTURES]
+    before = _server_stats(base_url, reset_peak=True)
+    total = concurrency * rounds
+    with tempfile.TemporaryDirectory() as workdir, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(lambda i: run_session(codes[i % len(codes)], workdir, fan_out), range(total)))
+        elapsed = time.perf_counter() - started
+    after = _server_stats(base_url)
+
+    latencies = sorted(r["latency"] for r in results)
+    return {
+        "concurrency": concurrency,
+        "sessions": total,
+        "errors": sum(1 for r in results if not r["ok"]),
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+        "rate_limited": after.get("rate_limited", 0) - before.get("rate_limited", 0),
+        "max_in_flight": after.get("max_in_flight", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent simulated sessions against a (fake) LLM endpoint")
+    parser.add_argument("--sessions", default="1,5,10,25", help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=2, help="Submissions per concurrent session")
+    parser.add_argument("--base-url", help="Use an already running server instead of starting one")
+    parser.add_argument("--stream", action="store_true", help="Request streamed completions")
+    parser.add_argument("--no-fan-out", action="store_true", help="Single test case prompt instead of per-flow fan-out")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_server(config=config_from_args(args))
+
+    pipeline.configure_client("fake-key", "fake-model", base_url=base_url, stream=args.stream)
+
+    try:
+        print(f"{'sessions':>8} {'total':>6} {'errors':>6} {'sess/s':>8} {'p50 s':>7} {'p95 s':>7} {'429s':>5} {'peak in-flight':>14}")
+        levels = []
+        for concurrency in (int(n) for n in args.sessions.split(",") if n.strip()):
+            level = run_level(concurrency, args.rounds, base_url, fan_out=not args.no_fan_out)
+            levels.append(level)
+            print(
+                f"{level['concurrency']:8d} {level['sessions']:6d} {level['errors']:6d} {level['throughput']:8.2f} "
+                f"{level['p50_s']:7.2f} {level['p95_s']:7.2f} {level['rate_limited']:5d} {level['max_in_flight']:14d}"
+            )
+    finally:
+        if server:
+            server.shutdown()
+
+    # Concurrency ceiling: the first level after which throughput gains less than 10%
+    for previous, current in zip(levels, levels[1:]):
+        if current["throughput"] < previous["throughput"] * 1.1:
+            print(f"\nThroughput plateaus at ~{previous['concurrency']} concurrent sessions "
+                  f"({previous['throughput']:.2f} sessions/s)")
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Hot-path benchmarks for the non-UI generation pipeline.
+
+Runs fully offline: LLM calls go to the local fake server, which replays the
+recorded responses in benchmarks/fixtures. Each benchmark reports
+throughput, latency percentiles and peak traced memory; results are saved
+under .benchmarks/ and compared against the previous run.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --iterations 50 --filter parse --fail-on-regression
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pipeline  # noqa: E402
+from codegen_optimizer import optimize_codegen  # noqa: E402
+from download_bundle import build_bundle  # noqa: E402
+from fake_llm_server import start_server  # noqa: E402
+from report_writers import WRITERS, export_filename  # noqa: E402
+from testcase_planner import describe_flow, extract_flows  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+RESULTS_DIR = os.path.join(ROOT, ".benchmarks")
+
+
+def load_fixture(name: str, kind: str = None) -> str:
+    if kind is None:
+        path = os.path.join(FIXTURES_DIR, "codegen", f"{name}.py")
+    else:
+        path = os.path.join(FIXTURES_DIR, "recorded", f"{name}.{kind}.txt")
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def scale_testcases(text: str, copies: int) -> str:
+    """Repeat a recorded test case response, renumbering TC-IDs, to get a batch-sized input."""
+    blocks = re.split(r'\n(?=\* High Level Feature:)', text.strip())[1:]
+    out, n = [], 0
+    for _ in range(copies):
+        for block in blocks:
+            n += 1
+            out.append(re.sub(r'TC-\d+', f'TC-{n}', block, count=1))
+    return "\n\n".join(out)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def bench(name, fn, iterations, warmup=2):
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Memory is measured on a separate call so tracing overhead doesn't skew timings
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "throughput_ops_s": iterations / elapsed if elapsed else 0.0,
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "p50_ms": 1000 * _percentile(latencies, 50),
+        "p95_ms": 1000 * _percentile(latencies, 95),
+        "p99_ms": 1000 * _percentile(latencies, 99),
+        "peak_mem_kb": peak / 1024,
+    }
+
+
+def build_benchmarks(workdir: str, base_url: str):
+    login_code = load_fixture("login_flow")
+    shop_code = load_fixture("shop_checkout")
+    login_raw = load_fixture("login_flow", "transform")
+    shop_raw = load_fixture("shop_checkout", "transform")
+    shop_cases = load_fixture("shop_checkout", "testcases")
+    large_cases = scale_testcases(shop_cases, 40)
+    small_rows = pipeline.parse_testcases(shop_cases)
+    large_rows = pipeline.parse_testcases(large_cases)
+    xlsx_path = os.path.join(workdir, "bench_test_cases.xlsx")
+
+    large_workbook = io.BytesIO()
+    pipeline.write_testcases_excel(large_rows, large_workbook)
+    bundle_files = {"playwright_test.py": shop_raw, "test_cases.xlsx": large_workbook.getvalue()}
+
+    def prompt_format():
+        pipeline.build_transform_prompt(shop_code)
+        flows = extract_flows(shop_code)
+        for i, flow in enumerate(flows, start=1):
+            pipeline.TESTCASE_FLOW_PROMPT.format(
+                input_code=shop_code,
+                flow_number=i,
+                flow_count=len(flows),
+                flow_summary=describe_flow(flow),
+                flow_code=flow["code"],
+            )
+
+    pipeline.configure_client("fake-key", "fake-model", base_url=base_url)
+
+    def submit_path(code):
+        async def generate_all():
+            return await asyncio.gather(
+                pipeline.generate_script(code),
+                pipeline.generate_testcases(code),
+            )
+
+        def run():
+            generated_code, testcase_response = asyncio.run(generate_all())
+            rows = pipeline.parse_testcases(testcase_response)
+            pipeline.write_testcases_excel(rows, xlsx_path)
+        return run
+
+    return [
+        ("clean_generated_code[login]", lambda: pipeline.clean_generated_code(login_raw)),
+        ("clean_generated_code[shop]", lambda: pipeline.clean_generated_code(shop_raw)),
+        ("clean_generated_code[shop x20]", lambda: pipeline.clean_generated_code(shop_raw * 20)),
+        ("parse_testcases[12]", lambda: pipeline.parse_testcases(shop_cases)),
+        ("parse_testcases[480]", lambda: pipeline.parse_testcases(large_cases)),
+        ("write_testcases_excel[12]", lambda: pipeline.write_testcases_excel(small_rows, xlsx_path)),
+        ("write_testcases_excel[480]", lambda: pipeline.write_testcases_excel(large_rows, xlsx_path)),
+        *[
+            (f"write_testcases[480, {fmt}]", lambda fmt=fmt: pipeline.write_testcases(
+                large_rows, os.path.join(workdir, export_filename("bench_test_cases", fmt)), fmt))
+            for fmt in WRITERS if fmt != "xlsx"
+        ],
+        ("build_bundle[shop, 480]", lambda: build_bundle(bundle_files, {"test_cases": len(large_rows)})),
+        ("prompt_format[shop]", prompt_format),
+        ("optimize_codegen[shop]", lambda: optimize_codegen(shop_code)),
+        ("submit_path[login]", submit_path(login_code)),
+        ("submit_path[shop]", submit_path(shop_code)),
+    ]
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    sha = _git_sha()
+    path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{sha}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": sha,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+    return path
+
+
+def previous_results(exclude: str = None):
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+    if not paths:
+        return None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def report(results, baseline=None, threshold=0.15):
+    """Print a results table; returns the names of benchmarks whose p50 regressed past `threshold`."""
+    before = {r["name"]: r for r in (baseline or {}).get("results", [])}
+    regressions = []
+    header = f"{'benchmark':34} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>10} {'vs prev':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        delta = ""
+        prev = before.get(r["name"])
+        if prev and prev["p50_ms"]:
+            change = (r["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"]
+            delta = f"{change:+.0%}"
+            if change > threshold:
+                regressions.append(r["name"])
+                delta += " !"
+        print(
+            f"{r['name']:34} {r['throughput_ops_s']:10.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+            f"{r['p99_ms']:9.2f} {r['peak_mem_kb']:10.0f} {delta:>9}"
+        )
+    if baseline:
+        print(f"\nCompared with commit {baseline.get('commit')} ({baseline.get('timestamp')})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the non-UI generation pipeline offline")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--threshold", type=float, default=0.15, help="p50 slowdown counted as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Do not store results under .benchmarks/")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = [
+                bench(name, fn, args.iterations)
+                for name, fn in build_benchmarks(workdir, base_url)
+                if args.filter in name
+            ]
+    finally:
+        server.shutdown()
+
+    saved = None if args.no_save else save_results(results)
+    regressions = report(results, previous_results(exclude=saved), args.threshold)
+    if saved:
+        print(f"Results saved to {os.path.relpath(saved, ROOT)}")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
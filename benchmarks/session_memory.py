@@ -0,0 +1,118 @@
+"""
+Memory held by per-session results across many app sessions.
+
+Simulates N sessions, each submitting one of `--distinct` codegen functions
+(several sessions often generate for the same function, or get stored test
+cases back) and keeping its results until the end, as Streamlit sessions
+do between reruns. Compares what stays allocated when every session keeps
+its own row dicts and export bytes in st.session_state against the shared
+ResultCache, with and without a budget. Runs offline from the recorded
+fixtures; memory is measured with tracemalloc.
+
+    python benchmarks/session_memory.py
+    python benchmarks/session_memory.py --sessions 100 --distinct 20 --copies 40 --budget-mb 1
+"""
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pipeline  # noqa: E402
+from run_benchmarks import load_fixture, scale_testcases  # noqa: E402
+from session_store import ResultCache, SessionResult  # noqa: E402
+
+FIXTURES = ("login_flow", "shop_checkout")
+
+
+def build_submissions(distinct: int, copies: int) -> list:
+    """(script, test case response) per distinct function; sizes vary so every function has its own content."""
+    submissions = []
+    for i in range(distinct):
+        name = FIXTURES[i % len(FIXTURES)]
+        script = pipeline.clean_generated_code(load_fixture(name, "transform")) + f"\n# function {i}\n"
+        response = scale_testcases(load_fixture(name, "testcases"), copies + i)
+        submissions.append((script, response))
+    return submissions
+
+
+def session_output(submission, fmt: str):
+    """What one submission produces: fresh parsed rows and export bytes, as in the app."""
+    script, response = submission
+    rows = pipeline.parse_testcases(response)
+    buffer = io.BytesIO()
+    pipeline.write_testcases(rows, buffer, fmt)
+    return script, rows, buffer.getvalue()
+
+
+def simulate(mode: str, submissions: list, sessions: int, fmt: str, budget_mb: float = None) -> dict:
+    """Run `sessions` submissions; returns retained memory and, for the cache, what a rerun of each session finds."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    states = []
+    cache = ResultCache(int(budget_mb * 1024 * 1024)) if mode == "cache" and budget_mb else ResultCache(1 << 62)
+    for i in range(sessions):
+        script, rows, export = session_output(submissions[i % len(submissions)], fmt)
+        if mode == "session_state":
+            states.append({"test_cases_list": rows, "testcase_export": export})
+        else:
+            states.append(SessionResult(
+                function_hash=str(i % len(submissions)),
+                script=cache.put(script),
+                rows=cache.put_rows(rows),
+                export=cache.put(export),
+                export_format=fmt,
+            ))
+        del script, rows, export
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "mode": mode if mode == "session_state" else f"cache ({budget_mb:g} MB)" if budget_mb else "cache (no budget)",
+        "retained_mb": retained / 1024 / 1024,
+        "peak_mb": peak / 1024 / 1024,
+        "per_session_kb": retained / 1024 / sessions,
+        "elapsed_s": elapsed,
+        "evictions": 0,
+        "rerun_hits": sessions,
+    }
+    if mode == "cache":
+        result["evictions"] = cache.counters["evictions"]
+        result["rerun_hits"] = sum(1 for state in states if cache.get(state.rows) is not None)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retained memory of per-session results across simulated sessions")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct codegen functions submitted")
+    parser.add_argument("--copies", type=int, default=20, help="Test case batch size, in copies of the recorded response")
+    parser.add_argument("--format", default="csv", help="Test case export format kept per session")
+    parser.add_argument("--budget-mb", type=float, default=2.0, help="ResultCache budget for the bounded run")
+    args = parser.parse_args()
+
+    submissions = build_submissions(args.distinct, args.copies)
+    runs = [
+        simulate("session_state", submissions, args.sessions, args.format),
+        simulate("cache", submissions, args.sessions, args.format),
+        simulate("cache", submissions, args.sessions, args.format, args.budget_mb),
+    ]
+    print(f"{args.sessions} sessions, {args.distinct} distinct functions, {args.format} exports")
+    print(f"{'mode':<22} {'retained MB':>11} {'peak MB':>8} {'KB/session':>10} {'evicted':>8} {'rerun hits':>10}")
+    for run in runs:
+        print(
+            f"{run['mode']:<22} {run['retained_mb']:11.1f} {run['peak_mb']:8.1f} {run['per_session_kb']:10.1f} "
+            f"{run['evictions']:8d} {run['rerun_hits']:10d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
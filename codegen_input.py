@@ -0,0 +1,128 @@
+"""
+Large codegen recordings: streaming upload, noise stripping and chunking.
+
+Uploaded files are decoded and filtered line by line, so a recording of
+thousands of lines never exists as more than the kept lines. The filter
+only collapses runs of blank lines; recorded actions are never dropped
+here (repeated actions are removed by the opt-in codegen_optimizer pass,
+which shows the user a diff). Functions still too large for one prompt are
+split into top-level statement chunks at navigation boundaries for chunked
+instrumentation.
+"""
+import ast
+import io
+import textwrap
+
+from model_router import estimate_tokens
+from testcase_planner import _find_function
+
+# Prompt budget for the codegen function itself; TRANSFORM_PROMPT adds ~5k tokens
+MAX_INPUT_TOKENS = 6_000
+CHUNK_TOKENS = 3_000
+
+
+def strip_codegen_noise(lines, stats: dict = None):
+    """
+    Yield `lines` without consecutive blank lines. Counts go into `stats`
+    if given.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("lines", 0)
+    stats.setdefault("dropped", 0)
+    previous = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stats["lines"] += 1
+        stripped = line.strip()
+        if not stripped and previous == "":
+            stats["dropped"] += 1
+            continue
+        previous = stripped
+        yield line
+
+
+def read_codegen_upload(stream, encoding: str = "utf-8", stats: dict = None) -> str:
+    """Decode a binary file-like object line by line through strip_codegen_noise()."""
+    text = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline=None)
+    try:
+        return "\n".join(strip_codegen_noise(text, stats)).strip() + "\n"
+    finally:
+        # Leave the caller's stream open (TextIOWrapper would close it)
+        text.detach()
+
+
+def is_oversized(source: str, limit: int = MAX_INPUT_TOKENS) -> bool:
+    return estimate_tokens(source) > limit
+
+
+def split_function(source: str, chunk_tokens: int = CHUNK_TOKENS):
+    """
+    (header, chunks) for chunked instrumentation, or None if `source` has no
+    parseable function. `header` is the function's def line(s); each chunk is
+    a dedented run of its top-level statements, cut preferably before a
+    page.goto once the chunk is half full. Compound statements (with, for,
+    if, try) stay whole, so e.g. `with page.expect_popup() as info:` keeps
+    the block that uses it.
+    """
+    source = textwrap.dedent(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    function = _find_function(tree)
+    if function is None or not function.body:
+        return None
+
+    lines = source.splitlines()
+    header = "\n".join(lines[function.lineno - 1:function.body[0].lineno - 1])
+
+    chunks, current, size = [], [], 0
+    for stmt in function.body:
+        segment = textwrap.dedent("\n".join(lines[stmt.lineno - 1:stmt.end_lineno]))
+        tokens = estimate_tokens(segment)
+        is_goto = any(
+            isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and n.func.attr == "goto"
+            for n in ast.walk(stmt)
+        )
+        if current and (size + tokens > chunk_tokens or (is_goto and size >= chunk_tokens // 2)):
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(segment)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return header, chunks
+
+
+def function_with_body(header: str, body: str) -> str:
+    """Rebuild a function from its def line(s) and dedented statements."""
+    return f"{header}\n{textwrap.indent(body, '    ')}\n"
+
+
+def splice_into_function(script: str, function_name: str, blocks) -> str:
+    """
+    Append instrumented statement `blocks` to the end of `function_name` in
+    `script`, re-indented to the function body, before its trailing return
+    if it has one (async test coroutines end in `return step_timings`).
+    Returns `script` unchanged if the function cannot be found.
+    """
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return script
+    target = next(
+        (n for n in ast.walk(tree)
+         if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == function_name),
+        None,
+    )
+    if target is None:
+        return script
+    lines = script.splitlines()
+    indent = " " * target.body[0].col_offset
+    added = [textwrap.indent(textwrap.dedent(b).strip("\n"), indent) for b in blocks if b.strip()]
+    last = target.body[-1]
+    if isinstance(last, ast.Return):
+        lines[last.lineno - 1:last.lineno - 1] = [*"\n\n".join(added).splitlines(), ""]
+    else:
+        lines[target.end_lineno:target.end_lineno] = ["", *"\n\n".join(added).splitlines()]
+    return "\n".join(lines) + "\n"
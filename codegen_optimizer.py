@@ -0,0 +1,139 @@
+"""
+Optional ast pass that removes redundant codegen steps before instrumentation.
+
+Every recorded statement becomes a full try/except block with screenshots,
+so steps that do nothing for the flow cost prompt tokens, script size and
+runtime. The pass drops:
+
+- a click() immediately followed by fill() on the same locator (fill
+  focuses the field itself)
+- runs of press("Tab") right before an action on an explicit locator (the
+  action targets its own element, so keyboard focus moves are moot)
+- a goto() of the URL already loaded by the previous goto() when only
+  assertions and waits happen in between
+- an exact repeat of the previous statement for idempotent actions
+  (goto, fill, hover, focus with identical arguments); repeated clicks,
+  checks and selections are real steps ("+" pressed twice) and stay
+
+Only whole statements are removed; everything else keeps its text, so the
+result can be shown to the user as a diff.
+"""
+import ast
+import difflib
+import textwrap
+
+from testcase_planner import _find_function, _flatten
+
+LOCATOR_ACTIONS = {
+    "click", "dblclick", "fill", "check", "uncheck", "select_option", "set_input_files",
+    "hover", "tap", "press_sequentially", "set_checked",
+}
+# Actions whose identical immediate repeat changes nothing
+IDEMPOTENT_ACTIONS = {"goto", "fill", "hover", "focus"}
+# Statements that neither navigate nor change page state
+PASSIVE_METHODS = {"wait_for_load_state", "wait_for_url", "wait_for_selector", "wait_for_timeout", "screenshot"}
+
+
+def _action(stmt):
+    """(target source, method, first argument value) for `<target>.<method>(...)` statements."""
+    if not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)):
+        return None
+    call = stmt.value
+    if not isinstance(call.func, ast.Attribute):
+        return None
+    arg = call.args[0].value if call.args and isinstance(call.args[0], ast.Constant) else None
+    target = ast.dump(call.func.value)
+    if isinstance(call.func.value, ast.Name) and call.func.attr != "goto":
+        # page.click("#id") style: the selector is the first argument
+        target += ast.dump(call.args[0]) if call.args else ""
+    return target, call.func.attr, arg
+
+
+def _is_passive(stmt) -> bool:
+    action = _action(stmt)
+    if action is None:
+        return False
+    _, method, _ = action
+    return method in PASSIVE_METHODS or method.startswith(("to_", "not_to_"))
+
+
+def _normalize_url(url) -> str:
+    return str(url).rstrip("/") if url is not None else None
+
+
+def _removals(statements, source: str):
+    """(statement, reason) pairs for redundant statements, in source order."""
+    removals = []
+    actions = [_action(s) for s in statements]
+    last_goto, passive_since_goto = None, True
+
+    for i, (stmt, action) in enumerate(zip(statements, actions)):
+        following = actions[i + 1] if i + 1 < len(actions) else None
+        label = (ast.get_source_segment(source, stmt) or "").strip()
+
+        if action and action[1] in IDEMPOTENT_ACTIONS and i and ast.dump(stmt) == ast.dump(statements[i - 1]):
+            removals.append((stmt, f"repeated {action[1]} with identical arguments: {label}"))
+            continue
+
+        if action and action[1] == "click" and following and following[1] == "fill" and following[0] == action[0]:
+            removals.append((stmt, f"click before fill on the same locator: {label}"))
+            continue
+
+        if action and action[1] == "press" and action[2] == "Tab":
+            j = i + 1
+            while j < len(actions) and actions[j] and actions[j][1] == "press" and actions[j][2] == "Tab":
+                j += 1
+            if j < len(actions) and actions[j] and actions[j][1] in LOCATOR_ACTIONS:
+                removals.append((stmt, f"Tab press before a locator action: {label}"))
+                continue
+
+        if action and action[1] == "goto":
+            url = _normalize_url(action[2])
+            if url is not None and url == last_goto and passive_since_goto:
+                removals.append((stmt, f"repeated goto of the loaded URL: {label}"))
+                continue
+            last_goto, passive_since_goto = url, True
+        elif not _is_passive(stmt):
+            passive_since_goto = False
+    return removals
+
+
+def optimize_codegen(source: str):
+    """
+    (optimized source, list of human-readable changes). Unparseable input
+    is returned unchanged.
+    """
+    source = textwrap.dedent(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source, []
+    function = _find_function(tree)
+    statements = list(_flatten(function.body if function else tree.body))
+    removals = _removals(statements, source)
+
+    # Never empty a block: keep the last statement of a body that would be emptied
+    removed = {id(stmt) for stmt, _ in removals}
+    for node in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            body = getattr(node, field, None)
+            if isinstance(body, list) and body and all(id(child) in removed for child in body):
+                removed.discard(id(body[-1]))
+    removals = [(stmt, reason) for stmt, reason in removals if id(stmt) in removed]
+
+    lines = source.splitlines()
+    drop = set()
+    for stmt, _ in removals:
+        drop.update(range(stmt.lineno - 1, stmt.end_lineno))
+    optimized = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+    if source.endswith("\n"):
+        optimized += "\n"
+    return optimized, [reason for _, reason in removals]
+
+
+def codegen_diff(before: str, after: str) -> str:
+    """Unified diff of the optimisation, for display."""
+    return "".join(difflib.unified_diff(
+        before.splitlines(keepends=True), after.splitlines(keepends=True),
+        fromfile="recorded", tofile="optimized",
+    ))
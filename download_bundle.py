@@ -0,0 +1,44 @@
+"""
+Single zip download of everything one generation produced.
+
+The bundle is built in memory: each entry is written straight from the
+bytes the app already holds (no temporary files, no re-reading exports
+from disk) and a manifest.json lists every entry with its size and
+SHA-256. The UI keeps the zip only in the session result cache, so reruns
+hand the same bytes back instead of recompressing.
+"""
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _as_bytes(data) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+
+def build_bundle(files: dict, metadata: dict = None) -> bytes:
+    """
+    Zip `files` ({archive name: str or bytes}) plus a manifest into memory.
+    Text entries are stored UTF-8 encoded; already compressed formats
+    (.xlsx, .parquet) are stored without recompressing.
+    """
+    entries = []
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            data = _as_bytes(data)
+            compress = zipfile.ZIP_STORED if name.endswith((".xlsx", ".parquet", ".zip")) else zipfile.ZIP_DEFLATED
+            archive.writestr(name, data, compress_type=compress)
+            entries.append({"name": name, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()})
+
+        manifest = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            **(metadata or {}),
+            "files": entries,
+        }
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, default=str))
+    return buffer.getvalue()
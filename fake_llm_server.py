@@ -0,0 +1,306 @@
+"""
+Local Groq/OpenAI-compatible chat completions stub.
+
+Replays recorded TRANSFORM_PROMPT / TESTCASE_PLAN_PROMPT responses so the
+generation path can be benchmarked and load-tested offline, with
+configurable latency, token throughput, streaming (SSE) and injected 429s.
+Point the app at it with `groq_base_url` in secrets (or GROQ_BASE_URL), or
+configure_client(api_key, model, base_url="http://127.0.0.1:<port>").
+
+    python fake_llm_server.py --port 8765 --latency-ms 300 --tokens-per-s 500 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures")
+
+
+class Recordings:
+    """
+    Recorded responses keyed by prompt kind ("transform" or "testcases").
+
+    Each fixture is a codegen function in <dir>/codegen/<name>.py with its
+    responses in <dir>/recorded/<name>.<kind>.txt. A request is matched to
+    the fixture whose first statement appears in the prompt.
+    """
+
+    def __init__(self, fixtures_dir: str = DEFAULT_RECORDINGS_DIR):
+        self.fixtures = []
+        codegen_dir = os.path.join(fixtures_dir, "codegen")
+        for filename in sorted(os.listdir(codegen_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext != ".py":
+                continue
+            with open(os.path.join(codegen_dir, filename), encoding="utf-8") as f:
+                statements = [l.strip() for l in f if l.strip() and not l.lstrip().startswith("def ")]
+            responses = {}
+            for kind in ("transform", "testcases"):
+                path = os.path.join(fixtures_dir, "recorded", f"{name}.{kind}.txt")
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        responses[kind] = f.read()
+            self.fixtures.append({"name": name, "marker": statements[0] if statements else "", "responses": responses})
+
+    @staticmethod
+    def kind(messages) -> str:
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        return "transform" if "instrumentation" in system.lower() else "testcases"
+
+    def pick(self, messages) -> str:
+        kind = self.kind(messages)
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        candidates = [f for f in self.fixtures if kind in f["responses"]]
+        if not candidates:
+            return ""
+        matched = next((f for f in candidates if f["marker"] and f["marker"] in prompt), candidates[0])
+        return matched["responses"][kind]
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 0.0       # time to first token
+    jitter_ms: float = 0.0        # uniform +/- jitter added to latency_ms
+    tokens_per_s: float = 0.0     # decode speed; 0 means instantaneous
+    error_rate: float = 0.0       # probability of answering 429
+    error_every: int = 0          # additionally answer 429 on every Nth request
+    retry_after_s: float = 1.0
+
+
+class ServerStats:
+    """Request counters, served as JSON on GET /stats; POST /stats/reset restarts the in-flight peak."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.streamed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def begin(self) -> int:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.requests
+
+    def end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reset_peak(self):
+        """Start a new max_in_flight measurement from the requests in flight now."""
+        with self._lock:
+            self.max_in_flight = self.in_flight
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "streamed": self.streamed,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def _split_tokens(content: str) -> list:
+    """Approximate tokenisation: words with their leading whitespace."""
+    return re.findall(r'\s*\S+|\s+', content)
+
+
+def _completion_body(model: str, content: str, prompt_chars: int) -> dict:
+    prompt_tokens, completion_tokens = prompt_chars // 4, len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk_body(completion_id: str, model: str, delta: dict, finish_reason=None) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats.as_dict())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def _rate_limited(self, request_number: int) -> bool:
+        config = self.server.config
+        if config.error_every and request_number % config.error_every == 0:
+            return True
+        return config.error_rate > 0 and random.random() < config.error_rate
+
+    def do_POST(self):
+        if self.path.rstrip("/") == "/stats/reset":
+            self.server.stats.reset_peak()
+            self._send_json(200, self.server.stats.as_dict())
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config, stats = self.server.config, self.server.stats
+        request_number = stats.begin()
+        try:
+            if self._rate_limited(request_number):
+                stats.incr("rate_limited")
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (injected by fake server)", "type": "tokens", "code": "rate_limit_exceeded"}},
+                    headers={"Retry-After": f"{config.retry_after_s:g}"},
+                )
+                return
+
+            messages = request.get("messages", [])
+            content = self.server.recordings.pick(messages)
+            prompt_chars = sum(len(m.get("content", "")) for m in messages)
+            model = request.get("model", "fake-model")
+
+            latency = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(0.0, latency) / 1000)
+
+            if request.get("stream"):
+                stats.incr("streamed")
+                self._stream(model, content, prompt_chars)
+                return
+
+            if config.tokens_per_s:
+                time.sleep(len(_split_tokens(content)) / config.tokens_per_s)
+            self._send_json(200, _completion_body(model, content, prompt_chars))
+        finally:
+            stats.end()
+
+    def _stream(self, model: str, content: str, prompt_chars: int):
+        """Server-sent events in the OpenAI/Groq chunk format, paced at tokens_per_s."""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        tokens_per_s = self.server.config.tokens_per_s
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(body):
+            self.wfile.write(b"data: " + json.dumps(body).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        send(_chunk_body(completion_id, model, {"role": "assistant", "content": ""}))
+        for token in _split_tokens(content):
+            if tokens_per_s:
+                time.sleep(1 / tokens_per_s)
+            send(_chunk_body(completion_id, model, {"content": token}))
+        final = _chunk_body(completion_id, model, {}, finish_reason="stop")
+        final["x_groq"] = {"usage": _completion_body(model, content, prompt_chars)["usage"]}
+        send(final)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def _make_server(host: str, port: int, recordings: Recordings = None, config: FakeLLMConfig = None):
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.recordings = recordings or Recordings()
+    server.config = config or FakeLLMConfig()
+    server.stats = ServerStats()
+    return server
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, recordings: Recordings = None, config: FakeLLMConfig = None):
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    server = _make_server(host, port, recordings, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Server behaviour flags, shared with the load generator."""
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on latency")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="Decode speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of answering 429")
+    parser.add_argument("--error-every", type=int, default=0, help="Answer 429 on every Nth request")
+    parser.add_argument("--retry-after-s", type=float, default=1.0, help="Retry-After sent with 429s")
+
+
+def config_from_args(args) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        error_every=args.error_every,
+        retry_after_s=args.retry_after_s,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq/OpenAI-compatible server replaying recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=DEFAULT_RECORDINGS_DIR, help="Directory with codegen/ and recorded/")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = _make_server(args.host, args.port, Recordings(args.fixtures), config_from_args(args))
+    print(f"Fake LLM server on http://{args.host}:{args.port} ({len(server.recordings.fixtures)} fixtures)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Per-task model routing for GroqAgent.
+
+Requests start on the fastest model unless the prompt is too large for it
+for that kind of task; an agent escalates to the next, larger model only
+when its output fails validation (for generated scripts: `ast.parse`).
+Every call is recorded as a RoutingDecision with its latency and estimated
+cost, both per request (routing_decisions()) and aggregated per model.
+"""
+import contextvars
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+FAST_MODEL = "llama-3.1-8b-instant"
+
+# USD per 1M (input, output) tokens, from the Groq price list; unknown models cost 0
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "openai/gpt-oss-20b": (0.075, 0.30),
+    "openai/gpt-oss-120b": (0.15, 0.60),
+    "meta-llama/llama-4-scout-17b-16e-instruct": (0.11, 0.34),
+}
+
+# Largest prompt (in estimated tokens) sent to the fastest model per task.
+# Mechanical instrumentation holds up on a small model for longer inputs
+# than test case prose does.
+FAST_TIER_LIMITS = {
+    "transform": 12_000,
+    "testcases": 6_000,
+}
+
+CHARS_PER_TOKEN = 4
+
+_decisions = contextvars.ContextVar("routing_decisions", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class RoutingDecision:
+    task: str
+    model: str
+    tier: int
+    reason: str              # "fast", "size" or "escalated"
+    prompt_tokens: int
+    completion_tokens: int = 0
+    latency_s: float = 0.0
+    cost_usd: float = 0.0
+    outcome: str = ""        # "ok", "invalid" or "error"
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@contextmanager
+def routing_decisions():
+    """
+    Collect the decisions made while the block runs (including in tasks and
+    threads started from it, which inherit the context).
+    """
+    decisions = []
+    token = _decisions.set(decisions)
+    try:
+        yield decisions
+    finally:
+        _decisions.reset(token)
+
+
+class ModelRouter:
+    """Ordered model tiers, fastest first, plus per-model running totals."""
+
+    def __init__(self, models, fast_limits: dict = None):
+        self.models = list(dict.fromkeys(m for m in models if m))
+        if not self.models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.fast_limits = dict(FAST_TIER_LIMITS if fast_limits is None else fast_limits)
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def route(self, task: str, prompt: str):
+        """(tier index, reason) to start a request at."""
+        if len(self.models) > 1 and estimate_tokens(prompt) > self.fast_limits.get(task, float("inf")):
+            return 1, "size"
+        return 0, "fast"
+
+    def record(self, decision: RoutingDecision):
+        with self._lock:
+            totals = self._totals.setdefault(decision.model, {"calls": 0, "latency_s": 0.0, "cost_usd": 0.0, "escalations": 0})
+            totals["calls"] += 1
+            totals["latency_s"] += decision.latency_s
+            totals["cost_usd"] += decision.cost_usd
+            totals["escalations"] += decision.reason == "escalated"
+        collected = _decisions.get()
+        if collected is not None:
+            collected.append(decision)
+
+    def summary(self) -> list:
+        """Per-model calls, mean latency and total estimated cost since startup."""
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "calls": t["calls"],
+                    "mean_latency_s": t["latency_s"] / t["calls"],
+                    "total_cost_usd": t["cost_usd"],
+                    "escalated_to": t["escalations"],
+                }
+                for model, t in self._totals.items()
+            ]
@@ -0,0 +1,137 @@
+"""
+Local anchor extraction for page validation.
+
+TRANSFORM_PROMPT used to ask the model to pick 3-6 anchor phrases from each
+expect(...).to_contain_text(...) text and re-check them with a fresh
+re.compile(...) on the whole body after every step. The anchors are now
+extracted here, once per distinct text, and emitted as module-level
+precompiled patterns (one combined pattern per text, so a check is a single
+to_contain_text poll). A validation plan says which step checks which
+pattern: only the step where the active anchor set changes, i.e. the action
+that brings the expected page up.
+"""
+import ast
+import re
+from functools import lru_cache
+
+from testcase_planner import _find_function, _flatten
+
+MAX_ANCHORS = 6
+MAX_ANCHOR_WORDS = 5
+DEFAULT_VALIDATION_SCOPE = "body"
+
+# Boundaries inside concatenated innerText: "HutsA-30", "KarachiFull-day",
+# bullets, digits and punctuation
+_CAMEL_JOIN = re.compile(r'(?<=[a-z])(?=[A-Z])')
+_SEPARATORS = re.compile(r"[^A-Za-z'&\- ]+|\s{2,}|(?<=\w)-(?=\d)|(?<=\d)-(?=\w)")
+
+
+def _labels(segment: str):
+    """Split "running shoes Filter by size" where a capitalised word follows a lowercase one."""
+    label = []
+    for word in segment.split():
+        if label and word[0].isupper() and label[-1].islower():
+            yield label
+            label = []
+        label.append(word)
+    if label:
+        yield label
+
+
+@lru_cache(maxsize=1024)
+def extract_anchors(text: str, max_anchors: int = MAX_ANCHORS) -> tuple:
+    """Short human-readable phrases from an expected page text, in page order."""
+    anchors, seen = [], set()
+    for segment in _SEPARATORS.split(_CAMEL_JOIN.sub("\n", text)):
+        for label in _labels(segment):
+            words = " ".join(label).strip(" -'&").split()[:MAX_ANCHOR_WORDS]
+            if not any(len(w) >= 3 and w.isalpha() for w in words):
+                continue
+            if len(words) == 1 and words[0].islower():
+                continue  # sentence debris like "items" from "(2 items)"
+            phrase = " ".join(words)
+            if phrase.lower() not in seen:
+                seen.add(phrase.lower())
+                anchors.append(phrase)
+    return tuple(anchors[:max_anchors])
+
+
+def anchor_pattern(anchors) -> str:
+    """One regex that matches only when every anchor is present, in any order."""
+    return "".join(
+        r"(?=[\s\S]*?" + r"\s+".join(re.escape(w) for w in anchor.split()) + ")"
+        for anchor in anchors
+    )
+
+
+def _expected_text(stmt):
+    """The literal passed to expect(...).to_contain_text("...") in `stmt`, if any."""
+    for node in ast.walk(stmt):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "to_contain_text"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            return node.args[0].value
+    return None
+
+
+@lru_cache(maxsize=256)
+def anchor_plan(source: str) -> tuple:
+    """
+    (constants, validations) for a codegen function.
+
+    constants: (name, anchors, pattern) per distinct anchor set.
+    validations: (statement source, name) for the action right before each
+    to_contain_text, i.e. the step that brings that text's page up and so
+    changes the active anchor set; a repeat of the active set is skipped.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return (), ()
+    function = _find_function(tree)
+    statements = list(_flatten(function.body if function else tree.body))
+
+    constants, names, validations = [], {}, []
+    active = None
+    for previous, stmt in zip([None] + statements, statements):
+        text = _expected_text(stmt)
+        if text is None:
+            continue
+        anchors = extract_anchors(text)
+        if not anchors:
+            continue
+        if anchors not in names:
+            names[anchors] = f"ANCHORS_{len(names) + 1}"
+            constants.append((names[anchors], anchors, anchor_pattern(anchors)))
+        if names[anchors] != active and previous is not None:
+            validations.append((ast.get_source_segment(source, previous) or "", names[anchors]))
+        active = names[anchors]
+    return tuple(constants), tuple(validations)
+
+
+def format_anchor_constants(source: str, scope: str = DEFAULT_VALIDATION_SCOPE) -> str:
+    """Module-level constants block to paste into the generated script."""
+    constants, _ = anchor_plan(source)
+    lines = [f"VALIDATION_SCOPE = {scope!r}"]
+    for name, anchors, pattern in constants:
+        lines.append(f"# {', '.join(anchors)}")
+        literal = f'r"{pattern}"' if '"' not in pattern else repr(pattern)
+        lines.append(f"{name} = re.compile({literal}, re.IGNORECASE)")
+    return "\n".join(lines)
+
+
+def format_validation_plan(source: str, within: str = None) -> str:
+    """The plan as prompt text, limited to statements that occur in `within` (a chunk of `source`)."""
+    _, validations = anchor_plan(source)
+    if within is not None:
+        validations = [(statement, name) for statement, name in validations if statement in within]
+    # A repeated statement -> set pair needs stating only once
+    validations = list(dict.fromkeys(validations))
+    if not validations:
+        return "    (no anchor sets: no step validates anchors)"
+    return "\n".join(f"    {statement}\n        -> {name}" for statement, name in validations)
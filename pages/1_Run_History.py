@@ -0,0 +1,105 @@
+"""
+Run History: flaky steps, failure rates and step-duration trends across
+every ingested test_run_* folder (see run_history.py).
+"""
+import io
+import os
+
+import streamlit as st
+
+from report_writers import WRITERS, export_filename
+from run_history import DEFAULT_HISTORY_PATH, duration_trend, export_history, ingest_runs, load_history, step_stats
+
+st.set_page_config(page_title="Run History", page_icon="📈", layout="wide")
+
+
+@st.cache_data(show_spinner=False)
+def cached_history(history_path: str, parts_signature: tuple):
+    # parts_signature changes whenever ingestion adds a part file
+    return load_history(history_path)
+
+
+def parts_signature(history_path: str) -> tuple:
+    if not os.path.isdir(history_path):
+        return ()
+    return tuple(sorted(f for f in os.listdir(history_path) if f.endswith(".parquet")))
+
+
+st.title("📈 Run History")
+
+with st.sidebar:
+    st.markdown("### Ingestion")
+    runs_root = st.text_input("Folder containing test_run_* folders", value=".")
+    history_path = st.text_input("History dataset", value=DEFAULT_HISTORY_PATH)
+    if st.button("🔄 Ingest new runs", use_container_width=True):
+        if not os.path.isdir(runs_root):
+            st.error(f"Folder not found: {runs_root}")
+        else:
+            with st.spinner("Reading new execution reports..."):
+                result = ingest_runs(runs_root, history_path)
+            st.success(f"{result['new_runs']} new runs, {result['rows']} step rows")
+            if result["skipped"]:
+                st.warning(f"{result['skipped']} reports could not be read")
+
+history = cached_history(history_path, parts_signature(history_path))
+
+if history.empty:
+    st.info("No runs ingested yet. Point the sidebar at the folder holding your test_run_* folders and ingest.")
+    st.stop()
+
+stats = step_stats(history)
+executed = history["status"].isin(["PASS", "FAIL"])
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Runs", history["run_id"].nunique())
+c2.metric("Step executions", int(executed.sum()))
+c3.metric("Failure rate", f"{history.loc[executed, 'status'].eq('FAIL').mean():.1%}")
+c4.metric("Flaky steps", int(stats["flaky"].sum()))
+
+st.markdown("### Flaky steps")
+flaky = stats[stats["flaky"]]
+if flaky.empty:
+    st.caption("No step has both passed and failed.")
+else:
+    st.dataframe(
+        flaky[["test", "step", "executions", "failures", "failure_rate", "p50_ms", "p95_ms"]],
+        column_config={"failure_rate": st.column_config.ProgressColumn("Failure rate", min_value=0.0, max_value=1.0)},
+        use_container_width=True,
+        hide_index=True,
+    )
+
+st.markdown("### Failure rate by step")
+failing = stats[stats["failures"] > 0].sort_values("failure_rate", ascending=False).head(25)
+if failing.empty:
+    st.caption("No failures recorded.")
+else:
+    st.bar_chart(failing.set_index("step")["failure_rate"])
+
+st.markdown("### Step duration trend")
+timed_steps = stats.dropna(subset=["p50_ms"]).sort_values("p95_ms", ascending=False)["step"].unique().tolist()
+if not timed_steps:
+    st.caption("No durations yet: only reports from scripts with step timing carry them.")
+else:
+    selected = st.multiselect("Steps", timed_steps, default=timed_steps[:5])
+    trend = duration_trend(history, selected)
+    if trend.empty:
+        st.caption("Select at least one step.")
+    else:
+        st.line_chart(trend, y_label="median duration (ms)")
+
+with st.expander("All steps"):
+    st.dataframe(stats, use_container_width=True, hide_index=True)
+
+st.markdown("### Export")
+c1, c2 = st.columns([1, 2])
+export_format = c1.selectbox("Format", list(WRITERS), format_func=lambda f: WRITERS[f].label)
+export_runs = c2.multiselect("Runs (all if empty)", sorted(history["run_id"].unique(), reverse=True))
+if st.button("Prepare export"):
+    buffer = io.BytesIO()
+    rows = export_history(export_format, buffer, history_path, export_runs)
+    st.download_button(
+        label=f"📥 Download {rows} step rows ({WRITERS[export_format].label})",
+        data=buffer.getvalue(),
+        file_name=export_filename("execution_history", export_format),
+        mime=WRITERS[export_format].mime,
+    )
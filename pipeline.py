@@ -0,0 +1,1075 @@
+"""
+Generation pipeline shared by the Streamlit UI and offline tooling.
+
+Everything here is free of Streamlit calls: prompts, the Groq agent, code
+cleaning, test case parsing and the test case export. The UI configures the
+client once with configure_client() and adds its own rendering on top.
+
+The module was split out of app.py for the offline benchmarks
+(benchmarks/run_benchmarks.py), which time these stages without starting
+Streamlit; the HTTP API (api_server.py) builds on the same module.
+"""
+import ast
+import asyncio
+import os
+import re
+import textwrap
+import time
+
+import pandas as pd
+from groq import Groq
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+from codegen_input import function_with_body, is_oversized, splice_into_function, split_function
+from model_router import ModelRouter, RoutingDecision, estimate_cost, estimate_tokens
+from page_anchors import DEFAULT_VALIDATION_SCOPE, format_anchor_constants, format_validation_plan
+from playwright_async import to_async_playwright
+from report_writers import DEFAULT_FORMAT, write_rows
+from script_runner import RUNNER_HELPERS
+from step_timing import DEFAULT_STEP_TIMEOUT_MS, SLOW_STEP_MS, SLOW_STEPS_FILE, TIMING_HELPERS, format_step_timeouts
+from testcase_dedup import DedupIndex, mark_duplicates
+from testcase_planner import extract_flows, describe_flow, merge_testcase_responses
+from tracing import span
+
+DEFAULT_GROQ_MODEL = os.environ.get("GROQ_DEFAULT_MODEL", "")
+STREAM_COMPLETIONS = False
+
+groq_client = None
+model_router = None
+
+
+def configure_client(api_key: str, default_model: str = None, base_url: str = None, stream: bool = False,
+                     router: ModelRouter = None):
+    """
+    Create the shared Groq client. `base_url` points it at any
+    Groq/OpenAI-compatible endpoint (e.g. the local fake server);
+    `stream` makes agents request streamed completions by default;
+    `router` picks the model per task instead of DEFAULT_GROQ_MODEL.
+    """
+    global groq_client, DEFAULT_GROQ_MODEL, STREAM_COMPLETIONS, model_router
+    groq_client = Groq(api_key=api_key, base_url=base_url or None)
+    if default_model:
+        DEFAULT_GROQ_MODEL = default_model
+    STREAM_COMPLETIONS = stream
+    model_router = router
+    return groq_client
+
+
+def is_valid_python(generated: str) -> bool:
+    """Escalation check for code-producing agents: is there cleaned code, and does it parse?"""
+    code = clean_generated_code(generated)
+    if not code:
+        return False
+    try:
+        ast.parse(code)
+    except SyntaxError:
+        return False
+    return True
+
+
+class GroqAgent:
+    """
+    Chat completion agent. With a router configured and no explicit
+    `model_name`, the model is chosen per `task` and prompt size, and a
+    failed `validate(output)` escalates the request to the next larger model.
+    """
+
+    def __init__(self, system_prompt, model_name=None, stream=None, task="general", validate=None):
+        self.system_prompt = system_prompt
+        self.model_name = model_name or DEFAULT_GROQ_MODEL
+        self.stream = STREAM_COMPLETIONS if stream is None else stream
+        self.router = None if model_name else model_router
+        self.task = task
+        self.validate = validate
+
+    def _complete(self, user_content: str, model: str = None):
+        """(text, prompt_tokens, completion_tokens) for one call."""
+        with span("groq.complete", task=self.task, model=model or self.model_name, stream=self.stream) as details:
+            text, prompt_tokens, completion_tokens = self._request(user_content, model)
+            details.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return text, prompt_tokens, completion_tokens
+
+    def _request(self, user_content: str, model: str = None):
+        completion = groq_client.chat.completions.create(
+            model=model or self.model_name,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            temperature=0.0,
+            max_tokens=8000,
+            stream=self.stream
+        )
+        if self.stream:
+            parts, usage = [], None
+            for chunk in completion:
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or "")
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or usage
+            text = "".join(parts).strip()
+        else:
+            text = completion.choices[0].message.content.strip()
+            usage = completion.usage
+        if usage is None:
+            return text, estimate_tokens(self.system_prompt + user_content), estimate_tokens(text)
+        return text, usage.prompt_tokens, usage.completion_tokens
+
+    async def _generate_routed(self, user_content: str) -> str:
+        tier, reason = self.router.route(self.task, self.system_prompt + user_content)
+        text = ""
+        while tier < len(self.router.models):
+            model = self.router.models[tier]
+            decision = RoutingDecision(self.task, model, tier, reason, estimate_tokens(self.system_prompt + user_content))
+            started = time.perf_counter()
+            try:
+                text, decision.prompt_tokens, decision.completion_tokens = await asyncio.to_thread(
+                    self._complete, user_content, model
+                )
+                decision.outcome = "ok" if self.validate is None or self.validate(text) else "invalid"
+            except Exception as e:
+                text, decision.outcome = f"Error: {str(e)}", "error"
+            decision.latency_s = time.perf_counter() - started
+            decision.cost_usd = estimate_cost(model, decision.prompt_tokens, decision.completion_tokens)
+            self.router.record(decision)
+            if decision.outcome == "ok":
+                break
+            tier, reason = tier + 1, "escalated"
+        return text
+
+    async def generate(self, user_content: str) -> str:
+        if self.router is not None:
+            return await self._generate_routed(user_content)
+        try:
+            # Run the blocking client call off the event loop so several
+            # generations can be awaited concurrently with asyncio.gather
+            text, _, _ = await asyncio.to_thread(self._complete, user_content)
+            return text
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+
+TRANSFORM_PROMPT = """
+You are a strict Playwright instrumentation engine.
+
+You will receive ONE Playwright function.
+
+Your job is NOT to rewrite it.
+Your job is NOT to improve it.
+Your job is NOT to create a sample.
+Your job is ONLY to instrument it and add validation
+based on expect(...).to_contain_text() that already exists in the input.
+
+STRICT RULES:
+
+1. Copy the original function EXACTLY as provided.
+2. Copy EVERY original line EXACTLY as-is.
+3. DO NOT change indentation.
+4. DO NOT change locators.
+5. DO NOT change URLs.
+6. DO NOT remove existing expect statements.
+7. DO NOT modify function signature.
+8. DO NOT invent new steps.
+9. DO NOT change execution order.
+
+You are ONLY allowed to:
+
+- Add try/except around EACH original executable statement
+- Add screenshot capture
+- Add step_logs.append(...)
+- Add step counter increment
+- Add validation using Playwright expect()
+- Add run() wrapper
+
+------------------------------------------------------------
+STABLE PAGE VALIDATION RULE (PRECOMPILED ANCHORS)
+------------------------------------------------------------
+
+Anchor phrases have ALREADY been extracted from every
+expect(page.locator("body")).to_contain_text("...") text in the
+original function and compiled into one pattern per text. A pattern
+matches only when ALL of its anchors are present (case-insensitive).
+
+1. Copy these constants VERBATIM at module level, right after the imports:
+
+{anchor_constants}
+
+2. Validate an anchor set ONLY on the step where it becomes active.
+   The plan below names the original line of each such step and the
+   constant it checks:
+
+{validation_plan}
+
+   On those steps, inside the try block, right after the original line:
+
+       expect(page.locator(VALIDATION_SCOPE)).to_contain_text(ANCHORS_N)
+
+3. The FIRST step, if the plan does not already validate it, checks
+   only that the page rendered:
+
+       expect(page.locator(VALIDATION_SCOPE)).not_to_be_empty()
+
+4. Every other step gets NO added validation; its original action
+   already auto-waits.
+
+5. NEVER call re.compile(...) inside a step.
+   NEVER use inner_text() or manual string splitting.
+   NEVER replace or modify the original expect statements.
+
+------------------------------------------------------------
+WAITING RULE FOR NAVIGATION ACTIONS
+------------------------------------------------------------
+
+If the original line contains:
+    - page.goto(...)
+    - click()
+    - form submission
+    - navigation-triggering action
+
+Then validation must rely ONLY on Playwright's expect(),
+because it automatically waits for the element.
+
+Do NOT manually wait.
+Do NOT use sleep.
+Do NOT add wait_for_load_state unless present originally.
+
+------------------------------------------------------------
+INSTRUMENTATION PATTERN
+------------------------------------------------------------
+
+For each original statement:
+
+try:
+    ORIGINAL LINE HERE
+
+    # Anchor validation, ONLY on steps listed in the validation plan
+    expect(page.locator(VALIDATION_SCOPE)).to_contain_text(ANCHORS_N)
+
+    page.screenshot(path=f"step_{{step_number}}_PASS.png")
+    step_logs.append(f"Step {{step_number}}: PASS")
+
+except Exception as e:
+    page.screenshot(path=f"step_{{step_number}}_FAIL.png")
+    step_logs.append(f"Step {{step_number}}: FAIL - {{str(e)}}")
+
+step_number += 1
+
+------------------------------------------------------------
+
+Each original line = one try block.
+Do NOT merge steps.
+Do NOT change logic.
+Do NOT remove original expect statements.
+
+------------------------------------------------------------
+AFTER INSTRUMENTING
+------------------------------------------------------------
+
+{runtime_rules}
+
+------------------------------------------------------------
+STEP TIMING RULE
+------------------------------------------------------------
+
+Add `import time` and copy these helpers VERBATIM below the imports:
+
+{timing_helpers}
+
+Next to step_logs keep:
+
+    step_timings = []
+    RUNS = int(os.environ.get("PW_RUNS", "1"))
+    RUN = 1
+
+Inside EACH try block, before the original line:
+
+    step_started = time.monotonic()
+    url_before = page.url
+    expect_wait_ms = 0.0
+
+On steps with added validation, around those expect(...) calls:
+
+    expect_started = time.monotonic()
+    <added validation expect(...) call>
+    expect_wait_ms += (time.monotonic() - expect_started) * 1000
+
+At the END of BOTH the try and the except branch, after step_logs.append(...):
+
+    step_ended = time.monotonic()
+    duration_ms = round((step_ended - step_started) * 1000)
+    step_timings.append(step_record(
+        step_logs[-1], step_started, step_ended, expect_wait_ms,
+        navigation_timing(page) if page.url != url_before else None,
+    ))
+
+Run the test function RUNS times, each in a fresh context with step_number
+reset to 1 and the module-level RUN set to the run number first
+(global RUN; RUN = run), and after each run tag its new step_timings entries with
+"run" (1..RUNS) and "test" (the test function name).
+
+Write the Excel report ONLY with:
+
+    write_timing_report(os.path.join(output_dir, "execution_report.xlsx"), step_timings)
+
+------------------------------------------------------------
+RUNNER RULE
+------------------------------------------------------------
+
+Copy these helpers VERBATIM below the imports:
+
+{runner_helpers}
+
+Next to RUNS keep:
+
+    BROWSER, LAUNCH_OPTIONS, CONTEXT_OPTIONS = browser_settings()
+    RESUME = resume_plan()
+
+Launch the browser ONLY with:
+
+    browser = p[BROWSER].launch(**LAUNCH_OPTIONS)
+
+Do NOT hard-code p.chromium, headless, --start-maximized, viewport or
+no_viewport: the helper picks them, so the same script can run on
+chromium, firefox or webkit at any viewport size.
+
+Run ONLY the test functions in selected_tests([<every test function>]),
+and open EACH test's context ONLY with:
+
+    resume_context, resume_url = resume_options(RESUME, "<test function name>")
+    context = browser.new_context(**CONTEXT_OPTIONS, **resume_context)
+    page = context.new_page()
+    if resume_url:
+        page.goto(resume_url)
+
+At the start of EACH test function:
+
+    skip_steps = RESUME.get("<test function name>", {{}}).get("after_step", 0)
+
+Wrap EACH step's try/except (NOT the step_number += 1 after it) in:
+
+    if step_number > skip_steps:
+
+Skipped steps already passed in the run being resumed; do not log them.
+
+At the END of the try branch ONLY, after step_timings.append(...) and
+outside the timed region:
+
+    save_checkpoint(page, output_dir, "<test function name>", RUN, step_number)
+
+------------------------------------------------------------
+PACING RULE
+------------------------------------------------------------
+
+{pacing_rules}
+
+------------------------------------------------------------
+
+------------------------------------------------------------
+STEP LOG TITLE RULE (FOR EXCEL REPORT)
+------------------------------------------------------------
+
+The Excel report must NOT log steps as:
+
+    Step 1
+    Step 2
+
+Instead, use the SAME SANITIZED_ACTION_TITLE
+used for screenshot naming.
+
+Format:
+
+    step_logs.append(
+        f"Step{{step_number}}_{{SANITIZED_ACTION_TITLE}}_PASS"
+    )
+
+On failure:
+
+    step_logs.append(
+        f"Step{{step_number}}_{{SANITIZED_ACTION_TITLE}}_FAIL - {{str(e)}}"
+    )
+
+Rules:
+
+- Use the exact same SANITIZED_ACTION_TITLE
+  generated for screenshot filename.
+- Do NOT remove step_number.
+- Do NOT change execution order.
+- Excel writing follows the STEP TIMING RULE.
+- Only change the string format inside step_logs.append().
+- Keep PASS/FAIL behavior identical.
+------------------------------------------------------------
+FOLDER ORGANIZATION & NAMED SCREENSHOT RULE
+------------------------------------------------------------
+
+All generated artifacts MUST be saved inside a single execution folder.
+
+1. At runtime, create a folder named:
+
+       test_run_<TIMESTAMP>
+
+   Where TIMESTAMP format is:
+       YYYYMMDD_HHMMSS
+
+   Use:
+       from datetime import datetime
+       import os
+       timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+       output_dir = os.environ.get("PW_OUTPUT_DIR") or f"test_run_{{timestamp}}"
+       os.makedirs(output_dir, exist_ok=True)
+
+2. ALL of the following MUST be saved inside this folder:
+
+   - Every screenshot (PASS and FAIL)
+   - The Excel report
+   - A copy of the final executed script itself
+
+3. Screenshot Naming Rule (IMPORTANT):
+
+   DO NOT use step_number alone anymore.
+
+   Instead, create a readable title based on the original statement.
+
+   Screenshot format:
+
+       <STEP_NUMBER>_<SANITIZED_ACTION_TITLE>_PASS.png
+       <STEP_NUMBER>_<SANITIZED_ACTION_TITLE>_FAIL.png
+
+   Where:
+
+   - SANITIZED_ACTION_TITLE is derived from the original line.
+   - Convert to lowercase
+   - Replace spaces with underscores
+   - Remove special characters
+   - Keep it short (max 6 words)
+   - Example transformations:
+
+         page.goto("https://google.com")
+         -> 1_goto_google_PASS.png
+
+         page.get_by_role("button", name="Login").click()
+         -> 2_click_login_button_PASS.png
+
+4. Screenshot path must be:
+
+       page.screenshot(path=os.path.join(output_dir, f"...filename..."))
+
+5. Excel report must be saved as:
+
+       os.path.join(output_dir, "execution_report.xlsx")
+
+6. The currently running script file must also be copied into the folder.
+
+   Use:
+
+       import shutil
+       import sys
+
+       current_script = sys.argv[0]
+       shutil.copy(current_script, os.path.join(output_dir, os.path.basename(current_script)))
+
+7. Do NOT change any existing instrumentation behavior.
+8. Do NOT remove step_number.
+9. Folder creation must happen before execution starts.
+10. All paths must reference output_dir.
+
+------------------------------------------------------------
+
+CRITICAL OUTPUT RULES
+
+- Output ONLY valid Python code.
+- No explanations.
+- No markdown.
+- No commentary.
+- No formatting text.
+- No extra text before or after code.
+
+Now instrument this function EXACTLY:
+
+{input_code}
+"""
+
+
+
+# Runtime scaffolding added around the instrumented function, per script API
+SYNC_RUNTIME_RULES = """\
+Add:
+
+- import re
+- step_logs = []
+- step_number = 1
+- run() wrapper
+- sync_playwright
+- browser, contexts and the tests to run ONLY as described in the RUNNER RULE
+- slow_mo only as described in the PACING RULE
+- the Excel report ONLY through write_timing_report(...), as described in the STEP TIMING RULE
+"""
+
+ASYNC_RUNTIME_RULES = """\
+Emit an ASYNC Playwright script (playwright.async_api), NOT sync_playwright.
+
+Add:
+
+- import re
+- import asyncio
+- from playwright.async_api import async_playwright, expect
+- Turn each test function into a coroutine: `async def` with the SAME name and parameters
+- `await` EVERY Playwright call that performs an action or assertion,
+  including the instrumentation itself:
+      await page.goto(...), await locator.click(), await locator.fill(...),
+      await expect(...).to_contain_text(...), await page.screenshot(...)
+- Do NOT await locator factories (page.locator(...), page.get_by_role(...), etc.)
+- `await navigation_timing(page)` (the helper becomes a coroutine)
+- Each test coroutine keeps its OWN step_logs, step_timings and step_number
+  (local variables, step_number starting at 1) and returns its step_timings,
+  so several tests can run concurrently without sharing state
+- `await save_checkpoint(...)` (the helper becomes a coroutine that awaits
+  page.context.storage_state())
+- TESTS = selected_tests([<every test coroutine>])
+- async def run_test(browser, test, run):
+      resume_context, resume_url = resume_options(RESUME, test.__name__)
+      context = await browser.new_context(**CONTEXT_OPTIONS, **resume_context)
+      page = await context.new_page()
+      try:
+          if resume_url:
+              await page.goto(resume_url)
+          step_timings = await test(page)
+          for record in step_timings:
+              record.update(run=run, test=test.__name__)
+          return step_timings
+      finally:
+          await context.close()
+- async def main():
+      async with async_playwright() as p:
+          browser = await p[BROWSER].launch(**LAUNCH_OPTIONS)
+          (add slow_mo only as described in the PACING RULE)
+          results = []
+          for run in range(1, RUNS + 1):
+              RUN = run    (declare `global RUN` in main)
+              results += await asyncio.gather(*(run_test(browser, t, run) for t in TESTS))
+          await browser.close()
+      The tests of ONE run execute concurrently; the RUNS repeats execute one
+      after another, so at most len(TESTS) contexts are open at a time.
+      Do NOT gather across runs.
+      then write the report from all results:
+          write_timing_report(os.path.join(output_dir, "execution_report.xlsx"),
+                              [record for records in results for record in records])
+- if __name__ == "__main__":
+      asyncio.run(main())
+"""
+
+RUNTIME_RULES = {"sync": SYNC_RUNTIME_RULES, "async": ASYNC_RUNTIME_RULES}
+
+# Watch mode keeps the old one-second delay per action, for demos
+WATCH_PACING_RULES = """\
+Launch the browser with slow_mo=1000 (next to **LAUNCH_OPTIONS) so every
+action can be followed on screen.
+Do NOT add per-step timeouts.
+"""
+
+ADAPTIVE_PACING_RULES = """\
+Do NOT pass slow_mo to launch(). Steps run at the page's real speed;
+expect() and Playwright actions already auto-wait.
+
+Add near the top of the script:
+
+    import json
+
+    DEFAULT_STEP_TIMEOUT_MS = {default_timeout_ms}
+    SLOW_STEP_MS = {slow_step_ms}
+    # Calibrated from slow steps of earlier runs, keyed by SANITIZED_ACTION_TITLE
+    STEP_TIMEOUTS = {step_timeouts}
+    slow_steps = []
+
+At the START of EACH try block, after step_started is set:
+
+    step_timeout = STEP_TIMEOUTS.get("SANITIZED_ACTION_TITLE", DEFAULT_STEP_TIMEOUT_MS)
+    page.set_default_timeout(step_timeout)
+
+At the END of BOTH the try and the except branch, after duration_ms is computed:
+
+    if duration_ms >= SLOW_STEP_MS or <this is the except branch>:
+        slow_steps.append({{"step": "SANITIZED_ACTION_TITLE", "status": "PASS" or "FAIL",
+                           "duration_ms": duration_ms, "timeout_ms": step_timeout}})
+
+Use the SAME SANITIZED_ACTION_TITLE as the screenshot name; reuse a key of
+STEP_TIMEOUTS when it names the same step.
+
+After the run, next to the Excel report:
+
+    with open(os.path.join(output_dir, "{slow_steps_file}"), "w") as f:
+        json.dump({{"default_timeout_ms": DEFAULT_STEP_TIMEOUT_MS, "steps": slow_steps}}, f, indent=2)
+"""
+
+
+def build_pacing_rules(pacing: str = "adaptive", step_timeouts: dict = None) -> str:
+    """PACING RULE text: "watch" keeps slow_mo, "adaptive" uses calibrated per-step timeouts."""
+    if pacing == "watch":
+        return WATCH_PACING_RULES
+    return ADAPTIVE_PACING_RULES.format(
+        default_timeout_ms=DEFAULT_STEP_TIMEOUT_MS,
+        slow_step_ms=SLOW_STEP_MS,
+        step_timeouts=format_step_timeouts(step_timeouts or {}),
+        slow_steps_file=SLOW_STEPS_FILE,
+    )
+
+
+def build_transform_prompt(input_code: str, api: str = "sync", pacing: str = "adaptive",
+                           step_timeouts: dict = None, validation_scope: str = DEFAULT_VALIDATION_SCOPE,
+                           anchor_source: str = None, template: str = None) -> str:
+    """
+    TRANSFORM_PROMPT for `input_code`, targeting the sync or async Playwright API.
+    Anchors are planned over `anchor_source` (the whole function when
+    `input_code` is one chunk of it).
+    """
+    anchor_source = anchor_source or input_code
+    return (template or TRANSFORM_PROMPT).format(
+        input_code=input_code,
+        anchor_constants=format_anchor_constants(anchor_source, validation_scope or DEFAULT_VALIDATION_SCOPE),
+        validation_plan=format_validation_plan(anchor_source, within=input_code),
+        runtime_rules=RUNTIME_RULES[api],
+        timing_helpers=TIMING_HELPERS,
+        runner_helpers=RUNNER_HELPERS,
+        pacing_rules=build_pacing_rules(pacing, step_timeouts),
+    )
+
+
+# Oversized functions: the first chunk gets the full prompt (and so the
+# scaffolding); later chunks only return their instrumented statements
+CHUNK_RULES = """\
+------------------------------------------------------------
+CHUNK MODE
+------------------------------------------------------------
+
+This function is too large for one request and is instrumented in chunks.
+The script scaffolding (imports, constants, helpers, wrapper and report)
+has ALREADY been generated from the first chunk. The statements below
+continue the SAME function right after the previous chunk.
+
+- Output ONLY the instrumented statements: one try/except block per
+  original statement, following every rule above.
+- Do NOT output imports, constants, helpers, def lines, the run()
+  wrapper or report code.
+- Indent with 4 spaces, as inside the function body.
+
+"""
+
+CHUNK_TRANSFORM_PROMPT = TRANSFORM_PROMPT.replace(
+    "Now instrument this function EXACTLY:",
+    CHUNK_RULES + "Now instrument these statements EXACTLY:",
+)
+
+
+# ────────────────────────────────────────────────
+#     NEW: TEST CASE PLANNING PROMPT (inspired by PlannerOSS)
+# ────────────────────────────────────────────────
+TESTCASE_PLAN_PROMPT = """\
+You are a test case documentation expert. Generate test cases for the provided Playwright script.
+
+For context, use the flow mentioned in the original function, and generate test cases that cover the key features, user interactions, and expected outcomes in the script ONLY.
+
+CRITICAL FORMATTING RULES:
+1. Use EXACTLY this format for each test case (no variations)
+2. Each field MUST start with "* " (asterisk + space)
+3. Each field MUST be on a single line (no multi-line values except Step-by-step actions)
+4. Test Case ID must be TC-1, TC-2, TC-3, etc. (sequential)
+5. Separate test cases with ONE blank line
+
+REQUIRED FORMAT PER TEST CASE:
+
+* High Level Feature: [Category]
+* Test Case ID: TC-[Number]
+* Feature Name: [Specific feature of the script that is being tested. E.g. "Booking Flow", "Login Functionality", etc.]
+* Test Scenario: [Summary of the user interaction or feature being tested in one line]
+* Test Case: [Title]
+* Test Case Description: [Details in one line of the feature being tested.]
+* Step-by-step actions: [Single paragraph with all steps, no numbering]
+* Possible Values: [Data or None]
+* Sources: [Sources or None]
+* Expected Result: [Pass criteria in one line]
+* Data Correctness Checked: [Yes/No]
+* Release/Platform Version: Web
+* Automation Possibility: [Yes/No]
+* Testing Type: [Type]
+* Priority: [High/Medium/Low]
+
+EXAMPLE:
+
+ OUTPUT the test cases in the following format:
+        STRICTLY ADHERE TO THIS FORMAT:
+        - Test Case ID: TC-<number>
+        - High Level Feature
+        - Feature Name
+        - Test Scenario
+        - Test Case
+        - Test Case Description
+        - Step-by-step actions
+        - Possible Values (if applicable, Type 'None' if there is none for a specific case)
+        - Sources (if applicable, Type 'N/A' if there is none for a specific case)
+        - Expected Result
+        - Data Correctness Checked (if applicable, Type 'N/A' if there is none for a specific case)
+        - Release/Platform Version (Web/Mobile/IOS/Android etc. If not applicable, write 'N/A')
+        - Automation Possibility
+        - Testing Type
+        - Priority
+
+NOW GENERATE TEST CASES FOR THIS SCRIPT:
+```python
+{input_code}
+```
+
+Extract flows from the provided script and generate test cases ONLY for flows that actually exist in the script.
+Do NOT invent features.
+Use actual button names, actual URLs, and actual assertions present in the script.
+Generate all possible testcases that exist (20-25) ONLY FOR FLOWS THAT EXIST IN MY ORIGINAL SCRIPT THAT I INPUT. 
+Donot repeat testcases, give me distinct ones for flows/functionality that exist in my original script.
+
+"""
+
+# Per-flow variant used by the parallel planner: same output format, but the
+# model only covers one flow, so each completion is short.
+TESTCASE_FLOW_PROMPT = TESTCASE_PLAN_PROMPT.split("NOW GENERATE TEST CASES")[0] + """\
+FULL SCRIPT (for context only):
+```python
+{input_code}
+```
+
+FOCUS FLOW {flow_number} OF {flow_count}:
+{flow_summary}
+
+Statements in this flow:
+```python
+{flow_code}
+```
+
+Generate test cases ONLY for the focus flow above (5-8 test cases).
+Do NOT cover steps that belong to other parts of the script.
+Use actual button names, actual URLs, and actual assertions present in the flow.
+Donot repeat testcases, give me distinct ones.
+
+"""
+
+def clean_generated_code(raw: str) -> str:
+    """
+    Aggressive cleaning: remove ALL non-code content including test case docs.
+    """
+    lines = raw.splitlines()
+    cleaned = []
+    
+    # Skip until we find the first import
+    found_code_start = False
+    
+    for line in lines:
+        stripped = line.strip()
+        
+        # Skip markdown code fences
+        if stripped.startswith('```'):
+            continue
+            
+        # Look for code start
+        if not found_code_start:
+            if stripped.startswith(('from ', 'import ')):
+                found_code_start = True
+            else:
+                continue
+        
+        # After code starts, filter out test case documentation
+        # Skip lines that are clearly test case docs (even as comments)
+        if any(keyword in stripped.lower() for keyword in [
+            'test case id:', 'tc-', 'high level feature:', 'feature name:',
+            'test scenario:', 'test case:', 'test case description:',
+            'step-by-step actions:', 'possible values:', 'sources:',
+            'expected result:', 'data correctness checked:', 
+            'release/platform version:', 'automation possibility:',
+            'testing type:', 'priority:', '**test cases:**'
+        ]):
+            continue
+            
+        # Skip markdown-style bullets/headers (even in comments)
+        if re.match(r'^\s*[#*\-•]\s*[A-Z]', stripped):
+            continue
+            
+        # Skip numbered list items that look like test case headers
+        if re.match(r'^\s*\d+\.\s*\*\*', stripped):
+            continue
+        
+        # Keep the line if it passed all filters
+        cleaned.append(line)
+    
+    result = '\n'.join(cleaned).strip()
+    
+    # Remove any remaining markdown artifacts
+    result = re.sub(r'\*\*(.+?)\*\*', r'\1', result)  # Remove bold
+    
+    return result
+
+
+def parse_testcases(test_cases_str: str) -> list:
+    """
+    Parse test cases with improved regex that handles the strict format.
+    """
+    # Split by test case blocks (look for "Test Case ID: TC-")
+    test_blocks = re.split(r'\n(?=\* High Level Feature:)', test_cases_str.strip())
+    
+    all_data = []
+    
+    for block in test_blocks:
+        if not block.strip():
+            continue
+            
+        data = {
+            'High Level Feature': '',
+            'Test Case ID': '',
+            'Feature Name': '',
+            'Test Scenario': '',
+            'Test Case': '',
+            'Test Case Description': '',
+            'Step-by-step actions': '',
+            'Possible Values': '',
+            'Sources': '',
+            'Expected Result': '',
+            'Data Correctness Checked': '',
+            'Release/Platform Version': '',
+            'Automation Possibility': '',
+            'Testing Type': '',
+            'Priority': ''
+        }
+        
+        # Extract each field with simple, specific regex
+        patterns = {
+            'High Level Feature': r'\* High Level Feature:\s*(.+?)(?=\n\*|\Z)',
+            'Test Case ID': r'\* Test Case ID:\s*(.+?)(?=\n\*|\Z)',
+            'Feature Name': r'\* Feature Name:\s*(.+?)(?=\n\*|\Z)',
+            'Test Scenario': r'\* Test Scenario:\s*(.+?)(?=\n\*|\Z)',
+            'Test Case': r'\* Test Case:\s*(.+?)(?=\n\*|\Z)',
+            'Test Case Description': r'\* Test Case Description:\s*(.+?)(?=\n\*|\Z)',
+            'Step-by-step actions': r'\* Step-by-step actions:\s*(.+?)(?=\n\*|\Z)',
+            'Possible Values': r'\* Possible Values:\s*(.+?)(?=\n\*|\Z)',
+            'Sources': r'\* Sources:\s*(.+?)(?=\n\*|\Z)',
+            'Expected Result': r'\* Expected Result:\s*(.+?)(?=\n\*|\Z)',
+            'Data Correctness Checked': r'\* Data Correctness Checked:\s*(.+?)(?=\n\*|\Z)',
+            'Release/Platform Version': r'\* Release/Platform Version:\s*(.+?)(?=\n\*|\Z)',
+            'Automation Possibility': r'\* Automation Possibility:\s*(.+?)(?=\n\*|\Z)',
+            'Testing Type': r'\* Testing Type:\s*(.+?)(?=\n\*|\Z)',
+            'Priority': r'\* Priority:\s*(.+?)(?=\n\*|\Z)',
+        }
+        
+        for key, pattern in patterns.items():
+            match = re.search(pattern, block, re.DOTALL | re.IGNORECASE)
+            if match:
+                value = match.group(1).strip()
+                # Clean up any remaining formatting
+                value = re.sub(r'\s+', ' ', value)  # Normalize whitespace
+                data[key] = value
+        
+        # Only add if we found a Test Case ID
+        if data['Test Case ID']:
+            all_data.append(data)
+
+    return all_data
+
+
+def prepare_testcases(test_cases_str: str, history: DedupIndex = None, drop_duplicates: bool = False,
+                      history_prefix: str = "") -> list:
+    """
+    Parse LLM test case output and flag near-duplicates in a "Duplicate Of"
+    column, against earlier rows of the batch and against `history` (which
+    the batch is added to). With `drop_duplicates`, in-batch duplicates are
+    removed.
+    """
+    with span("parse_testcases") as details:
+        all_data = parse_testcases(test_cases_str)
+        details["rows"] = len(all_data)
+    if not all_data:
+        return []
+    with span("mark_duplicates", rows=len(all_data)):
+        duplicate_of = mark_duplicates(all_data, history=history, history_prefix=history_prefix)
+    for data, flag in zip(all_data, duplicate_of):
+        data['Duplicate Of'] = flag
+    if drop_duplicates:
+        all_data = [d for d in all_data if not d['Duplicate Of'] or d['Duplicate Of'].startswith("history:")]
+    return all_data
+
+
+def write_testcases_excel(all_data: list, output_path="cleaned_generated_test_cases.xlsx"):
+    """
+    Write parsed test case rows to a formatted Excel workbook. `output_path`
+    may also be a binary buffer; the sheet is formatted before the workbook
+    is saved, so it is written once.
+    """
+    with span("testcases.dataframe", rows=len(all_data)):
+        df = pd.DataFrame(all_data)
+    with span("testcases.excel_write", rows=len(all_data)), pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False)
+
+        # Format Excel
+        ws = writer.sheets["Sheet1"]
+        for col in ws.columns:
+            max_length = 0
+            column = get_column_letter(col[0].column)
+            for cell in col:
+                cell.alignment = Alignment(wrap_text=True, vertical='top')
+                if cell.value:
+                    max_length = max(max_length, len(str(cell.value)))
+
+            adjusted_width = min((max_length + 2) * 1.2, 70)
+            ws.column_dimensions[column].width = adjusted_width
+
+    return output_path
+
+
+# JUnit attributes for documented (not executed) test cases
+TESTCASE_JUNIT = {"name": ("Test Case ID", "Test Case"), "classname": ("High Level Feature", "Feature Name")}
+
+
+def write_testcases(all_data: list, output_path, fmt: str = DEFAULT_FORMAT):
+    """
+    Write parsed test case rows in export format `fmt` (see report_writers).
+    Excel keeps the formatted workbook of write_testcases_excel().
+    """
+    if fmt == "xlsx":
+        return write_testcases_excel(all_data, output_path)
+    fields = list(dict.fromkeys(field for row in all_data for field in row))
+    with span("testcases.write", format=fmt, rows=len(all_data)):
+        write_rows(fmt, all_data, output_path, fields, title="Test Cases", junit=TESTCASE_JUNIT)
+    return output_path
+
+
+def clean_generated_chunk(raw: str) -> str:
+    """Chunk responses have no imports for clean_generated_code() to anchor on; just drop fences."""
+    return "\n".join(l for l in raw.splitlines() if not l.strip().startswith("```")).strip("\n")
+
+
+def is_valid_statements(generated: str) -> bool:
+    code = textwrap.dedent(clean_generated_chunk(generated))
+    if not code.strip() or generated.startswith("Error:"):
+        return False
+    try:
+        ast.parse(code)
+    except SyntaxError:
+        return False
+    return True
+
+
+async def _generate_script_chunked(input_code: str, header: str, chunks: list, **prompt_options) -> str:
+    """Instrument chunks concurrently and splice the later ones into the first chunk's script."""
+    system_prompt = "You are a strict Playwright instrumentation engine. Output ONLY valid Python code. No explanations."
+    script_agent = GroqAgent(system_prompt=system_prompt, task="transform", validate=is_valid_python)
+    chunk_agent = GroqAgent(system_prompt=system_prompt, task="transform", validate=is_valid_statements)
+
+    with span("prompt.transform", chunks=len(chunks)):
+        prompts = [build_transform_prompt(function_with_body(header, chunks[0]), anchor_source=input_code, **prompt_options)]
+        prompts += [
+            build_transform_prompt(chunk, anchor_source=input_code, template=CHUNK_TRANSFORM_PROMPT, **prompt_options)
+            for chunk in chunks[1:]
+        ]
+    responses = await asyncio.gather(
+        script_agent.generate(prompts[0]),
+        *(chunk_agent.generate(prompt) for prompt in prompts[1:]),
+    )
+    with span("clean_generated_code", chunks=len(chunks)):
+        blocks = [
+            clean_generated_chunk(response) if is_valid_statements(response)
+            # Keep the recording's statements, uninstrumented, rather than lose steps
+            else f"# Chunk {i} could not be instrumented; original statements follow\n{chunk}"
+            for i, (chunk, response) in enumerate(zip(chunks[1:], responses[1:]), start=2)
+        ]
+        function_name = re.search(r'def\s+(\w+)', header).group(1)
+        return splice_into_function(clean_generated_code(responses[0]), function_name, blocks)
+
+
+async def generate_script(input_code: str, api: str = "sync", pacing: str = "adaptive",
+                          step_timeouts: dict = None, validation_scope: str = DEFAULT_VALIDATION_SCOPE) -> str:
+    """
+    Instrument a codegen function and return the cleaned script.
+
+    With api="async" the LLM is asked for an async_playwright script and the
+    result goes through the local converter, which adds any missing awaits.
+    `step_timeouts` (see step_timing.calibrate_timeouts) seeds the per-step
+    timeouts used in adaptive pacing; `validation_scope` is the selector the
+    anchor checks run against. Functions over MAX_INPUT_TOKENS are
+    instrumented in chunks.
+    """
+    prompt_options = dict(api=api, pacing=pacing, step_timeouts=step_timeouts, validation_scope=validation_scope)
+    with span("generate_script", api=api, pacing=pacing) as details:
+        parts = split_function(input_code) if is_oversized(input_code) else None
+        details["chunks"] = len(parts[1]) if parts else 1
+        if parts and len(parts[1]) > 1:
+            generated_code = await _generate_script_chunked(input_code, *parts, **prompt_options)
+        else:
+            script_agent = GroqAgent(
+                system_prompt="You are a strict Playwright instrumentation engine. Output ONLY valid Python code. No explanations.",
+                task="transform",
+                validate=is_valid_python,
+            )
+            with span("prompt.transform"):
+                prompt = build_transform_prompt(input_code, **prompt_options)
+            script_response = await script_agent.generate(prompt)
+            with span("clean_generated_code"):
+                generated_code = clean_generated_code(script_response)
+        if api == "async":
+            with span("to_async_playwright"):
+                generated_code = to_async_playwright(generated_code)
+    return generated_code
+
+
+async def generate_testcases(input_code: str, fan_out: bool = True) -> str:
+    """
+    Generate test case docs, fanning out one short completion per flow.
+
+    Flows come from a local ast pass, so latency is the slowest per-flow
+    call instead of one long 20-25 case decode. Scripts with a single flow
+    (or unparseable input) fall back to the original single prompt.
+    Oversized functions always fan out.
+    """
+    testcase_agent = GroqAgent(
+        system_prompt="You generate structured QA test cases based strictly on the provided script.",
+        task="testcases",
+    )
+
+    with span("generate_testcases") as details:
+        return await _generate_testcases(testcase_agent, input_code, fan_out, details)
+
+
+async def _generate_testcases(testcase_agent, input_code: str, fan_out: bool, details: dict) -> str:
+    oversized = is_oversized(input_code)
+    with span("extract_flows"):
+        flows = extract_flows(input_code) if fan_out or oversized else []
+    details["flows"] = len(flows)
+    if len(flows) < 2:
+        return await testcase_agent.generate(TESTCASE_PLAN_PROMPT.format(input_code=input_code))
+
+    # Oversized recordings would repeat the whole script in every flow
+    # prompt; give the flow overview as context instead
+    context = input_code if not oversized else "\n\n".join(
+        f"# Flow {i}\n" + textwrap.indent(describe_flow(flow), "# ") for i, flow in enumerate(flows, start=1)
+    )
+    with span("prompt.testcases", flows=len(flows)):
+        prompts = [
+            TESTCASE_FLOW_PROMPT.format(
+                input_code=context,
+                flow_number=i,
+                flow_count=len(flows),
+                flow_summary=describe_flow(flow),
+                flow_code=flow["code"],
+            )
+            for i, flow in enumerate(flows, start=1)
+        ]
+    responses = await asyncio.gather(*(testcase_agent.generate(p) for p in prompts))
+
+    successful = [r for r in responses if not r.startswith("Error:")]
+    if not successful:
+        return responses[0]
+    with span("merge_testcase_responses"):
+        return merge_testcase_responses(successful)
+
+
+async def generate_all(input_code: str, testcases: bool = True, fan_out: bool = True, **script_options):
+    """(script, raw test case response) generated concurrently; the response is "" without `testcases`."""
+    if not testcases:
+        return await generate_script(input_code, **script_options), ""
+    script, testcase_response = await asyncio.gather(
+        generate_script(input_code, **script_options),
+        generate_testcases(input_code, fan_out=fan_out),
+    )
+    return script, testcase_response
@@ -0,0 +1,334 @@
+"""
+Local sync -> async Playwright conversion.
+
+Rewrites a sync_playwright script (raw codegen or an instrumented script)
+into its async_playwright equivalent: functions that drive the browser
+become coroutines and every Playwright call that returns a coroutine is
+awaited. Edits are applied in place on the source text, so comments and
+formatting survive. Already-awaited calls are left alone, which makes the
+pass safe to run over LLM output that is (mostly) async already. Coroutines
+handed to asyncio.gather()/create_task()/wait_for() or built inside a
+comprehension are scheduled, not awaited in place.
+"""
+import ast
+
+# Methods that are coroutines in playwright.async_api. Locator factories
+# (page.locator, get_by_*, nth, first, filter) stay synchronous.
+AWAITABLE_METHODS = {
+    # navigation / page
+    "goto", "reload", "go_back", "go_forward", "wait_for_load_state", "wait_for_url",
+    "wait_for_selector", "wait_for_timeout", "wait_for_function", "evaluate",
+    "evaluate_handle", "screenshot", "content", "title", "set_content", "bring_to_front",
+    "pdf", "add_init_script", "expose_function", "route", "unroute", "emulate_media",
+    "set_viewport_size", "set_extra_http_headers",
+    # element / locator actions
+    "click", "dblclick", "tap", "fill", "clear", "type", "press", "press_sequentially",
+    "check", "uncheck", "set_checked", "select_option", "select_text", "set_input_files",
+    "hover", "focus", "blur", "dispatch_event", "drag_to", "scroll_into_view_if_needed",
+    "inner_text", "inner_html", "text_content", "input_value", "get_attribute",
+    "is_visible", "is_hidden", "is_enabled", "is_disabled", "is_checked", "is_editable",
+    "all_inner_texts", "all_text_contents", "all", "count", "bounding_box", "wait_for",
+    # browser / context
+    "launch", "launch_persistent_context", "new_context", "new_page", "close",
+    "storage_state", "add_cookies", "cookies", "clear_cookies", "grant_permissions",
+}
+# Names assumed to hold Playwright objects; extended with annotated
+# parameters and anything assigned from them.
+PLAYWRIGHT_NAMES = {"page", "context", "browser", "playwright", "p", "pw", "popup"}
+PLAYWRIGHT_TYPES = {"Page", "BrowserContext", "Browser", "Locator", "Playwright", "Frame", "FrameLocator"}
+# Calls that take a coroutine object and schedule it themselves; their
+# coroutine arguments must not be awaited (asyncio.gather(*(run_test(...) ...)))
+SCHEDULING_CALLS = {"gather", "create_task", "ensure_future", "wait_for", "shield", "wait", "as_completed"}
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _root_name(expr):
+    while True:
+        if isinstance(expr, ast.Attribute):
+            expr = expr.value
+        elif isinstance(expr, ast.Call):
+            expr = expr.func
+        elif isinstance(expr, (ast.Subscript, ast.Await)):
+            expr = expr.value
+        else:
+            return expr.id if isinstance(expr, ast.Name) else None
+
+
+def _playwright_names(tree: ast.Module) -> set:
+    """Variables that (transitively) hold Playwright objects."""
+    names = set(PLAYWRIGHT_NAMES)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.arg) and node.annotation is not None:
+            annotation = node.annotation
+            label = annotation.id if isinstance(annotation, ast.Name) else getattr(annotation, "attr", None)
+            if label in PLAYWRIGHT_TYPES:
+                names.add(node.arg)
+    while True:
+        before = len(names)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and _root_name(node.value) in names:
+                names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+            elif isinstance(node, (ast.With, ast.AsyncWith)):
+                for item in node.items:
+                    expr = item.context_expr
+                    if isinstance(item.optional_vars, ast.Name) and (
+                        _root_name(expr) in names or _root_name(expr) in ("sync_playwright", "async_playwright")
+                    ):
+                        names.add(item.optional_vars.id)
+        if len(names) == before:
+            return names
+
+
+def _is_expect_assertion(call: ast.Call) -> bool:
+    """expect(...).to_xxx(...) / expect(...).not_to_xxx(...)"""
+    func = call.func
+    return (
+        isinstance(func, ast.Attribute)
+        and (func.attr.startswith("to_") or func.attr.startswith("not_to_"))
+        and isinstance(func.value, ast.Call)
+        and isinstance(func.value.func, ast.Name)
+        and func.value.func.id == "expect"
+    )
+
+
+def _needs_await(call: ast.Call, async_functions: set, playwright_names: set) -> bool:
+    func = call.func
+    if isinstance(func, ast.Name):
+        return func.id in async_functions
+    if not isinstance(func, ast.Attribute):
+        return False
+    if _is_expect_assertion(call):
+        return True
+    return func.attr in AWAITABLE_METHODS and _root_name(func.value) in playwright_names
+
+
+class _Collector(ast.NodeVisitor):
+    def __init__(self):
+        self.awaited = set()
+        self.calls = []  # (call, parent, function)
+        self.deferred = set()  # calls whose coroutine is scheduled, not awaited in place
+        self.withs = []
+        self.attributes = []  # (attribute, parent)
+        self._parents = []
+        self._function = None
+
+    def generic_visit(self, node):
+        self._parents.append(node)
+        super().generic_visit(node)
+        self._parents.pop()
+
+    def _visit_function(self, node):
+        outer, self._function = self._function, node
+        self.generic_visit(node)
+        self._function = outer
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_Await(self, node):
+        if isinstance(node.value, ast.Call):
+            self.awaited.add(id(node.value))
+        self.generic_visit(node)
+
+    def visit_JoinedStr(self, node):
+        # f-string internals have unreliable offsets; leave them untouched
+        return
+
+    def visit_With(self, node):
+        self.withs.append((node, self._function))
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        self.attributes.append((node, self._parents[-1] if self._parents else None))
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        parent = self._parents[-1] if self._parents else None
+        self.calls.append((node, parent, self._function))
+        if any(isinstance(p, COMPREHENSIONS) for p in self._parents):
+            # An added await would turn a genexp into an async generator and
+            # serialize a list comprehension
+            self.deferred.add(id(node))
+        if _is_scheduling_call(node):
+            for arg in [*node.args, *(k.value for k in node.keywords)]:
+                arg = arg.value if isinstance(arg, ast.Starred) else arg
+                if isinstance(arg, ast.Call):
+                    self.deferred.add(id(arg))
+        self.generic_visit(node)
+
+
+def _is_scheduling_call(call: ast.Call) -> bool:
+    """asyncio.gather(...), task_group.create_task(...), asyncio.run(...) and the like."""
+    func = call.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+    if name == "run":
+        return _root_name(func) == "asyncio"
+    return name in SCHEDULING_CALLS
+
+
+def _offset(lines, lineno, col):
+    """Character offset in the joined source for an ast (line, utf-8 byte col) position."""
+    line = lines[lineno - 1]
+    chars = len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+    return sum(len(l) for l in lines[:lineno - 1]) + chars
+
+
+def _is_playwright_with(node) -> bool:
+    return any(
+        isinstance(item.context_expr, ast.Call)
+        and isinstance(item.context_expr.func, ast.Name)
+        and item.context_expr.func.id in ("sync_playwright", "async_playwright")
+        for item in node.items
+    )
+
+
+def _is_event_with(item: ast.withitem, playwright_names: set) -> bool:
+    """with page.expect_popup() as popup_info: ... (an async context manager in the async API)"""
+    expr = item.context_expr
+    return (
+        isinstance(expr, ast.Call)
+        and isinstance(expr.func, ast.Attribute)
+        and expr.func.attr.startswith("expect_")
+        and _root_name(expr.func.value) in playwright_names
+    )
+
+
+def _wrap_module_level_playwright(source: str, tree: ast.Module) -> str:
+    """
+    Move a module-level `with sync_playwright() as ...:` block (the codegen
+    template) into a main() function, since `async with` needs a coroutine.
+    """
+    in_function = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            in_function.update(id(n) for n in ast.walk(node))
+    blocks = [
+        n for n in ast.walk(tree)
+        if isinstance(n, ast.With) and id(n) not in in_function and _is_playwright_with(n)
+    ]
+    if not blocks:
+        return source
+
+    taken = {n.name for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    name = "main" if "main" not in taken else "run_playwright"
+    lines = source.splitlines(keepends=True)
+    for node in sorted(blocks, key=lambda n: n.lineno, reverse=True):
+        indent = " " * node.col_offset
+        body = ["    " + line if line.strip() else line for line in lines[node.lineno - 1:node.end_lineno]]
+        if body and not body[-1].endswith("\n"):
+            body[-1] += "\n"
+        lines[node.lineno - 1:node.end_lineno] = [f"{indent}def {name}() -> None:\n", *body, "\n", f"{indent}{name}()\n"]
+    return "".join(lines)
+
+
+def to_async_playwright(source: str) -> str:
+    """
+    Convert a sync Playwright script to async_playwright.
+
+    Returns `source` unchanged if it cannot be parsed.
+    """
+    try:
+        source = _wrap_module_level_playwright(source, ast.parse(source))
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+
+    lines = source.splitlines(keepends=True)
+    functions = {n.name: n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    async_functions = {name for name, n in functions.items() if isinstance(n, ast.AsyncFunctionDef)}
+    playwright_names = _playwright_names(tree)
+    collector = _Collector()
+    collector.visit(tree)
+
+    # Fixed point: a function is async if it awaits Playwright or calls an async function
+    while True:
+        newly_async = {
+            fn.name for call, _, fn in collector.calls
+            if fn is not None and fn.name not in async_functions
+            and _needs_await(call, async_functions, playwright_names)
+        }
+        newly_async |= {
+            fn.name for node, fn in collector.withs
+            if fn is not None and fn.name not in async_functions and (
+                _is_playwright_with(node) or any(_is_event_with(i, playwright_names) for i in node.items)
+            )
+        }
+        if not newly_async:
+            break
+        async_functions |= newly_async
+
+    edits = []  # (offset, remove_len, insert_text)
+
+    for name in async_functions:
+        node = functions[name]
+        if isinstance(node, ast.FunctionDef):
+            edits.append((_offset(lines, node.lineno, node.col_offset), 0, "async "))
+
+    needs_asyncio = False
+    for call, parent, fn in collector.calls:
+        if id(call) in collector.awaited or id(call) in collector.deferred:
+            continue
+        if not _needs_await(call, async_functions, playwright_names):
+            continue
+        start = _offset(lines, call.lineno, call.col_offset)
+        if fn is None:
+            # Module-level entry point, e.g. run() under __main__
+            already_run = (
+                isinstance(parent, ast.Call) and isinstance(parent.func, ast.Attribute)
+                and parent.func.attr == "run" and _root_name(parent.func) == "asyncio"
+            )
+            if isinstance(call.func, ast.Name) and not already_run:
+                end = _offset(lines, call.end_lineno, call.end_col_offset)
+                edits.append((start, 0, "asyncio.run("))
+                edits.append((end, 0, ")"))
+                needs_asyncio = True
+            continue
+        if isinstance(parent, ast.Attribute) and parent.value is call:
+            # Chained call on a coroutine result: (await page.wait_for_selector(...)).click()
+            end = _offset(lines, call.end_lineno, call.end_col_offset)
+            edits.append((start, 0, "(await "))
+            edits.append((end, 0, ")"))
+        else:
+            edits.append((start, 0, "await "))
+
+    event_infos = set()
+    for node, fn in collector.withs:
+        is_event = any(_is_event_with(item, playwright_names) for item in node.items)
+        if _is_playwright_with(node) or is_event:
+            edits.append((_offset(lines, node.lineno, node.col_offset), 0, "async "))
+        for item in node.items:
+            expr = item.context_expr
+            if isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name) and expr.func.id == "sync_playwright":
+                name_start = _offset(lines, expr.func.lineno, expr.func.col_offset)
+                edits.append((name_start, len("sync_playwright"), "async_playwright"))
+            if _is_event_with(item, playwright_names) and isinstance(item.optional_vars, ast.Name):
+                event_infos.add(item.optional_vars.id)
+
+    # popup_info.value is awaitable in the async API
+    for node, parent in collector.attributes:
+        if (
+            node.attr == "value" and isinstance(node.value, ast.Name)
+            and node.value.id in event_infos and not isinstance(parent, ast.Await)
+        ):
+            edits.append((_offset(lines, node.lineno, node.col_offset), 0, "await "))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == "playwright.sync_api":
+            start = _offset(lines, node.lineno, node.col_offset)
+            end = _offset(lines, node.end_lineno, node.end_col_offset)
+            text = "".join(lines)[start:end]
+            replacement = text.replace("playwright.sync_api", "playwright.async_api").replace("sync_playwright", "async_playwright")
+            edits.append((start, end - start, replacement))
+
+    # Apply back to front; at equal offsets the later-collected (inner) edit
+    # goes first so outer "await " ends up leftmost
+    text = "".join(lines)
+    ordered = sorted(enumerate(edits), key=lambda e: (e[1][0], e[0]), reverse=True)
+    for _, (offset, remove, insert) in ordered:
+        text = text[:offset] + insert + text[offset + remove:]
+
+    if needs_asyncio and not any(
+        isinstance(n, ast.Import) and any(a.name == "asyncio" for a in n.names) for n in tree.body
+    ):
+        text = "import asyncio\n" + text
+    return text
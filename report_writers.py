@@ -0,0 +1,295 @@
+"""
+Pluggable row writers for test case docs and execution reports.
+
+Every backend takes the same rows (dicts) and field list and writes them
+one at a time, so exports can be fed straight from a generator (a SQLite
+cursor, a Parquet scan) without collecting the rows first:
+
+- csv, jsonl: plain text, written as the rows arrive
+- parquet: buffered into row groups of `batch_size` rows
+- junit: one <testcase> per row, for CI dashboards and test management
+  imports; the mapping from row fields to JUnit attributes is passed as
+  `junit={...}` (see JUnitXmlWriter)
+- xlsx: openpyxl write-only mode, kept for people who open results in Excel
+
+    with open_writer("csv", "cases.csv", fields) as writer:
+        for row in rows:
+            writer.write(row)
+
+Targets are file paths or binary file-like objects (e.g. io.BytesIO for a
+download button).
+"""
+import csv
+import io
+import json
+import math
+import re
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl import Workbook
+
+DEFAULT_FORMAT = "xlsx"
+
+# Characters XML 1.0 (and so .xlsx) cannot carry; browser error messages sometimes contain them
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _plain(value):
+    """NaN and pandas missing values -> None, so every backend writes an empty value."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is not None and type(value).__name__ in ("NAType", "NaTType"):
+        return None
+    return value
+
+
+class RowWriter:
+    """
+    Base class: write(row) per row, close() once. Usable as a context
+    manager; close() runs on error too, leaving whatever was written.
+    """
+    extension = ""
+    mime = "application/octet-stream"
+    label = ""
+
+    def __init__(self, target, fields, **options):
+        self.target = target
+        self.fields = list(fields)
+        self.options = options
+        self.written = 0
+
+    def write(self, row: dict):
+        self._write([_plain(row.get(field)) for field in self.fields], row)
+        self.written += 1
+
+    def write_rows(self, rows) -> int:
+        for row in rows:
+            self.write(row)
+        return self.written
+
+    def close(self):
+        pass
+
+    def _write(self, values: list, row: dict):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _TextRowWriter(RowWriter):
+    """Opens `target` for UTF-8 text; binary file-like targets are wrapped and left open."""
+
+    def __init__(self, target, fields, **options):
+        super().__init__(target, fields, **options)
+        if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+            self._stream = open(target, "w", encoding="utf-8", newline="")
+            self._owned = True
+        else:
+            self._stream = io.TextIOWrapper(target, encoding="utf-8", newline="")
+            self._owned = False
+
+    def close(self):
+        if self._owned:
+            self._stream.close()
+        else:
+            self._stream.flush()
+            self._stream.detach()
+
+
+class CsvWriter(_TextRowWriter):
+    extension = "csv"
+    mime = "text/csv"
+    label = "CSV"
+
+    def __init__(self, target, fields, **options):
+        super().__init__(target, fields, **options)
+        self._csv = csv.writer(self._stream)
+        self._csv.writerow(self.fields)
+
+    def _write(self, values, row):
+        self._csv.writerow(["" if v is None else v for v in values])
+
+
+class JsonlWriter(_TextRowWriter):
+    extension = "jsonl"
+    mime = "application/x-ndjson"
+    label = "JSON Lines"
+
+    def _write(self, values, row):
+        self._stream.write(json.dumps(dict(zip(self.fields, values)), ensure_ascii=False, default=str))
+        self._stream.write("\n")
+
+
+class ParquetWriter(RowWriter):
+    """
+    Row groups of `batch_size` rows. The schema is `schema=` (a pyarrow
+    schema) if given, else inferred from the first row group.
+    """
+    extension = "parquet"
+    mime = "application/vnd.apache.parquet"
+    label = "Parquet"
+
+    def __init__(self, target, fields, batch_size: int = 5_000, **options):
+        super().__init__(target, fields, **options)
+        self.batch_size = batch_size
+        self._batch = []
+        self._writer = None
+        self._schema = options.get("schema")
+
+    def _write(self, values, row):
+        self._batch.append(dict(zip(self.fields, values)))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(self._batch, schema=self._schema)
+        if self._writer is None:
+            if self._schema is None:
+                # Columns that were empty throughout the first group stay strings
+                self._schema = pa.schema([
+                    pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema
+                ])
+                table = table.cast(self._schema)
+            self._writer = pq.ParquetWriter(self.target, self._schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        if self._batch or self._writer is None:
+            self._flush()
+        self._writer.close()
+
+
+class JUnitXmlWriter(_TextRowWriter):
+    """
+    One <testsuite> with a <testcase> per row. `junit=` maps JUnit
+    attributes to row fields (a field name, or a tuple of fields joined
+    with " - "):
+
+    - name, classname: testcase attributes
+    - status: "FAIL" becomes <failure>, "PASS" a plain testcase; rows
+      without a status mapping are documented cases and become <skipped>
+    - message: failure message
+    - time_ms: duration in milliseconds
+
+    Every other field goes into <system-out> as "Field: value" lines. The
+    suite carries no test/failure counts, which would need every row up
+    front; JUnit consumers count the testcases themselves.
+    """
+    extension = "xml"
+    mime = "application/xml"
+    label = "JUnit XML"
+
+    def __init__(self, target, fields, **options):
+        super().__init__(target, fields, **options)
+        self.mapping = dict(options.get("junit") or {"name": self.fields[0]})
+        mapped = set()
+        for source in self.mapping.values():
+            mapped.update((source,) if isinstance(source, str) else source)
+        self._extra = [f for f in self.fields if f not in mapped]
+        title = quoteattr(options.get("title", "Report"))
+        self._stream.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<testsuites name={title}>\n')
+        self._stream.write(f"  <testsuite name={title}>\n")
+
+    def _value(self, row, key):
+        source = self.mapping.get(key)
+        if source is None:
+            return None
+        parts = [row.get(f) for f in ((source,) if isinstance(source, str) else source)]
+        parts = [str(p) for p in map(_plain, parts) if p not in (None, "")]
+        return " - ".join(parts) if parts else None
+
+    def _write(self, values, row):
+        attrs = f'name={quoteattr(_xml_text(self._value(row, "name") or f"row {self.written + 1}"))}'
+        classname = self._value(row, "classname")
+        if classname:
+            attrs += f" classname={quoteattr(_xml_text(classname))}"
+        time_ms = self._value(row, "time_ms")
+        if time_ms:
+            try:
+                attrs += f' time="{float(time_ms) / 1000:.3f}"'
+            except ValueError:
+                pass
+
+        body = []
+        if "status" not in self.mapping:
+            body.append('<skipped message="documented test case, not executed"/>')
+        elif (self._value(row, "status") or "").upper() == "FAIL":
+            message = _xml_text(self._value(row, "message") or "FAIL")
+            body.append(f"<failure message={quoteattr(message[:500])}>{escape(message)}</failure>")
+        details = "\n".join(
+            f"{field}: {value}" for field, value in zip(self.fields, values)
+            if field in self._extra and value not in (None, "")
+        )
+        if details:
+            body.append(f"<system-out>{escape(_xml_text(details))}</system-out>")
+
+        if body:
+            self._stream.write(f"    <testcase {attrs}>\n")
+            self._stream.writelines(f"      {element}\n" for element in body)
+            self._stream.write("    </testcase>\n")
+        else:
+            self._stream.write(f"    <testcase {attrs}/>\n")
+
+    def close(self):
+        self._stream.write("  </testsuite>\n</testsuites>\n")
+        super().close()
+
+
+def _xml_text(value) -> str:
+    return _XML_INVALID.sub("", str(value))
+
+
+class ExcelWriter(RowWriter):
+    """openpyxl write-only workbook: cells are flushed as rows are appended."""
+    extension = "xlsx"
+    mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    label = "Excel"
+
+    def __init__(self, target, fields, **options):
+        super().__init__(target, fields, **options)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(options.get("title", "Report")[:31])
+        self._sheet.append(self.fields)
+
+    def _write(self, values, row):
+        self._sheet.append(["" if v is None else _xml_text(v) if isinstance(v, str) else v for v in values])
+
+    def close(self):
+        self._workbook.save(self.target)
+
+
+# Format name -> writer class
+WRITERS = {
+    "xlsx": ExcelWriter,
+    "csv": CsvWriter,
+    "jsonl": JsonlWriter,
+    "parquet": ParquetWriter,
+    "junit": JUnitXmlWriter,
+}
+
+
+def open_writer(fmt: str, target, fields, **options) -> RowWriter:
+    try:
+        writer_class = WRITERS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(WRITERS)}") from None
+    return writer_class(target, fields, **options)
+
+
+def write_rows(fmt: str, rows, target, fields, **options) -> int:
+    """Stream `rows` into `target` in format `fmt`; returns the number of rows written."""
+    with open_writer(fmt, target, fields, **options) as writer:
+        return writer.write_rows(rows)
+
+
+def export_filename(stem: str, fmt: str) -> str:
+    return f"{stem}.{WRITERS[fmt].extension}"
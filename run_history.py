@@ -0,0 +1,217 @@
+"""
+Execution history across test_run_* folders.
+
+Generated scripts leave one test_run_<TIMESTAMP>/execution_report.xlsx per
+execution. ingest_runs() scans those folders in a process pool, flattens
+each report into one row per executed step and appends the new rows to a
+Parquet dataset (one part file per ingestion). Folders already present in
+the dataset are skipped, so re-running ingestion only pays for new runs.
+The analysis helpers feed the Run History page; export_history() streams
+the dataset out through any report_writers format (JUnit XML for CI).
+
+    python run_history.py --root ~/playwright_runs
+    python run_history.py --export junit --out results.xml --run test_run_20250101_120000
+"""
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from report_writers import WRITERS, write_rows
+
+DEFAULT_HISTORY_PATH = "run_history"
+RUN_DIR_GLOB = "test_run_*"
+REPORT_FILE = "execution_report.xlsx"
+
+HISTORY_COLUMNS = [
+    "run_id", "run_started", "repeat", "test", "step_no", "step", "status", "error",
+    "duration_ms", "expect_wait_ms", "ttfb_ms", "dom_content_loaded_ms", "load_ms",
+]
+# execution_report.xlsx headers (see step_timing.write_timing_report); older
+# reports only carry "Step Log"
+REPORT_COLUMNS = {
+    "Run": "repeat",
+    "Test": "test",
+    "Duration (ms)": "duration_ms",
+    "Expect Wait (ms)": "expect_wait_ms",
+    "TTFB (ms)": "ttfb_ms",
+    "DOM Content Loaded (ms)": "dom_content_loaded_ms",
+    "Load (ms)": "load_ms",
+}
+# JUnit attributes for executed steps: one testcase per step execution
+HISTORY_JUNIT = {
+    "name": "step",
+    "classname": ("run_id", "test"),
+    "status": "status",
+    "message": "error",
+    "time_ms": "duration_ms",
+}
+TIMING_COLUMNS = ["duration_ms", "expect_wait_ms", "ttfb_ms", "dom_content_loaded_ms", "load_ms"]
+
+# Step3_click_login_PASS, Step3_click_login_FAIL - <error>, or the older "Step 3: PASS"
+_STEP_LOG = re.compile(r"^Step\s*(\d+)[_:\s]*(.*?)[_\s]*(PASS|FAIL)\b(?:\s*-\s*(.*))?$", re.DOTALL)
+
+
+def _run_started(run_id: str):
+    try:
+        # Matrix shards append _<browser>_<viewport> to the timestamp
+        return datetime.strptime(run_id[len("test_run_"):][:15], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+def parse_report(run_dir: str) -> pd.DataFrame:
+    """One row per step log of a run folder's execution_report.xlsx."""
+    report = pd.read_excel(os.path.join(run_dir, REPORT_FILE), sheet_name=0)
+    log_column = "Step Log" if "Step Log" in report.columns else report.columns[0]
+    parsed = report[log_column].astype(str).str.strip().str.extract(_STEP_LOG)
+    parsed.columns = ["step_no", "step", "status", "error"]
+
+    rows = pd.DataFrame({
+        "step_no": pd.to_numeric(parsed["step_no"], errors="coerce").astype("Int64"),
+        "step": parsed["step"].where(parsed["step"].fillna("") != "", "Step " + parsed["step_no"].fillna("?")),
+        "status": parsed["status"].fillna(""),
+        "error": parsed["error"].fillna(""),
+    })
+    for source, column in REPORT_COLUMNS.items():
+        rows[column] = report[source].values if source in report.columns else None
+    rows["repeat"] = pd.to_numeric(rows["repeat"], errors="coerce").fillna(1).astype("int64")
+    rows["test"] = rows["test"].fillna("").astype(str)
+    for column in TIMING_COLUMNS:
+        rows[column] = pd.to_numeric(rows[column], errors="coerce").astype("float64")
+
+    run_id = os.path.basename(os.path.normpath(run_dir))
+    rows["run_id"] = run_id
+    rows["run_started"] = pd.Timestamp(_run_started(run_id)) if _run_started(run_id) else pd.NaT
+    return rows[HISTORY_COLUMNS]
+
+
+def _parse_or_none(run_dir: str):
+    try:
+        return parse_report(run_dir)
+    except Exception:
+        return None
+
+
+def find_run_dirs(root: str) -> list:
+    """test_run_* folders directly under `root` that contain a report."""
+    return sorted(
+        d for d in glob.glob(os.path.join(root, RUN_DIR_GLOB))
+        if os.path.isfile(os.path.join(d, REPORT_FILE))
+    )
+
+
+def ingested_run_ids(history_path: str = DEFAULT_HISTORY_PATH) -> set:
+    """run_ids already in the dataset; reads just that one column."""
+    if not glob.glob(os.path.join(history_path, "*.parquet")):
+        return set()
+    return set(pd.read_parquet(history_path, columns=["run_id"])["run_id"].unique())
+
+
+def ingest_runs(root: str = ".", history_path: str = DEFAULT_HISTORY_PATH, workers: int = None) -> dict:
+    """
+    Parse run folders under `root` that are not yet in the dataset and
+    append them as a new Parquet part. Returns counts of what was done.
+    """
+    seen = ingested_run_ids(history_path)
+    pending = [d for d in find_run_dirs(root) if os.path.basename(d) not in seen]
+    if not pending:
+        return {"new_runs": 0, "rows": 0, "skipped": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(_parse_or_none, pending, chunksize=8))
+    parsed = [f for f in frames if f is not None]
+    rows = sum(len(f) for f in parsed)
+    if rows:
+        os.makedirs(history_path, exist_ok=True)
+        part = os.path.join(history_path, f"part-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.parquet")
+        pd.concat(parsed, ignore_index=True).to_parquet(part, index=False)
+    return {"new_runs": len(parsed), "rows": rows, "skipped": len(frames) - len(parsed)}
+
+
+def load_history(history_path: str = DEFAULT_HISTORY_PATH) -> pd.DataFrame:
+    if not glob.glob(os.path.join(history_path, "*.parquet")):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.read_parquet(history_path)
+
+
+def iter_history_rows(history_path: str = DEFAULT_HISTORY_PATH, run_ids=None, batch_size: int = 10_000):
+    """Dataset rows as dicts, one record batch at a time, optionally limited to `run_ids`."""
+    if not glob.glob(os.path.join(history_path, "*.parquet")):
+        return
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(history_path, format="parquet")
+    condition = ds.field("run_id").isin(list(run_ids)) if run_ids else None
+    for batch in dataset.to_batches(columns=HISTORY_COLUMNS, filter=condition, batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def export_history(fmt: str, target, history_path: str = DEFAULT_HISTORY_PATH, run_ids=None) -> int:
+    """Stream the history (or some runs of it) into `target`; returns the number of step rows."""
+    return write_rows(
+        fmt, iter_history_rows(history_path, run_ids), target, HISTORY_COLUMNS,
+        title="Execution Report", junit=HISTORY_JUNIT,
+    )
+
+
+def step_stats(history: pd.DataFrame) -> pd.DataFrame:
+    """Per (test, step): executions, failure rate, flakiness and duration percentiles."""
+    if history.empty:
+        return pd.DataFrame(columns=["test", "step", "executions", "failures", "failure_rate",
+                                     "flaky", "p50_ms", "p95_ms"])
+    grouped = history.assign(failed=history["status"].eq("FAIL")).groupby(["test", "step"], sort=False)
+    stats = grouped.agg(
+        executions=("status", "size"),
+        failures=("failed", "sum"),
+        runs=("run_id", "nunique"),
+        p50_ms=("duration_ms", lambda s: s.quantile(0.5)),
+        p95_ms=("duration_ms", lambda s: s.quantile(0.95)),
+    ).reset_index()
+    stats["failure_rate"] = stats["failures"] / stats["executions"]
+    # Flaky: the same step both passed and failed across executions
+    stats["flaky"] = stats["failures"].between(1, stats["executions"] - 1)
+    return stats.sort_values(["flaky", "failure_rate"], ascending=False, ignore_index=True)
+
+
+def flaky_steps(history: pd.DataFrame) -> pd.DataFrame:
+    stats = step_stats(history)
+    return stats[stats["flaky"]].reset_index(drop=True)
+
+
+def duration_trend(history: pd.DataFrame, steps=None) -> pd.DataFrame:
+    """Median step duration per run, indexed by run start, one column per step."""
+    timed = history.dropna(subset=["duration_ms", "run_started"])
+    if steps:
+        timed = timed[timed["step"].isin(steps)]
+    if timed.empty:
+        return pd.DataFrame()
+    return timed.pivot_table(index="run_started", columns="step", values="duration_ms", aggfunc="median").sort_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest test_run_* execution reports into a Parquet history")
+    parser.add_argument("--root", default=".", help="Folder to scan for test_run_* folders")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, help="Parquet dataset directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--export", choices=list(WRITERS), help="Export the history instead of ingesting")
+    parser.add_argument("--out", help="Export target file (default: execution_history.<ext>)")
+    parser.add_argument("--run", action="append", dest="runs", help="Limit the export to this run_id (repeatable)")
+    args = parser.parse_args()
+
+    if args.export:
+        out = args.out or f"execution_history.{WRITERS[args.export].extension}"
+        rows = export_history(args.export, out, args.history, args.runs)
+        print(f"Exported {rows} step rows to {out}")
+        return
+
+    result = ingest_runs(args.root, args.history, args.workers)
+    print(f"Ingested {result['new_runs']} new runs ({result['rows']} step rows), skipped {result['skipped']} unreadable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+"""
+Runner modes for generated Playwright scripts.
+
+matrix: shard one instrumented script across browsers and viewport sizes.
+
+    python script_runner.py matrix playwright_test.py --headless
+    python script_runner.py matrix playwright_test.py --browsers chromium,webkit --viewports 1280x720,390x844
+
+Every (browser, viewport) shard runs the script in its own interpreter
+process with PW_BROWSER / PW_VIEWPORT / PW_OUTPUT_DIR set (see
+browser_settings() below), at most `workers` at a time, so a sweep takes
+about as long as its slowest shard rather than the sum of all of them.
+Shard folders are named test_run_<TIMESTAMP>_<browser>_<viewport>, so
+run_history.py can ingest them like any other run. Their step logs are
+merged into one matrix report with a column per shard:
+
+    Test | Run | Step                | chromium 1920x1080          | webkit 390x844              | ...
+    ...  | 1   | Step3_click_login   | Step3_click_login_PASS      | Step3_click_login_FAIL - .. |
+
+rerun: re-execute only the tests that failed in a previous run folder.
+
+    python script_runner.py rerun test_run_20250101_120000
+    python script_runner.py rerun test_run_20250101_120000 --resume
+
+Run with PW_CHECKPOINTS=1, generated scripts save a storage_state
+checkpoint (cookies, localStorage and the page URL) per run after every
+passing step; they are off by default, as each one writes the full storage
+state. With --resume each failed test starts from the checkpoint its failing
+run saved last before the first failing step: a fresh
+context gets the saved state, opens the saved URL and skips the steps that
+already passed, so triage costs the failing tail of a flow rather than the
+whole flow. Tests without a usable checkpoint rerun from the start, and so
+do tests whose skipped steps bind names later steps read (a popup page
+from `with page.expect_popup() as page1_info:`), since a checkpoint only
+restores the main page. The
+rerun goes to a new test_run_<TIMESTAMP>_rerun folder next to the old one,
+with rerun_report.<fmt> putting the previous and new step logs side by side.
+"""
+import argparse
+import ast
+import inspect
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+from report_writers import WRITERS, export_filename, write_rows
+from run_history import REPORT_FILE, parse_report
+
+BROWSERS = ("chromium", "firefox", "webkit")
+DEFAULT_VIEWPORTS = ("1920x1080", "1366x768", "390x844")
+MATRIX_REPORT_STEM = "matrix_report"
+MATRIX_SUMMARY_FILE = "matrix_summary.json"
+# One column per shard has no JUnit shape; everything else can carry the matrix
+MATRIX_FORMATS = [fmt for fmt in WRITERS if fmt != "junit"]
+NOT_RUN = "NOT RUN"
+RESTORED = "RESTORED from checkpoint"
+RERUN_REPORT_STEM = "rerun_report"
+RESUME_PLAN_FILE = "resume_plan.json"
+SHARD_LOG_FILE = "runner.log"
+
+_VIEWPORT = re.compile(r"^(\d{2,5})x(\d{2,5})$")
+
+
+@dataclass(frozen=True)
+class Shard:
+    browser: str
+    viewport: str = ""    # "WIDTHxHEIGHT"; empty keeps the maximized window
+
+    @property
+    def label(self) -> str:
+        return f"{self.browser} {self.viewport or 'maximized'}"
+
+    @property
+    def env(self) -> dict:
+        return {"PW_BROWSER": self.browser, "PW_VIEWPORT": self.viewport}
+
+
+def parse_viewport(text: str) -> str:
+    """Normalized "WIDTHxHEIGHT" (or "" for the maximized window); raises ValueError."""
+    text = text.strip().lower()
+    if text in ("", "maximized"):
+        return ""
+    if not _VIEWPORT.match(text):
+        raise ValueError(f"Viewport {text!r} is not WIDTHxHEIGHT, e.g. 1280x720")
+    return text
+
+
+def matrix_shards(browsers=BROWSERS, viewports=DEFAULT_VIEWPORTS) -> list:
+    unknown = [b for b in browsers if b not in BROWSERS]
+    if unknown:
+        raise ValueError(f"Unknown browsers {', '.join(unknown)}; expected {', '.join(BROWSERS)}")
+    return [Shard(browser, parse_viewport(viewport)) for browser in browsers for viewport in viewports]
+
+
+def run_script(script: str, output_dir: str, env: dict = None, timeout_s: float = None) -> dict:
+    """
+    Run `script` in a fresh interpreter with its artifacts written to
+    `output_dir` (PW_OUTPUT_DIR); stdout/stderr go to runner.log there.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    child_env = {**os.environ, **(env or {}), "PW_OUTPUT_DIR": os.path.abspath(output_dir)}
+    started = time.perf_counter()
+    with open(os.path.join(output_dir, SHARD_LOG_FILE), "w", encoding="utf-8") as log:
+        try:
+            returncode = subprocess.run(
+                [sys.executable, os.path.abspath(script)],
+                env=child_env, stdout=log, stderr=subprocess.STDOUT, timeout=timeout_s,
+            ).returncode
+        except subprocess.TimeoutExpired:
+            log.write(f"\nKilled after {timeout_s:.0f}s\n")
+            returncode = None
+    report = os.path.join(output_dir, REPORT_FILE)
+    return {
+        "output_dir": output_dir,
+        "returncode": returncode,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "report": report if os.path.isfile(report) else None,
+    }
+
+
+def run_matrix(script: str, shards: list, root: str = None, workers: int = None,
+               env: dict = None, timeout_s: float = None) -> dict:
+    """
+    Run every shard of `script` concurrently (up to `workers` at once) in
+    folders under `root` and merge their reports (see write_matrix()).
+    Each shard is its own process; the pool threads only wait on them.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    root = root or f"matrix_run_{timestamp}"
+    os.makedirs(root, exist_ok=True)
+
+    def run_shard(shard):
+        output_dir = os.path.join(root, f"test_run_{timestamp}_{shard.browser}_{shard.viewport or 'maximized'}")
+        return run_script(script, output_dir, {**(env or {}), **shard.env}, timeout_s)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or len(shards), thread_name_prefix="shard") as pool:
+        results = list(pool.map(run_shard, shards))
+    wall_s = time.perf_counter() - started
+
+    reports = [_shard_report(r) for r in results]
+    summary = {
+        "script": os.path.abspath(script),
+        "root": root,
+        "wall_s": round(wall_s, 3),
+        "serial_s": round(sum(r["elapsed_s"] for r in results), 3),
+        "shards": [
+            {
+                "shard": shard.label, **shard.env, **result,
+                "steps": 0 if rows is None else len(rows),
+                "failures": 0 if rows is None else int((rows["status"] == "FAIL").sum()),
+            }
+            for shard, result, rows in zip(shards, results, reports)
+        ],
+    }
+    with open(os.path.join(root, MATRIX_SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    summary["matrix"] = merge_matrix([s.label for s in shards], reports)
+    return summary
+
+
+def _shard_report(result: dict):
+    """The shard's parsed execution report, or None if it wrote none (or an unreadable one)."""
+    if result["report"] is None:
+        return None
+    try:
+        return parse_report(result["output_dir"])
+    except Exception:
+        return None
+
+
+def step_log(row) -> str:
+    """A parsed report row back in execution_report.xlsx's step-log form."""
+    log = f"Step{row['step_no']}_{row['step']}_{row['status']}"
+    return f"{log} - {row['error']}" if row["error"] else log
+
+
+def merge_matrix(labels: list, reports: list) -> list:
+    """
+    One row per (test, run, step) over several reports (run_history.parse_report
+    frames, None for a run without a report), with each run's step log and
+    duration in columns named by its label. Steps a run never reached are
+    NOT RUN. Rows also carry the step number as "step_no" (not a field).
+    """
+    matrix = {}
+    for label, rows in zip(labels, reports):
+        if rows is None:
+            continue
+        for row in rows.to_dict("records"):
+            key = (row["test"], row["repeat"], row["step_no"])
+            entry = matrix.setdefault(key, {
+                "Test": row["test"], "Run": row["repeat"], "Step": f"Step{row['step_no']}_{row['step']}",
+                "step_no": row["step_no"],
+            })
+            entry[label] = step_log(row)
+            entry[f"{label} (ms)"] = row["duration_ms"]
+
+    def order(key):
+        test, repeat, step_no = key
+        try:
+            return test, repeat, int(step_no)
+        except (TypeError, ValueError):
+            return test, repeat, -1
+
+    merged = []
+    for key in sorted(matrix, key=order):
+        entry = matrix[key]
+        for label in labels:
+            entry.setdefault(label, NOT_RUN)
+        merged.append(entry)
+    return merged
+
+
+def matrix_fields(labels: list) -> list:
+    return ["Test", "Run", "Step"] + list(labels) + [f"{label} (ms)" for label in labels]
+
+
+def write_matrix(summary: dict, shards: list, fmt: str = "xlsx") -> str:
+    """Write the merged matrix as matrix_report.<ext> in the sweep folder; returns its path."""
+    path = os.path.join(summary["root"], export_filename(MATRIX_REPORT_STEM, fmt))
+    write_rows(fmt, summary["matrix"], path, matrix_fields([s.label for s in shards]), title="Matrix Report")
+    return path
+
+
+def plan_rerun(run_dir: str, resume: bool = False, script: str = None) -> dict:
+    """
+    What to re-execute from a previous run folder: the failed tests, each
+    with the run and step of its first failure, and with `resume` the
+    checkpoint to restart it from ({test: checkpoint}; tests without one,
+    or whose skipped steps bind names used later in `script`, are left out
+    and rerun from the start).
+    """
+    rows = parse_report(run_dir)
+    failed = rows[rows["status"] == "FAIL"].sort_values(["repeat", "step_no"])
+    first_failures = failed.groupby("test", sort=True).first()
+    plan = {"run_dir": run_dir, "tests": {}, "resume": {}}
+    source = None
+    for test, failure in first_failures.iterrows():
+        step_no = None if pd.isna(failure["step_no"]) else int(failure["step_no"])
+        plan["tests"][test] = {"repeat": int(failure["repeat"]), "step_no": step_no}
+        checkpoint = last_checkpoint(run_dir, test, int(failure["repeat"]), step_no) if resume and step_no else None
+        if not checkpoint:
+            continue
+        if source is None:
+            with open(script or find_script(run_dir), encoding="utf-8") as f:
+                source = f.read()
+        carried = skipped_bindings(source, test, checkpoint["after_step"])
+        if carried:
+            plan["tests"][test]["full_rerun"] = f"skipped steps bind {', '.join(sorted(carried))}"
+        else:
+            plan["resume"][test] = checkpoint
+    plan["previous"] = rows
+    return plan
+
+
+def _is_step_guard(node) -> bool:
+    """`if step_number > skip_steps:` around a step, as the RUNNER RULE writes it."""
+    test = node.test if isinstance(node, ast.If) else None
+    return (
+        isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "step_number"
+        and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Name)
+        and test.comparators[0].id == "skip_steps"
+    )
+
+
+def _names(nodes, ctx) -> set:
+    return {n.id for node in nodes for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ctx)}
+
+
+def skipped_bindings(source: str, test: str, after_step: int) -> set:
+    """
+    Names that steps 1..`after_step` of `test` bind and later steps read
+    without binding them themselves; resuming after `after_step` would
+    leave them undefined. Empty if the script cannot be analysed.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    function = next(
+        (n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == test),
+        None,
+    )
+    if function is None:
+        return set()
+    steps = sorted((n for n in ast.walk(function) if _is_step_guard(n)), key=lambda n: n.lineno)
+    skipped, later = steps[:after_step], steps[after_step:]
+    return _names(skipped, ast.Store) & (_names(later, ast.Load) - _names(later, ast.Store))
+
+
+def last_checkpoint(run_dir: str, test: str, run: int, before_step: int):
+    """The newest checkpoint run `run` of `test` saved before step `before_step`, or None."""
+    for step_number in range(before_step - 1, 0, -1):
+        path = checkpoint_path(run_dir, test, run, step_number)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    return None
+
+
+def find_script(run_dir: str) -> str:
+    """The copy of the executed script a generated script leaves in its run folder."""
+    scripts = [os.path.join(run_dir, name) for name in sorted(os.listdir(run_dir)) if name.endswith(".py")]
+    if len(scripts) != 1:
+        raise ValueError(f"Expected one script copy in {run_dir}, found {len(scripts)}; pass --script")
+    return scripts[0]
+
+
+def rerun_failed(run_dir: str, script: str = None, resume: bool = False,
+                 env: dict = None, timeout_s: float = None) -> dict:
+    """
+    Execute only the failed tests of `run_dir` once more (PW_TESTS, PW_RUNS=1),
+    from their checkpoints with `resume` (PW_RESUME). Returns the plan, the
+    run_script() result and the previous/rerun comparison rows, or
+    {"plan": ...} alone when nothing failed.
+    """
+    plan = plan_rerun(run_dir, resume, script)
+    if not plan["tests"]:
+        return {"plan": plan}
+    script = script or find_script(run_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(run_dir)), f"test_run_{timestamp}_rerun")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Reports without a Test column name no test: rerun the whole script then
+    tests = "" if "" in plan["tests"] else ",".join(plan["tests"])
+    child_env = {**(env or {}), "PW_RUNS": "1", "PW_TESTS": tests, "PW_RESUME": ""}
+    if plan["resume"]:
+        resume_file = os.path.join(output_dir, RESUME_PLAN_FILE)
+        with open(resume_file, "w", encoding="utf-8") as f:
+            json.dump(plan["resume"], f)
+        child_env["PW_RESUME"] = os.path.abspath(resume_file)
+    result = run_script(script, output_dir, child_env, timeout_s)
+
+    # Previous run: only the failing repeat of each rerun test, lined up with the rerun's run 1
+    previous = plan["previous"]
+    failing_repeat = previous["test"].map({t: f["repeat"] for t, f in plan["tests"].items()})
+    previous = previous[previous["repeat"] == failing_repeat].assign(repeat=1)
+    comparison = merge_matrix(["previous", "rerun"], [previous, _shard_report(result)])
+    for row in comparison:
+        checkpoint = plan["resume"].get(row["Test"])
+        if checkpoint and row["rerun"] == NOT_RUN and _step_at_most(row["step_no"], checkpoint["after_step"]):
+            row["rerun"] = RESTORED
+    return {"plan": plan, "result": result, "comparison": comparison}
+
+
+def _step_at_most(step_no, limit: int) -> bool:
+    try:
+        return int(step_no) <= limit
+    except (TypeError, ValueError):
+        return False
+
+
+def write_rerun_report(rerun: dict, fmt: str = "xlsx") -> str:
+    """Write the previous/rerun comparison as rerun_report.<ext> in the rerun folder; returns its path."""
+    path = os.path.join(rerun["result"]["output_dir"], export_filename(RERUN_REPORT_STEM, fmt))
+    write_rows(fmt, rerun["comparison"], path, matrix_fields(["previous", "rerun"]), title="Rerun Report")
+    return path
+
+
+# ────────────────────────────────────────────────
+#     Runtime helpers (copied into generated scripts)
+# ────────────────────────────────────────────────
+# Like step_timing's helpers these run inside the generated script and may
+# only use their own local imports.
+
+def browser_settings():
+    """
+    (browser name, launch() kwargs, new_context() kwargs) from PW_BROWSER,
+    PW_VIEWPORT ("1280x720") and PW_HEADLESS=1. Without them: a visible,
+    maximized Chromium window.
+    """
+    import os
+
+    browser_name = os.environ.get("PW_BROWSER") or "chromium"
+    viewport = os.environ.get("PW_VIEWPORT") or ""
+    launch_options = {"headless": os.environ.get("PW_HEADLESS") == "1"}
+    if browser_name == "chromium" and not viewport:
+        launch_options["args"] = ["--start-maximized"]
+    if viewport:
+        width, height = (int(v) for v in viewport.lower().split("x"))
+        context_options = {"viewport": {"width": width, "height": height}}
+    else:
+        context_options = {"no_viewport": True}
+    return browser_name, launch_options, context_options
+
+
+def selected_tests(tests):
+    """The test functions named in PW_TESTS (comma-separated), or all of them."""
+    import os
+
+    names = {name.strip() for name in (os.environ.get("PW_TESTS") or "").split(",") if name.strip()}
+    return [test for test in tests if not names or test.__name__ in names]
+
+
+def checkpoint_path(output_dir, test_name, run, step_number):
+    """output_dir/checkpoints/<test>_run<R>_step<N>.json"""
+    import os
+    import re
+
+    name = re.sub(r"[^\w-]+", "_", test_name or "test")
+    return os.path.join(output_dir, "checkpoints", f"{name}_run{run}_step{step_number}.json")
+
+
+def save_checkpoint(page, output_dir, test_name, run, step_number):
+    """
+    Storage state (cookies, localStorage) and URL after a passing step, so
+    a rerun can resume from it. Only with PW_CHECKPOINTS=1.
+    """
+    import json
+    import os
+
+    if os.environ.get("PW_CHECKPOINTS") != "1":
+        return
+    path = checkpoint_path(output_dir, test_name, run, step_number)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    checkpoint = {
+        "test": test_name,
+        "run": run,
+        "after_step": step_number,
+        "url": page.url,
+        "storage_state": page.context.storage_state(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+
+
+def resume_plan():
+    """{test name: checkpoint} from the PW_RESUME file of `script_runner.py rerun --resume`."""
+    import json
+    import os
+
+    path = os.environ.get("PW_RESUME")
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resume_options(plan, test_name):
+    """(new_context() kwargs, URL to open before the first step) resuming `test_name`, if it is in `plan`."""
+    checkpoint = plan.get(test_name)
+    if not checkpoint:
+        return {}, None
+    return {"storage_state": checkpoint["storage_state"]}, checkpoint["url"]
+
+
+RUNTIME_HELPERS = (browser_settings, selected_tests, checkpoint_path, save_checkpoint, resume_plan, resume_options)
+
+# Source pasted into generated scripts by the RUNNER RULE
+RUNNER_HELPERS = "\n\n".join(inspect.getsource(f) for f in RUNTIME_HELPERS)
+
+
+def _print_summary(summary: dict):
+    for entry in summary["shards"]:
+        state = "no report" if entry["report"] is None else f"{entry['steps']} steps, {entry['failures']} failed"
+        print(f"{entry['shard']:<26} {entry['elapsed_s']:>8.1f}s  {state}")
+    print(f"Wall time {summary['wall_s']:.1f}s for {summary['serial_s']:.1f}s of shard time")
+
+
+def _print_rerun(rerun: dict, resume: bool = False):
+    plan = rerun["plan"]
+    for test, failure in plan["tests"].items():
+        checkpoint = plan["resume"].get(test)
+        start = f"after step {checkpoint['after_step']}" if checkpoint else "from the start"
+        if failure.get("full_rerun"):
+            start += f" ({failure['full_rerun']})"
+        elif not checkpoint and resume:
+            start += " (no checkpoint; resuming needs a run with PW_CHECKPOINTS=1)"
+        now = [r["rerun"] for r in rerun["comparison"] if r["Test"] == test and "_FAIL" in str(r["rerun"])]
+        print(f"{test or '(all tests)'}: failed at step {failure['step_no']}, rerun {start}: {now[0] if now else 'PASS'}")
+    previous_s = plan["previous"]["duration_ms"].sum() / 1000
+    print(f"Rerun took {rerun['result']['elapsed_s']:.1f}s (previous run: {previous_s:.1f}s of steps)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run modes for generated Playwright scripts")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    matrix = modes.add_parser("matrix", help="Shard one script across browsers and viewports")
+    matrix.add_argument("script")
+    matrix.add_argument("--browsers", default=",".join(BROWSERS))
+    matrix.add_argument("--viewports", default=",".join(DEFAULT_VIEWPORTS),
+                        help="Comma-separated WIDTHxHEIGHT sizes; 'maximized' keeps the window size")
+    matrix.add_argument("--workers", type=int, default=None, help="Concurrent shards (default: all)")
+    matrix.add_argument("--runs", type=int, default=None, help="PW_RUNS for every shard")
+    matrix.add_argument("--headless", action="store_true")
+    matrix.add_argument("--timeout-s", type=float, default=None, help="Kill a shard after this long")
+    matrix.add_argument("--out", default=None, help="Sweep folder (default: matrix_run_<TIMESTAMP>)")
+    matrix.add_argument("--format", choices=MATRIX_FORMATS, default="xlsx")
+
+    rerun = modes.add_parser("rerun", help="Re-execute only the failed tests of a run folder")
+    rerun.add_argument("run_dir", help="test_run_<TIMESTAMP> folder with an execution_report.xlsx")
+    rerun.add_argument("--script", default=None, help="Script to run (default: the copy in run_dir)")
+    rerun.add_argument("--resume", action="store_true",
+                       help="Restart each test from its last passing checkpoint (run_dir ran with PW_CHECKPOINTS=1)")
+    rerun.add_argument("--headless", action="store_true")
+    rerun.add_argument("--timeout-s", type=float, default=None)
+    rerun.add_argument("--format", choices=MATRIX_FORMATS, default="xlsx")
+    args = parser.parse_args()
+
+    if args.mode == "rerun":
+        try:
+            result = rerun_failed(args.run_dir, args.script, args.resume,
+                                  {"PW_HEADLESS": "1" if args.headless else ""}, args.timeout_s)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if not result["plan"]["tests"]:
+            print(f"No failed steps in {args.run_dir}")
+            return
+        _print_rerun(result, args.resume)
+        print(f"Rerun report: {write_rerun_report(result, args.format)}")
+        return
+
+    try:
+        shards = matrix_shards(
+            [b.strip() for b in args.browsers.split(",") if b.strip()],
+            [v for v in args.viewports.split(",") if v.strip()],
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    env = {"PW_HEADLESS": "1" if args.headless else ""}
+    if args.runs:
+        env["PW_RUNS"] = str(args.runs)
+    summary = run_matrix(args.script, shards, args.out, args.workers, env, args.timeout_s)
+    _print_summary(summary)
+    print(f"Matrix report: {write_matrix(summary, shards, args.format)}")
+
+
+if __name__ == "__main__":
+    main()
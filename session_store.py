@@ -0,0 +1,169 @@
+"""
+Bounded, process-wide storage for per-session results.
+
+A Streamlit session used to keep its parsed test case dicts and export
+bytes in st.session_state for as long as the session lived, so server
+memory grew with every session and batch. ResultCache holds them once per
+process instead:
+
+- values are keyed by content hash, so sessions that generate (or reuse
+  from the repository) the same script, rows or export share one copy
+- parsed rows are TestCaseRecord objects (__slots__, repeated category
+  values interned) rather than one dict per row
+- once the cache exceeds its byte budget, least recently used entries are
+  evicted
+
+A session keeps only a SessionResult, a handful of hashes. get() returns
+None for an evicted entry; rows can then be reloaded from the test case
+repository by function hash, anything else has to be generated again.
+"""
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from testcase_store import FIELD_COLUMNS
+
+DEFAULT_BUDGET_MB = 256
+
+# Row field -> record attribute; beyond the repository columns, rows can carry
+# the dedup flag (fresh batches) and origin (rows reused from the repository)
+RECORD_FIELDS = {
+    **FIELD_COLUMNS,
+    'Duplicate Of': 'duplicate_of',
+    'Function Hash': 'function_hash',
+    'Created At': 'created_at',
+}
+# Fields with a few distinct values repeated across rows and sessions
+INTERNED_FIELDS = {
+    'High Level Feature', 'Feature Name', 'Release/Platform Version', 'Automation Possibility',
+    'Testing Type', 'Priority', 'Data Correctness Checked', 'Function Hash', 'Created At',
+}
+_INTERNED_ATTRS = frozenset(RECORD_FIELDS[f] for f in INTERNED_FIELDS)
+
+
+class TestCaseRecord:
+    """One parsed test case row; fields the row did not have stay None."""
+    __slots__ = tuple(RECORD_FIELDS.values())
+
+    def __init__(self, row: dict):
+        for field, attr in RECORD_FIELDS.items():
+            value = row.get(field)
+            if attr in _INTERNED_ATTRS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, attr, value)
+
+    def as_dict(self) -> dict:
+        return {
+            field: getattr(self, attr)
+            for field, attr in RECORD_FIELDS.items()
+            if getattr(self, attr) is not None
+        }
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+
+def content_key(value) -> str:
+    """SHA-256 of a str/bytes blob or of a tuple of records."""
+    if isinstance(value, tuple):
+        data = json.dumps([record.values() for record in value], default=str).encode("utf-8")
+    else:
+        data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_size(value) -> int:
+    """Bytes held by a blob or a tuple of records, counting each shared string once."""
+    if not isinstance(value, tuple):
+        return sys.getsizeof(value)
+    size = sys.getsizeof(value)
+    seen = set()
+    for record in value:
+        size += sys.getsizeof(record)
+        for item in record.values():
+            if item is not None and id(item) not in seen:
+                seen.add(id(item))
+                size += sys.getsizeof(item)
+    return size
+
+
+class ResultCache:
+    """Content-addressed LRU cache of results, shared by every session in the process."""
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+
+    def put(self, value) -> str:
+        """Store a str/bytes blob; returns its key. A blob already present is shared."""
+        return self._put(value)
+
+    def put_rows(self, rows: list) -> str:
+        """Store parsed test case dicts as records; returns their key."""
+        return self._put(tuple(TestCaseRecord(row) for row in rows))
+
+    def _put(self, value) -> str:
+        key = content_key(value)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["shared"] += 1
+                return key
+            size = estimate_size(value)
+            self._entries[key] = (value, size)
+            self.used_bytes += size
+            # The newest entry stays even if it alone exceeds the budget
+            while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted
+                self.counters["evictions"] += 1
+        return key
+
+    def get(self, key: str):
+        """The stored value, or None if `key` is unknown or was evicted."""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def get_rows(self, key: str):
+        """Stored records back as row dicts, or None."""
+        records = self.get(key)
+        return None if records is None else [record.as_dict() for record in records]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "used_mb": round(self.used_bytes / 1024 / 1024, 2),
+            "budget_mb": round(self.budget_bytes / 1024 / 1024, 2),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class SessionResult:
+    """What a session keeps of its last generation: cache keys, not the data."""
+    function_hash: str
+    script: str                  # key of the generated script
+    rows: str = None             # key of the parsed test case records
+    export: str = None           # key of the test case export bytes
+    export_format: str = None
+    response: str = None         # key of the raw test case response, kept when it did not parse
+    script_filename: str = None
+    bundle: str = None           # key of the download bundle zip
+    bundle_filename: str = None
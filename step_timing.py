@@ -0,0 +1,191 @@
+"""
+Step timing for generated scripts.
+
+Two halves: the runtime helpers at the bottom are copied verbatim into every
+generated script (see TIMING_HELPERS) and record per-step durations,
+expect() wait time and navigation timing into execution_report.xlsx; the
+calibration functions run in the app and turn the slow_steps.json written by
+an adaptive run into per-step timeouts for the next generation, so slow
+pages get the time they need while every other step keeps the tight default.
+"""
+import inspect
+import json
+import math
+
+SLOW_STEPS_FILE = "slow_steps.json"
+
+DEFAULT_STEP_TIMEOUT_MS = 10_000
+SLOW_STEP_MS = 3_000
+MAX_STEP_TIMEOUT_MS = 60_000
+TIMEOUT_HEADROOM = 2.0
+
+
+def load_slow_steps(data) -> list:
+    """
+    Step records from the contents of a slow_steps.json file (str, bytes or
+    parsed dict). Raises ValueError if it is not shaped like one.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        data = json.loads(data) if data.strip() else {}
+    steps = data.get("steps", []) if isinstance(data, dict) else data
+    if not isinstance(steps, list):
+        raise ValueError("expected an object with a 'steps' list")
+    records = [s for s in steps if isinstance(s, dict) and s.get("step")]
+    for record in records:
+        for field in ("duration_ms", "timeout_ms"):
+            value = record.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"'{field}' of step {record['step']!r} is not a number of milliseconds")
+    return records
+
+
+def calibrate_timeouts(records, default_ms: int = DEFAULT_STEP_TIMEOUT_MS,
+                       headroom: float = TIMEOUT_HEADROOM, ceiling_ms: int = MAX_STEP_TIMEOUT_MS) -> dict:
+    """
+    Per-step timeouts from recorded slow steps, keyed by step title.
+
+    A step gets `headroom` times its slowest observed duration, rounded up
+    to a whole second. A step that ran into its timeout gets double that
+    timeout, since its real duration is unknown. Results are clamped to
+    [default_ms, ceiling_ms]; steps that fit the default are left out.
+    """
+    timeouts = {}
+    for record in records:
+        duration = float(record.get("duration_ms") or 0)
+        timeout = float(record.get("timeout_ms") or default_ms)
+        if record.get("status") == "FAIL" and duration >= 0.95 * timeout:
+            wanted = 2 * timeout
+        else:
+            wanted = headroom * duration
+        wanted = min(ceiling_ms, max(default_ms, 1000 * math.ceil(wanted / 1000)))
+        if wanted > default_ms:
+            timeouts[record["step"]] = max(wanted, timeouts.get(record["step"], 0))
+    return dict(sorted(timeouts.items()))
+
+
+def format_step_timeouts(timeouts: dict) -> str:
+    """Python dict literal for the STEP_TIMEOUTS constant in a generated script."""
+    if not timeouts:
+        return "{}"
+    lines = [f"    {json.dumps(step)}: {int(ms)}," for step, ms in timeouts.items()]
+    return "{\n" + "\n".join(lines) + "\n}"
+
+
+# ────────────────────────────────────────────────
+#     Runtime helpers (copied into generated scripts)
+# ────────────────────────────────────────────────
+# These must stay self-contained: they run inside the generated script, not
+# in the app, so they may only use their own local imports.
+
+def navigation_timing(page):
+    """performance.timing milestones of the current document, in ms since navigationStart."""
+    try:
+        return page.evaluate(
+            """() => {
+                const t = performance.timing;
+                const since = (end) => (end > 0 ? end - t.navigationStart : null);
+                return {
+                    ttfb_ms: since(t.responseStart),
+                    dom_content_loaded_ms: since(t.domContentLoadedEventEnd),
+                    load_ms: since(t.loadEventEnd),
+                };
+            }"""
+        )
+    except Exception:
+        return {}
+
+
+def step_record(log, started, ended, expect_wait_ms, navigation=None):
+    """One row of timing data for a step; `started`/`ended` are time.monotonic() values."""
+    import re
+
+    match = re.match(r"Step\d+_(.*?)_(PASS|FAIL)", log)
+    navigation = navigation or {}
+    return {
+        "step": match.group(1) if match else log,
+        "status": match.group(2) if match else "",
+        "log": log,
+        "started": started,
+        "ended": ended,
+        "duration_ms": round((ended - started) * 1000),
+        "expect_wait_ms": round(expect_wait_ms),
+        "ttfb_ms": navigation.get("ttfb_ms"),
+        "dom_content_loaded_ms": navigation.get("dom_content_loaded_ms"),
+        "load_ms": navigation.get("load_ms"),
+    }
+
+
+def step_percentile(values, q):
+    """Nearest-rank percentile, ignoring missing values."""
+    import math
+
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))]
+
+
+def write_timing_report(path, step_timings):
+    """
+    execution_report.xlsx: one row per executed step with its durations,
+    plus a Step Summary sheet with p50/p95 per step across repeated runs.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path)
+    header = workbook.add_format({"bold": True, "bg_color": "#DDEBF7", "border": 1})
+    wrap = workbook.add_format({"text_wrap": True, "valign": "top"})
+
+    columns = [
+        ("Run", "run", 6), ("Test", "test", 18), ("Step Log", "log", 60), ("Status", "status", 8),
+        ("Start (ms)", "start_ms", 11), ("Duration (ms)", "duration_ms", 13),
+        ("Expect Wait (ms)", "expect_wait_ms", 16), ("TTFB (ms)", "ttfb_ms", 10),
+        ("DOM Content Loaded (ms)", "dom_content_loaded_ms", 22), ("Load (ms)", "load_ms", 10),
+    ]
+    run_started = {}
+    for record in step_timings:
+        key = (record.get("run", 1), record.get("test", ""))
+        run_started[key] = min(run_started.get(key, record["started"]), record["started"])
+
+    sheet = workbook.add_worksheet("Execution Report")
+    for col, (title, _, width) in enumerate(columns):
+        sheet.write(0, col, title, header)
+        sheet.set_column(col, col, width)
+    for row, record in enumerate(step_timings, start=1):
+        record = dict(record, run=record.get("run", 1), test=record.get("test", ""))
+        record["start_ms"] = round((record["started"] - run_started[(record["run"], record["test"])]) * 1000)
+        for col, (_, key, _) in enumerate(columns):
+            value = record.get(key)
+            if value is not None:
+                sheet.write(row, col, value, wrap if key == "log" else None)
+    sheet.freeze_panes(1, 0)
+
+    groups = {}
+    for record in step_timings:
+        groups.setdefault((record.get("test", ""), record["step"]), []).append(record)
+
+    metrics = [("Duration", "duration_ms"), ("Expect Wait", "expect_wait_ms"), ("Load", "load_ms")]
+    summary = workbook.add_worksheet("Step Summary")
+    titles = ["Test", "Step", "Runs", "Failures"] + [f"{name} {q} (ms)" for name, _ in metrics for q in ("p50", "p95")]
+    for col, title in enumerate(titles):
+        summary.write(0, col, title, header)
+        summary.set_column(col, col, 30 if col == 1 else 16)
+    for row, ((test, step), records) in enumerate(groups.items(), start=1):
+        values = [test, step, len(records), sum(1 for r in records if r["status"] == "FAIL")]
+        for _, key in metrics:
+            samples = [r.get(key) for r in records]
+            values += [step_percentile(samples, 50), step_percentile(samples, 95)]
+        for col, value in enumerate(values):
+            if value is not None:
+                summary.write(row, col, value)
+    summary.freeze_panes(1, 0)
+
+    workbook.close()
+
+
+RUNTIME_HELPERS = (navigation_timing, step_record, step_percentile, write_timing_report)
+
+# Source pasted into generated scripts by the STEP TIMING RULE
+TIMING_HELPERS = "\n\n".join(inspect.getsource(f) for f in RUNTIME_HELPERS)
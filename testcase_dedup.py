@@ -0,0 +1,222 @@
+"""
+Near-duplicate detection for generated test cases.
+
+Rows are reduced to word shingles of their scenario, steps and expected
+result, hashed into MinHash signatures and bucketed with LSH banding, so a
+lookup only compares against the handful of rows sharing a band instead of
+the whole history.
+
+The history index is persisted in SQLite (one row per signature).
+DedupIndex.sync() appends only the signatures added since the last sync
+and loads the ones other processes (the app, the API server) appended, so
+every process sharing the file sees the same history and no sync rewrites
+it.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+DEFAULT_INDEX_PATH = "testcase_dedup_index.db"
+# Whole-file snapshot written by earlier versions; imported on first load
+LEGACY_INDEX_SUFFIX = ".npz"
+DEDUP_FIELDS = ("Test Scenario", "Step-by-step actions", "Expected Result")
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+def row_shingles(row: dict, size: int = 2) -> set:
+    """Word n-grams over the fields that define what a test case checks."""
+    text = " ".join(str(row.get(field, "")) for field in DEDUP_FIELDS)
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class DedupIndex:
+    """
+    MinHash/LSH index over test case rows.
+
+    With the defaults (64 permutations in 16 bands of 4) pairs at the 0.8
+    threshold collide in some band with probability > 0.99, while candidates
+    are confirmed against the estimated Jaccard similarity of their
+    signatures before being reported. Safe to share between threads.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._buckets = [dict() for _ in range(bands)]
+        self.keys = []
+        self._signatures = []
+        self._lock = threading.RLock()
+        self._pending = []      # (key, signature) added since the last sync()
+        self._synced_id = 0     # last SQLite row seen by sync()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def signature(self, row: dict):
+        """MinHash signature of `row`, or None if its dedup fields hold no words."""
+        shingles = row_shingles(row)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _MERSENNE_PRIME
+        # (a * x + b) mod p for every permutation/shingle pair at once
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray):
+        r = self.rows_per_band
+        for band in range(self.bands):
+            yield band, signature[band * r:(band + 1) * r].tobytes()
+
+    def _query_signature(self, signature) -> list:
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(key, ()))
+            matches = []
+            for idx in sorted(candidates):
+                similarity = float(np.mean(self._signatures[idx] == signature))
+                if similarity >= self.threshold:
+                    matches.append((self.keys[idx], similarity))
+        return sorted(matches, key=lambda m: -m[1])
+
+    def query(self, row: dict) -> list:
+        """Return [(key, estimated_similarity), ...] for indexed near-duplicates of `row`."""
+        return self._query_signature(self.signature(row))
+
+    def _insert(self, key, signature, pending: bool = True):
+        # Rows without dedup text (and the all-prime signatures earlier
+        # versions stored for them) would match each other at 1.0
+        if signature is None or bool(np.all(signature == _MERSENNE_PRIME)):
+            return
+        with self._lock:
+            idx = len(self.keys)
+            self.keys.append(key)
+            self._signatures.append(signature)
+            for band, band_key in self._band_keys(signature):
+                self._buckets[band].setdefault(band_key, []).append(idx)
+            if pending:
+                self._pending.append((key, signature))
+
+    def add(self, key, row: dict) -> list:
+        """
+        Index `row` under `key` and return the near-duplicates it already had.
+        Rows with empty dedup fields are neither indexed nor matched.
+        """
+        signature = self.signature(row)
+        with self._lock:
+            matches = self._query_signature(signature)
+            self._insert(key, signature)
+        return matches
+
+    def add_unique(self, key, row: dict) -> list:
+        """Index `row` under `key` only if it has no near-duplicate yet; returns the near-duplicates."""
+        signature = self.signature(row)
+        with self._lock:
+            matches = self._query_signature(signature)
+            if not matches:
+                self._insert(key, signature)
+        return matches
+
+    def sync(self, path: str) -> int:
+        """
+        Append the signatures added since the last sync to the SQLite file at
+        `path` and index the ones other processes appended meanwhile, in one
+        transaction. Costs O(new signatures); returns how many were loaded.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, key TEXT NOT NULL, signature BLOB NOT NULL)"
+            )
+            conn.execute("BEGIN IMMEDIATE")
+            added = conn.execute(
+                "SELECT id, key, signature FROM signatures WHERE id > ? ORDER BY id", (self._synced_id,)
+            ).fetchall()
+            conn.executemany(
+                "INSERT INTO signatures (key, signature) VALUES (?, ?)",
+                [(json.dumps(key), np.asarray(signature, dtype=np.uint64).tobytes()) for key, signature in pending],
+            )
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM signatures").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                self._pending[:0] = pending
+            raise
+        finally:
+            conn.close()
+
+        with self._lock:
+            for _, key, blob in added:
+                signature = np.frombuffer(blob, dtype=np.uint64)
+                if len(signature) == self.num_perm:
+                    self._insert(json.loads(key), signature, pending=False)
+            self._synced_id = last_id
+        return len(added)
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.8, seed: int = 1):
+        """
+        Index of everything in the SQLite file at `path` (empty if it does not
+        exist yet). A legacy .npz snapshot next to it is imported on first load.
+        """
+        index = cls(threshold=threshold, seed=seed)
+        legacy = os.path.splitext(path)[0] + LEGACY_INDEX_SUFFIX
+        if not os.path.exists(path) and os.path.exists(legacy):
+            with np.load(legacy) as data:
+                if int(data["config"][0]) == index.num_perm:
+                    for key, signature in zip(json.loads(str(data["keys"])), data["signatures"]):
+                        index._insert(key, signature)
+        index.sync(path)
+        return index
+
+
+def mark_duplicates(rows, history: DedupIndex = None, history_prefix: str = "", threshold: float = 0.8) -> list:
+    """
+    Flag near-duplicates in a batch of parsed test case rows.
+
+    Returns one "Duplicate Of" value per row: the Test Case ID of an earlier
+    row in the batch, "history: <key>" for a match in `history`, or "".
+    When `history` is given the rows that are not duplicates are added to
+    it under "<history_prefix><Test Case ID>" keys.
+    """
+    batch = DedupIndex(threshold=threshold)
+    flags = []
+    for row in rows:
+        matches = batch.add_unique(row.get("Test Case ID", ""), row)
+        if matches:
+            flags.append(str(matches[0][0]))
+            continue
+        if history is not None:
+            previous = history.query(row)
+            flags.append(f"history: {previous[0][0]}" if previous else "")
+        else:
+            flags.append("")
+
+    if history is not None:
+        for row, flag in zip(rows, flags):
+            if not flag:
+                history.add(f"{history_prefix}{row.get('Test Case ID', '')}", row)
+    return flags
@@ -0,0 +1,157 @@
+"""
+Two-stage test case planning.
+
+Stage one splits a Playwright codegen function into its distinct flows with a
+local `ast` pass (one flow per page.goto), so no LLM call is needed to plan.
+Stage two generates test cases per flow in parallel; the responses are merged
+back into one document with sequential TC-IDs and near-duplicates removed.
+"""
+import ast
+import re
+import textwrap
+
+from testcase_dedup import DEDUP_FIELDS, DedupIndex
+
+MAX_FLOWS = 6
+
+NAVIGATION_METHODS = {"goto"}
+FORM_METHODS = {"fill", "type", "press_sequentially", "select_option", "check", "uncheck", "set_input_files"}
+CLICK_METHODS = {"click", "dblclick", "tap"}
+
+TESTCASE_BLOCK_SPLIT = r'\n(?=\* High Level Feature:)'
+
+
+def _find_function(tree: ast.Module):
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return node
+    return None
+
+
+def _flatten(statements):
+    """Yield executable statements, descending into with-blocks (codegen's run() wrapper)."""
+    for stmt in statements:
+        if isinstance(stmt, (ast.With, ast.AsyncWith)):
+            yield from _flatten(stmt.body)
+        else:
+            yield stmt
+
+
+def _method_calls(stmt):
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            yield node
+
+
+def _describe_target(source: str, call: ast.Call) -> str:
+    """Short human-readable label for the locator a call acts on."""
+    if isinstance(call.func.value, ast.Name) and call.args and isinstance(call.args[0], ast.Constant):
+        return str(call.args[0].value)
+    for node in ast.walk(call.func.value):
+        if isinstance(node, ast.Call):
+            for kw in node.keywords:
+                if kw.arg == "name" and isinstance(kw.value, ast.Constant):
+                    return str(kw.value.value)
+            if node.args and isinstance(node.args[0], ast.Constant):
+                return str(node.args[0].value)
+    return (ast.get_source_segment(source, call.func.value) or "").strip()[:60]
+
+
+def _new_flow():
+    return {"url": "", "statements": [], "fills": [], "clicks": []}
+
+
+def extract_flows(source: str) -> list:
+    """
+    Split the first function in `source` into flows.
+
+    A flow starts at each page.goto(...) and collects the forms filled and
+    buttons clicked until the next navigation. Returns a list of dicts with
+    keys url, code, fills and clicks. Unparseable input yields one flow
+    holding the whole source.
+    """
+    source = textwrap.dedent(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return [{"url": "", "code": source, "fills": [], "clicks": []}]
+
+    func = _find_function(tree)
+    statements = list(_flatten(func.body if func else tree.body))
+
+    flows = []
+    current = _new_flow()
+    for stmt in statements:
+        calls = list(_method_calls(stmt))
+        goto = next((c for c in calls if c.func.attr in NAVIGATION_METHODS), None)
+        if goto is not None and (current["fills"] or current["clicks"]):
+            flows.append(current)
+            current = _new_flow()
+        if goto is not None and goto.args and isinstance(goto.args[0], ast.Constant):
+            current["url"] = current["url"] or str(goto.args[0].value)
+
+        for call in calls:
+            if call.func.attr in FORM_METHODS:
+                current["fills"].append(_describe_target(source, call))
+            elif call.func.attr in CLICK_METHODS:
+                current["clicks"].append(_describe_target(source, call))
+        current["statements"].append(ast.get_source_segment(source, stmt))
+
+    if current["statements"]:
+        flows.append(current)
+
+    # Keep the fan-out bounded: fold neighbouring flows together
+    while len(flows) > MAX_FLOWS:
+        smallest = min(range(len(flows) - 1), key=lambda i: len(flows[i]["statements"]) + len(flows[i + 1]["statements"]))
+        left, right = flows[smallest], flows.pop(smallest + 1)
+        left["statements"] += right["statements"]
+        left["fills"] += right["fills"]
+        left["clicks"] += right["clicks"]
+
+    for flow in flows:
+        flow["code"] = "\n".join(s for s in flow.pop("statements") if s)
+    return flows
+
+
+def describe_flow(flow: dict) -> str:
+    """One-paragraph summary of a flow, used to focus the per-flow prompt."""
+    lines = [f"URL visited: {flow['url'] or 'None (continues on the current page)'}"]
+    if flow["fills"]:
+        lines.append("Forms/fields filled: " + ", ".join(dict.fromkeys(flow["fills"])))
+    if flow["clicks"]:
+        lines.append("Buttons/links clicked: " + ", ".join(dict.fromkeys(flow["clicks"])))
+    return "\n".join(lines)
+
+
+def split_testcase_blocks(test_cases_str: str) -> list:
+    return [b.strip() for b in re.split(TESTCASE_BLOCK_SPLIT, test_cases_str.strip()) if b.strip()]
+
+
+def _field(block: str, name: str) -> str:
+    match = re.search(rf'\* {re.escape(name)}:\s*(.+?)(?=\n\*|\Z)', block, re.DOTALL | re.IGNORECASE)
+    return re.sub(r'\s+', ' ', match.group(1)).strip() if match else ''
+
+
+def merge_testcase_responses(responses, similarity: float = 0.8) -> str:
+    """
+    Merge per-flow LLM responses into one test case document.
+
+    Blocks that are near-duplicates (scenario, steps and expected result at
+    `similarity` or above) of an earlier block are dropped, and the remaining
+    blocks are renumbered TC-1..TC-N in order.
+    """
+    index = DedupIndex(threshold=similarity)
+    kept = []
+    for response in responses:
+        for block in split_testcase_blocks(response):
+            if not re.search(r'\* Test Case ID:', block, re.IGNORECASE):
+                continue
+            if index.add_unique(len(kept), {field: _field(block, field) for field in DEDUP_FIELDS}):
+                continue
+            kept.append(block)
+
+    renumbered = [
+        re.sub(r'(\* Test Case ID:\s*)TC-\s*\d+', rf'\g<1>TC-{i}', block, count=1, flags=re.IGNORECASE)
+        for i, block in enumerate(kept, start=1)
+    ]
+    return "\n\n".join(renumbered)
@@ -0,0 +1,193 @@
+"""
+Persistent test case repository.
+
+Every generated test case is kept in SQLite together with the hash of the
+codegen function it came from, so previous runs can be searched (FTS5 over
+the descriptive fields), filtered by priority/testing type and re-exported
+without calling the LLM again.
+"""
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+from report_writers import write_rows
+
+DEFAULT_STORE_PATH = "testcase_repository.db"
+
+# Parsed test case field -> column name
+FIELD_COLUMNS = {
+    'High Level Feature': 'high_level_feature',
+    'Test Case ID': 'test_case_id',
+    'Feature Name': 'feature_name',
+    'Test Scenario': 'test_scenario',
+    'Test Case': 'test_case',
+    'Test Case Description': 'test_case_description',
+    'Step-by-step actions': 'steps',
+    'Possible Values': 'possible_values',
+    'Sources': 'sources',
+    'Expected Result': 'expected_result',
+    'Data Correctness Checked': 'data_correctness_checked',
+    'Release/Platform Version': 'platform_version',
+    'Automation Possibility': 'automation_possibility',
+    'Testing Type': 'testing_type',
+    'Priority': 'priority',
+}
+SEARCH_COLUMNS = ('feature_name', 'test_scenario', 'test_case', 'test_case_description', 'steps', 'expected_result')
+FACET_FIELDS = {'Priority': 'priority', 'Testing Type': 'testing_type', 'High Level Feature': 'high_level_feature'}
+EXPORT_FIELDS = list(FIELD_COLUMNS) + ['Function Hash', 'Created At']
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS test_cases (
+    id INTEGER PRIMARY KEY,
+    function_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    {", ".join(f"{col} TEXT NOT NULL DEFAULT ''" for col in FIELD_COLUMNS.values())}
+);
+CREATE INDEX IF NOT EXISTS ix_test_cases_function ON test_cases(function_hash, created_at);
+CREATE INDEX IF NOT EXISTS ix_test_cases_priority ON test_cases(priority);
+CREATE INDEX IF NOT EXISTS ix_test_cases_testing_type ON test_cases(testing_type);
+CREATE VIRTUAL TABLE IF NOT EXISTS test_cases_fts USING fts5(
+    {", ".join(SEARCH_COLUMNS)}, content='test_cases', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS test_cases_ai AFTER INSERT ON test_cases BEGIN
+    INSERT INTO test_cases_fts(rowid, {", ".join(SEARCH_COLUMNS)})
+    VALUES (new.id, {", ".join(f"new.{c}" for c in SEARCH_COLUMNS)});
+END;
+CREATE TRIGGER IF NOT EXISTS test_cases_ad AFTER DELETE ON test_cases BEGIN
+    INSERT INTO test_cases_fts(test_cases_fts, rowid, {", ".join(SEARCH_COLUMNS)})
+    VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in SEARCH_COLUMNS)});
+END;
+"""
+
+
+def function_hash(code: str) -> str:
+    """Hash of a codegen function, insensitive to indentation and blank lines."""
+    normalized = "\n".join(line.strip() for line in code.strip().splitlines() if line.strip())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match (prefix match)."""
+    words = [w.replace('"', '') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w)
+
+
+class TestCaseStore:
+    """SQLite-backed store of generated test cases, shared across sessions."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def add_test_cases(self, code_hash: str, rows, created_at: str = None) -> int:
+        """Store parsed test case rows generated from the function with `code_hash`."""
+        created_at = created_at or datetime.now().isoformat(timespec="seconds")
+        columns = ["function_hash", "created_at"] + list(FIELD_COLUMNS.values())
+        values = [
+            [code_hash, created_at] + [str(row.get(field, "") or "") for field in FIELD_COLUMNS]
+            for row in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO test_cases ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+        return len(values)
+
+    def latest_for_function(self, code_hash: str) -> list:
+        """Rows of the most recent run stored for `code_hash` (empty if never seen)."""
+        with self._lock:
+            latest = self._conn.execute(
+                "SELECT MAX(created_at) FROM test_cases WHERE function_hash = ?", (code_hash,)
+            ).fetchone()[0]
+            if latest is None:
+                return []
+            cursor = self._conn.execute(
+                "SELECT * FROM test_cases WHERE function_hash = ? AND created_at = ? ORDER BY id",
+                (code_hash, latest),
+            )
+            return [self._to_row(r) for r in cursor]
+
+    def _where(self, query="", priorities=None, testing_types=None, code_hash=None):
+        clauses, params = [], []
+        if query and _fts_query(query):
+            clauses.append("id IN (SELECT rowid FROM test_cases_fts WHERE test_cases_fts MATCH ?)")
+            params.append(_fts_query(query))
+        if priorities:
+            clauses.append(f"priority IN ({', '.join('?' * len(priorities))})")
+            params.extend(priorities)
+        if testing_types:
+            clauses.append(f"testing_type IN ({', '.join('?' * len(testing_types))})")
+            params.extend(testing_types)
+        if code_hash:
+            clauses.append("function_hash = ?")
+            params.append(code_hash)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, query="", priorities=None, testing_types=None, code_hash=None) -> int:
+        where, params = self._where(query, priorities, testing_types, code_hash)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM test_cases{where}", params).fetchone()[0]
+
+    def search(self, query="", priorities=None, testing_types=None, code_hash=None, limit=None):
+        """
+        Yield matching rows, newest first.
+
+        Rows are fetched from the cursor in batches, so exporting a large
+        filtered subset never materialises the whole result.
+        """
+        where, params = self._where(query, priorities, testing_types, code_hash)
+        sql = f"SELECT * FROM test_cases{where} ORDER BY created_at DESC, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        # A dedicated connection keeps the stream independent of concurrent writes
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                batch = cursor.fetchmany(500)
+                if not batch:
+                    break
+                for r in batch:
+                    yield self._to_row(r)
+        finally:
+            conn.close()
+
+    def facets(self, query="", code_hash=None) -> dict:
+        """Value counts per facet field for the rows matching `query`."""
+        where, params = self._where(query, code_hash=code_hash)
+        result = {}
+        with self._lock:
+            for field, column in FACET_FIELDS.items():
+                cursor = self._conn.execute(
+                    f"SELECT {column}, COUNT(*) FROM test_cases{where} GROUP BY {column} ORDER BY COUNT(*) DESC",
+                    params,
+                )
+                result[field] = {value: n for value, n in cursor if value}
+        return result
+
+    @staticmethod
+    def _to_row(record: sqlite3.Row) -> dict:
+        row = {field: record[column] for field, column in FIELD_COLUMNS.items()}
+        row['Function Hash'] = record['function_hash']
+        row['Created At'] = record['created_at']
+        return row
+
+
+def stream_to_excel(rows, target, fields=EXPORT_FIELDS):
+    """
+    Write rows to an .xlsx file or binary buffer with openpyxl's write-only mode.
+
+    Cells are flushed as they are appended, so memory stays flat no matter
+    how many rows the iterator produces. Returns the number of rows written.
+    """
+    return write_rows("xlsx", rows, target, fields, title="Test Cases")
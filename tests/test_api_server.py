@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from api_server import ApiConfig, ApiError, create_app, parse_generate_request
+from page_anchors import DEFAULT_VALIDATION_SCOPE
+
+CODE = "def test_login(page):\n    page.goto('https://example.com')\n"
+
+
+@pytest.fixture
+def client(tmp_path):
+    config = ApiConfig(
+        max_body_bytes=1000,
+        store_path=str(tmp_path / "store.db"),
+        dedup_index_path=str(tmp_path / "index.db"),
+    )
+    with TestClient(create_app(config)) as client:
+        yield client
+
+
+def test_null_options_take_their_defaults():
+    options = parse_generate_request({"code": CODE, "validation_scope": None, "api": None, "optimize": None})
+
+    assert options["validation_scope"] == DEFAULT_VALIDATION_SCOPE
+    assert options["api"] == "sync"
+    assert options["optimize"] is False
+
+
+def test_null_code_is_rejected():
+    with pytest.raises(ApiError) as error:
+        parse_generate_request({"code": None})
+    assert error.value.status == 400
+
+
+def test_body_over_limit_is_rejected_while_streaming(client):
+    def chunks():
+        yield b'{"code": "'
+        for _ in range(20):
+            yield b"x" * 100
+        yield b'"}'
+
+    # No Content-Length: the body arrives chunked, so only the streamed size can reject it
+    response = client.post("/v1/generate", content=chunks())
+
+    assert response.status_code == 413
+    assert response.json() == {"error": "Request body too large"}
+
+
+def test_declared_length_over_limit_is_rejected(client):
+    response = client.post("/v1/generate", content=json.dumps({"code": "x" * 2000}))
+
+    assert response.status_code == 413
+
+
+def test_invalid_json_is_rejected(client):
+    response = client.post("/v1/generate", content=b"{not json")
+
+    assert response.status_code == 400
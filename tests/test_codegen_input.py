@@ -0,0 +1,97 @@
+import ast
+import asyncio
+import io
+
+from codegen_input import function_with_body, read_codegen_upload, splice_into_function, split_function, strip_codegen_noise
+
+POPUP_RECORDING = '''\
+def test_popup(page):
+    page.goto("https://example.com/")
+    page.get_by_role("button", name="+").click()
+    page.get_by_role("button", name="+").click()
+    with page.expect_popup() as page1_info:
+        page.get_by_role("link", name="Open help").click()
+    page1 = page1_info.value
+    page1.goto("https://example.com/help")
+    page1.get_by_role("button", name="Next").click()
+    page1.get_by_role("button", name="Next").click()
+'''
+
+
+def _actions(source):
+    """Every recorded call, in order, as source text."""
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+    ]
+
+
+def test_strip_codegen_noise_keeps_repeated_actions():
+    lines = POPUP_RECORDING.splitlines()
+    stats = {}
+    assert list(strip_codegen_noise(lines, stats)) == lines
+    assert stats == {"lines": len(lines), "dropped": 0}
+
+
+def test_strip_codegen_noise_collapses_blank_runs():
+    stats = {}
+    kept = list(strip_codegen_noise(["a = 1", "", "", "   ", "b = 2"], stats))
+    assert kept == ["a = 1", "", "b = 2"]
+    assert stats["dropped"] == 2
+
+
+def test_read_codegen_upload_leaves_stream_open():
+    stream = io.BytesIO(POPUP_RECORDING.replace("\n", "\r\n").encode("utf-8"))
+    assert read_codegen_upload(stream) == POPUP_RECORDING
+    assert not stream.closed
+
+
+def test_split_function_keeps_with_blocks_whole():
+    header, chunks = split_function(POPUP_RECORDING, chunk_tokens=20)
+    assert header == "def test_popup(page):"
+    assert len(chunks) > 1
+    assert any(chunk.startswith("with page.expect_popup() as page1_info:") for chunk in chunks)
+    for chunk in chunks:
+        ast.parse(chunk)
+
+    rebuilt = function_with_body(header, "\n".join(chunks))
+    ast.parse(rebuilt)
+    assert _actions(rebuilt) == _actions(POPUP_RECORDING)
+
+
+def test_split_function_binds_popup_before_use():
+    header, chunks = split_function(POPUP_RECORDING, chunk_tokens=20)
+    script = function_with_body(header, chunks[0])
+    for chunk in chunks[1:]:
+        script = splice_into_function(script, "test_popup", [chunk])
+    source = ast.parse(script)
+    assigned = [n.id for n in ast.walk(source) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)]
+    assert "page1_info" in assigned and "page1" in assigned
+    assert _actions(script) == _actions(POPUP_RECORDING)
+
+
+def test_splice_goes_before_the_trailing_return():
+    script = '''\
+import asyncio
+
+
+async def test_checkout(page):
+    step_timings = []
+    step_timings.append("step_1")
+    return step_timings
+'''
+    chunks = ['step_timings.append("step_2")\n', 'step_timings.append("step_3")\n']
+
+    spliced = splice_into_function(script, "test_checkout", chunks)
+
+    namespace = {}
+    exec(compile(spliced, "script.py", "exec"), namespace)
+    assert asyncio.run(namespace["test_checkout"](None)) == ["step_1", "step_2", "step_3"]
+    assert spliced.rstrip().endswith("return step_timings")
+
+
+def test_split_function_without_function():
+    assert split_function("page.goto('x')") is None
+    assert split_function("def broken(:") is None
@@ -0,0 +1,86 @@
+import ast
+
+from codegen_optimizer import codegen_diff, optimize_codegen
+
+RECORDING = '''\
+def test_checkout(page):
+    page.goto("https://shop.example.com/")
+    page.goto("https://shop.example.com")
+    page.get_by_placeholder("Search").click()
+    page.get_by_placeholder("Search").fill("shoes")
+    page.get_by_placeholder("Search").fill("shoes")
+    page.keyboard.press("Tab")
+    page.keyboard.press("Tab")
+    page.get_by_role("button", name="Search").click()
+    page.get_by_role("button", name="+").click()
+    page.get_by_role("button", name="+").click()
+    page.get_by_label("Gift wrap").check()
+    page.get_by_label("Gift wrap").check()
+    with page.expect_popup() as page1_info:
+        page.get_by_role("link", name="Size guide").click()
+    page1 = page1_info.value
+    page1.close()
+'''
+
+
+def _actions(source):
+    """Every recorded call, in order, as source text."""
+    calls = [node for node in ast.walk(ast.parse(source)) if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)]
+    return [ast.get_source_segment(source, node) for node in sorted(calls, key=lambda node: node.lineno)]
+
+
+def test_optimized_recording_parses_and_keeps_real_steps():
+    optimized, changes = optimize_codegen(RECORDING)
+
+    ast.parse(optimized)
+    assert _actions(optimized) == [
+        'page.goto("https://shop.example.com/")',
+        'page.get_by_placeholder("Search").fill("shoes")',
+        'page.get_by_role("button", name="Search").click()',
+        'page.get_by_role("button", name="+").click()',
+        'page.get_by_role("button", name="+").click()',
+        'page.get_by_label("Gift wrap").check()',
+        'page.get_by_label("Gift wrap").check()',
+        'page.get_by_role("link", name="Size guide").click()',
+        "page1.close()",
+    ]
+    assert len(changes) == 5
+
+
+def test_every_removal_is_reported_in_the_diff():
+    optimized, changes = optimize_codegen(RECORDING)
+    removed = [line[1:].strip() for line in codegen_diff(RECORDING, optimized).splitlines()
+               if line.startswith("-") and not line.startswith("---")]
+
+    assert len(removed) == len(changes)
+    assert all(any(line in change for change in changes) for line in removed)
+
+
+def test_goto_after_an_action_is_kept():
+    source = '''\
+def test_reload(page):
+    page.goto("https://example.com/")
+    page.get_by_role("button", name="Save").click()
+    page.goto("https://example.com/")
+'''
+    optimized, changes = optimize_codegen(source)
+
+    assert changes == []
+    assert _actions(optimized) == _actions(source)
+
+
+def test_block_is_never_emptied():
+    source = '''\
+def test_popup(page):
+    with page.expect_popup() as popup_info:
+        page.keyboard.press("Tab")
+    popup_info.value.get_by_role("button", name="OK").click()
+'''
+    optimized, _ = optimize_codegen(source)
+
+    ast.parse(optimized)
+    assert 'page.keyboard.press("Tab")' in optimized
+
+
+def test_unparseable_input_is_returned_unchanged():
+    assert optimize_codegen("def broken(:\n") == ("def broken(:\n", [])
@@ -0,0 +1,82 @@
+import ast
+import re
+
+from page_anchors import anchor_plan, extract_anchors, format_anchor_constants, format_validation_plan
+
+CHECKOUT = '''\
+def test_checkout(page):
+    page.goto("https://shop.example.com/")
+    page.get_by_placeholder("Search products").press("Enter")
+    expect(page.locator("body")).to_contain_text("Search results for running shoes Filter by size Sort by price")
+    page.get_by_role("button", name="Add to cart").click()
+    expect(page.locator("body")).to_contain_text("Added to your cart Trail Runner 2 Continue shopping")
+    page.get_by_role("button", name="+").click()
+    expect(page.locator("body")).to_contain_text("Added to your cart Trail Runner 2 Continue shopping")
+    with page.expect_popup() as page1_info:
+        page.get_by_role("link", name="Size guide").click()
+    expect(page.locator("body")).to_contain_text("Size guide: \\"EU\\" and \\"US\\" sizes")
+'''
+EXPECTED_TEXTS = [
+    "Search results for running shoes Filter by size Sort by price",
+    "Added to your cart Trail Runner 2 Continue shopping",
+    'Size guide: "EU" and "US" sizes',
+]
+
+
+def _constants(source):
+    """The pasted constants block, executed as the generated script would."""
+    namespace = {}
+    block = "import re\n" + format_anchor_constants(source)
+    ast.parse(block)
+    exec(block, namespace)
+    return {name: value for name, value in namespace.items() if name.startswith("ANCHORS_")}
+
+
+def test_constants_parse_and_match_their_own_text():
+    constants = _constants(CHECKOUT)
+
+    assert sorted(constants) == ["ANCHORS_1", "ANCHORS_2", "ANCHORS_3"]
+    for name, text in zip(sorted(constants), EXPECTED_TEXTS):
+        assert constants[name].flags & re.IGNORECASE
+        assert constants[name].search(text)
+        assert constants[name].search(text.upper())
+
+
+def test_pattern_needs_every_anchor():
+    constants = _constants(CHECKOUT)
+
+    assert not constants["ANCHORS_1"].search("Search results for running shoes Sort by price")
+    assert constants["ANCHORS_1"].search("Sort by price | Filter by size | Search results for running shoes")
+
+
+def test_plan_validates_the_action_before_each_new_anchor_set():
+    _, validations = anchor_plan(CHECKOUT)
+
+    assert validations == (
+        ('page.get_by_placeholder("Search products").press("Enter")', "ANCHORS_1"),
+        ('page.get_by_role("button", name="Add to cart").click()', "ANCHORS_2"),
+        ('page.get_by_role("link", name="Size guide").click()', "ANCHORS_3"),
+    )
+    # Every planned step is a statement of the recording
+    assert all(statement in CHECKOUT for statement, _ in validations)
+
+
+def test_plan_is_limited_to_a_chunk():
+    chunk = 'page.get_by_role("button", name="Add to cart").click()\n'
+
+    assert format_validation_plan(CHECKOUT, within=chunk) == (
+        '    page.get_by_role("button", name="Add to cart").click()\n        -> ANCHORS_2'
+    )
+
+
+def test_anchors_skip_digits_and_sentence_debris():
+    assert extract_anchors("Your cart Subtotal (2 items) Proceed to checkout") == (
+        "Your cart", "Subtotal", "Proceed to checkout",
+    )
+
+
+def test_no_expectations_means_no_constants():
+    source = 'def test_open(page):\n    page.goto("https://example.com/")\n'
+
+    assert _constants(source) == {}
+    assert "no step validates anchors" in format_validation_plan(source)
@@ -0,0 +1,221 @@
+import ast
+import asyncio
+
+from pipeline import ASYNC_RUNTIME_RULES
+from playwright_async import to_async_playwright
+
+CODEGEN_SCRIPT = '''\
+import re
+from playwright.sync_api import Page, Playwright, expect, sync_playwright
+
+
+def run(playwright: Playwright) -> None:
+    browser = playwright.chromium.launch(headless=False)
+    context = browser.new_context()
+    page = context.new_page()
+    page.goto("https://example.com/")
+    page.get_by_role("button", name="+").click()
+    page.get_by_role("button", name="+").click()
+    page.get_by_label("Email").fill("user@example.com")
+    expect(page.locator("body")).to_contain_text(re.compile(r"Welcome", re.IGNORECASE))
+    with page.expect_popup() as page1_info:
+        page.get_by_role("link", name="Help").click()
+    page1 = page1_info.value
+    page1.get_by_role("button", name="Close").click()
+    context.close()
+    browser.close()
+
+
+with sync_playwright() as playwright:
+    run(playwright)
+'''
+
+
+def _calls(tree):
+    """(source line, awaited) for every call statement, in source order."""
+    calls = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Expr):
+            value = node.value
+            awaited = isinstance(value, ast.Await)
+            call = value.value if awaited else value
+            if isinstance(call, ast.Call):
+                calls.append((node.lineno, ast.unparse(call), awaited))
+    return [(text, awaited) for _, text, awaited in sorted(calls)]
+
+
+def test_codegen_script_converts_and_keeps_every_action():
+    converted = to_async_playwright(CODEGEN_SCRIPT)
+
+    tree = ast.parse(converted)
+    sync_calls = [text for text, _ in _calls(ast.parse(CODEGEN_SCRIPT))]
+    # The module-level block moves into main(), started by asyncio.run(main())
+    async_calls = [(text, awaited) for text, awaited in _calls(tree) if text != "asyncio.run(main())"]
+    assert [text for text, _ in async_calls] == sync_calls
+    assert all(awaited for _, awaited in async_calls)
+    assert "from playwright.async_api import" in converted
+    assert "async with page.expect_popup() as page1_info:" in converted
+    assert "page1 = await page1_info.value" in converted
+    assert "async with async_playwright() as playwright:" in converted
+
+
+def test_locator_factories_are_not_awaited():
+    tree = ast.parse(to_async_playwright(CODEGEN_SCRIPT))
+
+    awaited = [node.value for node in ast.walk(tree) if isinstance(node, ast.Await) and isinstance(node.value, ast.Call)]
+    methods = {call.func.attr for call in awaited if isinstance(call.func, ast.Attribute)}
+    assert {"click", "fill", "goto", "to_contain_text"} <= methods
+    assert not {m for m in methods if m.startswith("get_by_") or m in ("locator", "expect_popup")}
+
+
+def test_conversion_is_idempotent():
+    once = to_async_playwright(CODEGEN_SCRIPT)
+
+    assert to_async_playwright(once) == once
+
+
+def test_instrumented_step_keeps_its_try_block():
+    source = '''\
+from playwright.sync_api import Page, expect
+
+
+def test_login(page: Page) -> None:
+    try:
+        page.get_by_role("button", name="Login").click()
+        expect(page.locator(VALIDATION_SCOPE)).to_contain_text(ANCHORS_1)
+        page.screenshot(path="1_click_login_PASS.png")
+        step_logs.append("Step1_click_login_PASS")
+    except Exception as e:
+        page.screenshot(path="1_click_login_FAIL.png")
+        step_logs.append(f"Step1_click_login_FAIL - {str(e)}")
+'''
+    converted = to_async_playwright(source)
+
+    ast.parse(converted)
+    assert "async def test_login(page: Page) -> None:" in converted
+    assert [text for text, _ in _calls(ast.parse(converted))] == [text for text, _ in _calls(ast.parse(source))]
+    assert 'await expect(page.locator(VALIDATION_SCOPE)).to_contain_text(ANCHORS_1)' in converted
+    assert converted.count("await page.screenshot(") == 2
+    assert 'step_logs.append("Step1_click_login_PASS")' in converted
+    assert "await step_logs" not in converted
+
+
+# run_test() and main() exactly as ASYNC_RUNTIME_RULES prescribes them
+ASYNC_RUNNER = '''\
+async def run_test(browser, test, run):
+    resume_context, resume_url = resume_options(RESUME, test.__name__)
+    context = await browser.new_context(**CONTEXT_OPTIONS, **resume_context)
+    page = await context.new_page()
+    try:
+        if resume_url:
+            await page.goto(resume_url)
+        step_timings = await test(page)
+        for record in step_timings:
+            record.update(run=run, test=test.__name__)
+        return step_timings
+    finally:
+        await context.close()
+
+
+async def main():
+    global RUN
+    async with async_playwright() as p:
+        browser = await p[BROWSER].launch(**LAUNCH_OPTIONS)
+        results = []
+        for run in range(1, RUNS + 1):
+            RUN = run
+            results += await asyncio.gather(*(run_test(browser, t, run) for t in TESTS))
+        await browser.close()
+    return results
+'''
+
+
+class FakePage:
+    async def goto(self, url):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    async def new_context(self, **options):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getitem__(self, name):
+        return self
+
+    async def launch(self, **options):
+        return FakeBrowser()
+
+
+def _runner_namespace(tests_running):
+    def make_test(name):
+        async def test(page):
+            tests_running["now"] += 1
+            tests_running["peak"] = max(tests_running["peak"], tests_running["now"])
+            await asyncio.sleep(0.01)
+            tests_running["now"] -= 1
+            return [{"step": "step_1"}]
+        test.__name__ = name
+        return test
+
+    return {
+        "asyncio": asyncio, "async_playwright": FakePlaywright, "BROWSER": "chromium",
+        "LAUNCH_OPTIONS": {}, "CONTEXT_OPTIONS": {}, "RESUME": {}, "RUNS": 2, "RUN": 1,
+        "resume_options": lambda plan, name: ({}, None), "TESTS": [make_test(name) for name in ("test_a", "test_b", "test_c")],
+    }
+
+
+def test_prescribed_async_runner_stays_concurrent():
+    gather_line = "asyncio.gather(*(run_test(browser, t, run) for t in TESTS))"
+    assert gather_line in ASYNC_RUNTIME_RULES
+
+    converted = to_async_playwright(ASYNC_RUNNER)
+
+    assert converted == ASYNC_RUNNER
+    tests_running = {"now": 0, "peak": 0}
+    namespace = _runner_namespace(tests_running)
+    exec(compile(converted, "runner.py", "exec"), namespace)
+    results = asyncio.run(namespace["main"]())
+    # Three tests per run side by side, two runs one after another
+    assert tests_running["peak"] == 3
+    assert [r[0]["run"] for r in results] == [1, 1, 1, 2, 2, 2]
+
+
+def test_calls_in_comprehensions_and_scheduled_calls_are_not_awaited():
+    source = '''\
+async def run_test(browser, test):
+    await browser.new_page()
+
+
+async def main(browser, tests):
+    results = await asyncio.gather(*[run_test(browser, t) for t in tests])
+    task = asyncio.create_task(run_test(browser, tests[0]))
+    await asyncio.wait_for(run_test(browser, tests[1]), 5)
+    await task
+    return results
+'''
+    converted = to_async_playwright(source)
+
+    assert converted == source
+
+
+def test_unparseable_input_is_returned_unchanged():
+    assert to_async_playwright("def broken(:\n") == "def broken(:\n"
@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+
+from script_runner import last_checkpoint, plan_rerun, save_checkpoint, skipped_bindings
+
+
+class FakeContext:
+    def storage_state(self):
+        return {"cookies": [], "origins": []}
+
+
+class FakePage:
+    url = "https://example.com/cart"
+    context = FakeContext()
+
+
+def test_checkpoints_are_off_unless_enabled(tmp_path, monkeypatch):
+    monkeypatch.delenv("PW_CHECKPOINTS", raising=False)
+
+    save_checkpoint(FakePage(), str(tmp_path), "test_checkout", 1, 1)
+
+    assert not os.path.exists(tmp_path / "checkpoints")
+
+
+def test_last_checkpoint_comes_from_the_failing_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("PW_CHECKPOINTS", "1")
+    save_checkpoint(FakePage(), str(tmp_path), "test_checkout", 1, 1)
+    save_checkpoint(FakePage(), str(tmp_path), "test_checkout", 1, 2)
+    save_checkpoint(FakePage(), str(tmp_path), "test_checkout", 2, 1)
+
+    assert last_checkpoint(str(tmp_path), "test_checkout", 2, 4)["after_step"] == 1
+    assert last_checkpoint(str(tmp_path), "test_checkout", 1, 4)["after_step"] == 2
+    assert last_checkpoint(str(tmp_path), "test_checkout", 1, 2)["after_step"] == 1
+    assert last_checkpoint(str(tmp_path), "test_checkout", 3, 4) is None
+
+
+POPUP_SCRIPT = '''\
+def test_help(page):
+    global step_number
+    skip_steps = RESUME.get("test_help", {}).get("after_step", 0)
+
+    if step_number > skip_steps:
+        try:
+            page.goto("https://example.com/")
+            step_logs.append(f"Step{step_number}_goto_example_PASS")
+        except Exception as e:
+            step_logs.append(f"Step{step_number}_goto_example_FAIL - {str(e)}")
+    step_number += 1
+
+    if step_number > skip_steps:
+        try:
+            with page.expect_popup() as page1_info:
+                page.get_by_role("link", name="Help").click()
+            step_logs.append(f"Step{step_number}_click_help_link_PASS")
+        except Exception as e:
+            step_logs.append(f"Step{step_number}_click_help_link_FAIL - {str(e)}")
+    step_number += 1
+
+    if step_number > skip_steps:
+        try:
+            page1 = page1_info.value
+            step_logs.append(f"Step{step_number}_get_popup_page_PASS")
+        except Exception as e:
+            step_logs.append(f"Step{step_number}_get_popup_page_FAIL - {str(e)}")
+    step_number += 1
+
+    if step_number > skip_steps:
+        try:
+            page1.get_by_role("button", name="Next").click()
+            step_logs.append(f"Step{step_number}_click_next_button_PASS")
+        except Exception as e:
+            step_logs.append(f"Step{step_number}_click_next_button_FAIL - {str(e)}")
+    step_number += 1
+'''
+
+
+class FakePopupInfo:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def value(self):
+        return FakeBrowserPage()
+
+
+class FakeBrowserPage(FakePage):
+    def goto(self, url):
+        pass
+
+    def get_by_role(self, role, name=None):
+        return self
+
+    def click(self):
+        pass
+
+    def expect_popup(self):
+        return FakePopupInfo()
+
+
+def _execute(resume_plan, test="test_help"):
+    """Run POPUP_SCRIPT's test as the generated script would with PW_RESUME set; returns its step logs."""
+    namespace = {"RESUME": resume_plan, "step_number": 1, "step_logs": []}
+    exec(compile(POPUP_SCRIPT, "test_help.py", "exec"), namespace)
+    namespace[test](FakeBrowserPage())
+    return namespace["step_logs"]
+
+
+def _failed_run(run_dir, monkeypatch, fails_at):
+    """A run folder whose report fails test_help at step `fails_at`, with checkpoints before it."""
+    os.makedirs(run_dir)
+    logs = ["Step1_goto_example_PASS", "Step2_click_help_link_PASS", "Step3_get_popup_page_PASS",
+            "Step4_click_next_button_PASS"][:fails_at - 1] + [f"Step{fails_at}_failing_step_FAIL - Timeout"]
+    pd.DataFrame({"Run": 1, "Test": "test_help", "Step Log": logs}).to_excel(
+        os.path.join(run_dir, "execution_report.xlsx"), index=False
+    )
+    with open(os.path.join(run_dir, "test_help.py"), "w", encoding="utf-8") as f:
+        f.write(POPUP_SCRIPT)
+    monkeypatch.setenv("PW_CHECKPOINTS", "1")
+    for step in range(1, fails_at):
+        save_checkpoint(FakePage(), run_dir, "test_help", 1, step)
+
+
+def test_resume_falls_back_to_a_full_rerun_when_skipped_steps_bind_names(tmp_path, monkeypatch):
+    run_dir = str(tmp_path / "test_run_20250101_120000")
+    _failed_run(run_dir, monkeypatch, fails_at=4)
+
+    plan = plan_rerun(run_dir, resume=True)
+
+    assert skipped_bindings(POPUP_SCRIPT, "test_help", 3) == {"page1"}
+    assert plan["resume"] == {}
+    assert plan["tests"]["test_help"]["full_rerun"] == "skipped steps bind page1"
+    # Resuming after step 3 would have failed step 4 on the unbound popup page
+    [log] = _execute({"test_help": {"after_step": 3}})
+    assert log.startswith("Step4_click_next_button_FAIL") and "page1" in log
+    assert all(log.endswith("_PASS") for log in _execute(plan["resume"]))
+
+
+def test_resume_uses_the_checkpoint_when_later_steps_need_nothing_skipped(tmp_path, monkeypatch):
+    run_dir = str(tmp_path / "test_run_20250101_120000")
+    _failed_run(run_dir, monkeypatch, fails_at=2)
+
+    plan = plan_rerun(run_dir, resume=True)
+
+    assert skipped_bindings(POPUP_SCRIPT, "test_help", 1) == set()
+    assert plan["resume"]["test_help"]["after_step"] == 1
+    assert "full_rerun" not in plan["tests"]["test_help"]
+    logs = _execute(plan["resume"])
+    assert logs[0].startswith("Step2_") and all(log.endswith("_PASS") for log in logs)
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from step_timing import calibrate_timeouts, load_slow_steps
+
+SLOW_STEPS = {
+    "default_timeout_ms": 10000,
+    "steps": [
+        {"step": "click_place_order", "status": "PASS", "duration_ms": 7400, "timeout_ms": 10000},
+        {"step": "goto_checkout", "status": "FAIL", "duration_ms": 10020, "timeout_ms": 10000},
+        {"status": "PASS", "duration_ms": 9000},
+    ],
+}
+
+
+def test_load_slow_steps_reads_json_bytes():
+    records = load_slow_steps(json.dumps(SLOW_STEPS).encode("utf-8"))
+
+    assert [r["step"] for r in records] == ["click_place_order", "goto_checkout"]
+    assert calibrate_timeouts(records) == {"click_place_order": 15000, "goto_checkout": 20000}
+
+
+@pytest.mark.parametrize("content", [
+    '{"steps": 5}',
+    '{"steps": {"step": "goto_checkout"}}',
+    '"steps"',
+    "5",
+    '{"steps": [{"step": "goto_checkout", "duration_ms": [1, 2]}]}',
+    '{"steps": [{"step": "goto_checkout", "timeout_ms": "slow"}]}',
+])
+def test_malformed_slow_steps_raise_value_error(content):
+    with pytest.raises(ValueError):
+        load_slow_steps(content)
+
+
+def test_invalid_json_raises_value_error():
+    with pytest.raises(ValueError):
+        load_slow_steps(b"{not json")
+
+
+def test_empty_file_has_no_steps():
+    assert load_slow_steps(b"  ") == []
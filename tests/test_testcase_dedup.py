@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import parse_testcases
+from testcase_dedup import DedupIndex, mark_duplicates
+from testcase_planner import merge_testcase_responses
+
+BLOCK = """\
+* High Level Feature: Authentication
+* Test Case ID: {id}
+* Feature Name: Login Functionality
+* Test Scenario: {scenario}
+* Test Case: {case}
+* Test Case Description: {case}.
+* Step-by-step actions: {steps}
+* Possible Values: None
+* Sources: None
+* Expected Result: {expected}
+* Data Correctness Checked: Yes
+* Release/Platform Version: Web
+* Automation Possibility: Yes
+* Testing Type: Functional
+* Priority: High
+"""
+LOGIN = {
+    "scenario": "User logs in with valid credentials",
+    "steps": "Navigate to https://demo.example.com/login, click the Username field, enter standard_user, "
+             "enter secret_sauce in Password and click Login.",
+    "expected": "Products page is shown with Sauce Labs Backpack and Add to cart buttons.",
+}
+# Same scenario, steps and result in slightly different words
+LOGIN_REWORDED = dict(
+    LOGIN,
+    steps="Navigate to https://demo.example.com/login, click on the Username field, enter standard_user, "
+          "enter secret_sauce in Password and click Login.",
+)
+LOGOUT = {
+    "scenario": "Logged-in user logs out from the side menu",
+    "steps": "Log in as standard_user, click Open Menu and click the Logout link.",
+    "expected": "The login form with Username and Password fields is shown again.",
+}
+# A block without the dedup fields (the lines are left out)
+EMPTY = {"scenario": "", "steps": "", "expected": ""}
+
+
+def _response(*cases):
+    blocks = [BLOCK.format(id=f"TC-{i}", case=f"Case {i}", **case) for i, case in enumerate(cases, start=1)]
+    return "\n".join(line for line in "\n".join(blocks).splitlines() if not line.endswith(": "))
+
+
+def _rows(*cases):
+    return parse_testcases(_response(*cases))
+
+
+def _row(i):
+    return {
+        "Test Scenario": f"Scenario {i} checks feature number {i * 7919}",
+        "Step-by-step actions": f"Open page {i}, click button {i * 31} and submit form {i * 131}.",
+        "Expected Result": f"Confirmation {i} is shown",
+    }
+
+
+def test_near_duplicate_rows_are_flagged():
+    flags = mark_duplicates(_rows(LOGIN, LOGIN_REWORDED, LOGOUT))
+
+    assert flags == ["", "TC-1", ""]
+
+
+def test_rows_with_empty_dedup_fields_are_not_duplicates():
+    history = DedupIndex()
+
+    flags = mark_duplicates(_rows(EMPTY, EMPTY, LOGIN), history=history, history_prefix="run1:")
+
+    assert flags == ["", "", ""]
+    assert history.keys == ["run1:TC-3"]
+    assert history.query(_rows(EMPTY)[0]) == []
+
+
+def test_mark_duplicates_adds_only_kept_rows_to_history():
+    history = DedupIndex()
+
+    flags = mark_duplicates(_rows(LOGIN, LOGIN_REWORDED, LOGOUT), history=history, history_prefix="run1:")
+    again = mark_duplicates(_rows(LOGOUT), history=history, history_prefix="run2:")
+
+    assert flags == ["", "TC-1", ""]
+    assert history.keys == ["run1:TC-1", "run1:TC-3"]
+    assert again == ["history: run1:TC-3"]
+
+
+def test_concurrent_adds_keep_index_consistent():
+    index = DedupIndex()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: index.add(i, _row(i)), range(200)))
+
+    assert sorted(index.keys) == list(range(200))
+    assert len(index._signatures) == 200
+    for band in index._buckets:
+        for indices in band.values():
+            assert all(0 <= i < 200 for i in indices)
+
+
+def test_sync_merges_rows_added_by_other_processes(tmp_path):
+    path = str(tmp_path / "index.db")
+    login, logout = _rows(LOGIN, LOGOUT)
+    app, api = DedupIndex.load(path), DedupIndex.load(path)
+
+    app.add("app:TC-1", login)
+    app.sync(path)
+    api.add("api:TC-1", logout)
+    assert api.sync(path) == 1
+    app.sync(path)
+
+    assert sorted(app.keys) == sorted(api.keys) == ["api:TC-1", "app:TC-1"]
+    assert app.query(logout)[0][0] == "api:TC-1"
+    assert sorted(DedupIndex.load(path).keys) == ["api:TC-1", "app:TC-1"]
+    # Nothing new: a sync writes and reads no rows
+    assert app.sync(path) == 0 and len(DedupIndex.load(path).keys) == 2
+
+
+def test_merge_testcase_responses_skips_duplicates_without_indexing_them():
+    merged = merge_testcase_responses([_response(LOGIN), _response(LOGIN_REWORDED), _response(LOGOUT)])
+
+    rows = parse_testcases(merged)
+    assert [row["Test Scenario"] for row in rows] == [LOGIN["scenario"], LOGOUT["scenario"]]
+    assert [row["Test Case ID"] for row in rows] == ["TC-1", "TC-2"]
@@ -0,0 +1,52 @@
+from pipeline import parse_testcases
+from testcase_planner import merge_testcase_responses
+
+BLOCK = """\
+* High Level Feature: {feature}
+* Test Case ID: {id}
+* Feature Name: {feature}
+* Test Scenario: {scenario}
+* Test Case: {scenario}
+* Test Case Description: {scenario}.
+* Step-by-step actions: {steps}
+* Possible Values: None
+* Sources: None
+* Expected Result: {expected}
+* Data Correctness Checked: Yes
+* Release/Platform Version: Web
+* Automation Possibility: Yes
+* Testing Type: Functional
+* Priority: High
+"""
+LOGIN_FLOW = [
+    ("Authentication", "User logs in with valid credentials",
+     "Navigate to https://demo.example.com/login, enter standard_user and secret_sauce and click Login.",
+     "Products page is shown with Add to cart buttons."),
+    ("Authentication", "Login is rejected for a locked out user",
+     "Enter locked_out_user with the valid password and click Login.",
+     "Error banner reads: Sorry, this user has been locked out."),
+]
+CHECKOUT_FLOW = [
+    ("Cart", "Shopper adds the backpack to the cart",
+     "Click Add to cart under Sauce Labs Backpack and open the cart icon.",
+     "Cart badge shows 1 and the cart lists Sauce Labs Backpack."),
+    ("Checkout", "Shopper completes checkout with shipping details",
+     "From the cart click Checkout, fill First Name, Last Name and Postal Code, click Continue then Finish.",
+     "Thank you for your order confirmation page is displayed."),
+]
+
+
+def _response(cases):
+    """One flow's LLM response, numbered TC-1.. like every per-flow response is."""
+    return "\n".join(
+        BLOCK.format(id=f"TC-{i}", feature=feature, scenario=scenario, steps=steps, expected=expected)
+        for i, (feature, scenario, steps, expected) in enumerate(cases, start=1)
+    )
+
+
+def test_merged_flows_are_renumbered_in_order():
+    merged = merge_testcase_responses([_response(LOGIN_FLOW), _response(CHECKOUT_FLOW)])
+
+    rows = parse_testcases(merged)
+    assert [row["Test Case ID"] for row in rows] == ["TC-1", "TC-2", "TC-3", "TC-4"]
+    assert [row["Test Scenario"] for row in rows] == [scenario for _, scenario, _, _ in LOGIN_FLOW + CHECKOUT_FLOW]
@@ -0,0 +1,160 @@
+"""
+Span tracing for the generation pipeline, exported as Chrome trace events.
+
+    with tracing.trace("submit") as t:
+        ...                         # code calling tracing.span(...)
+    t.export("traces")              # -> traces/trace_<time>_submit.json
+
+Open the file in chrome://tracing or https://ui.perfetto.dev for a timeline
+of every stage (prompt build, Groq calls, cleaning, parsing, export). The
+active trace lives in a context variable, so spans opened in asyncio tasks
+and asyncio.to_thread() workers started inside the block land in the same
+trace; each task/thread gets its own lane. Outside trace() a span costs a
+context variable lookup and records nothing.
+
+profiled() adds a cProfile capture of the calling thread, dumped next to
+the trace as a .prof file (snakeviz, `python -m pstats`).
+"""
+import asyncio
+import contextvars
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_TRACE_DIR = "traces"
+
+_active = contextvars.ContextVar("active_trace", default=None)
+
+
+class Trace:
+    """Complete ("X") events of one traced operation; spans may be recorded from several threads."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.events = []
+        self.profile = None
+        self._origin = time.perf_counter()
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def _lane(self) -> int:
+        """Small per task/thread id: concurrent tasks on one thread must not share a lane."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        thread = threading.current_thread()
+        key = ("task", id(task)) if task is not None else ("thread", thread.ident)
+        with self._lock:
+            if key not in self._lanes:
+                self._lanes[key] = (len(self._lanes) + 1, task.get_name() if task is not None else thread.name)
+            return self._lanes[key][0]
+
+    def add(self, name: str, started: float, ended: float, lane: int, args: dict):
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round((started - self._origin) * 1e6, 1),
+            "dur": round((ended - started) * 1e6, 1),
+            "pid": 1,
+            "tid": lane,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> list:
+        """Per span name: calls, total and max duration (ms), slowest total first."""
+        totals = {}
+        for event in self.events:
+            row = totals.setdefault(event["name"], {"span": event["name"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["calls"] += 1
+            row["total_ms"] += event["dur"] / 1000
+            row["max_ms"] = max(row["max_ms"], event["dur"] / 1000)
+        return sorted(totals.values(), key=lambda r: r["total_ms"], reverse=True)
+
+    def to_json(self) -> str:
+        lanes = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": label}}
+            for lane, label in self._lanes.values()
+        ]
+        return json.dumps({"traceEvents": lanes + self.events, "displayTimeUnit": "ms"})
+
+    def profile_stats(self, limit: int = 25) -> str:
+        """Top functions by cumulative time, as pstats prints them ("" without a capture)."""
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def profile_bytes(self) -> bytes:
+        """The capture in .prof format (what cProfile.Profile.dump_stats writes)."""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+    def export(self, directory: str = DEFAULT_TRACE_DIR) -> str:
+        """Write trace_<time>_<name>.json (and .prof with a profile) to `directory`; returns the JSON path."""
+        os.makedirs(directory, exist_ok=True)
+        label = re.sub(r"[^\w.-]+", "_", self.name)
+        stem = f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{label}"
+        path = os.path.join(directory, f"{stem}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(directory, f"{stem}.prof"))
+        return path
+
+
+@contextmanager
+def trace(name: str):
+    """Record spans opened while the block runs (and in tasks/threads started from it)."""
+    current = Trace(name)
+    token = _active.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.add(name, started, time.perf_counter(), current._lane(), {})
+        _active.reset(token)
+
+
+@contextmanager
+def span(name: str, **args):
+    """Time the block as `name` in the active trace, if any; `args` show up in the event details."""
+    current = _active.get()
+    if current is None:
+        yield args
+        return
+    lane = current._lane()
+    started = time.perf_counter()
+    try:
+        yield args
+    finally:
+        current.add(name, started, time.perf_counter(), lane, args)
+
+
+@contextmanager
+def profiled(enabled: bool = True):
+    """cProfile the calling thread into the active trace (work in to_thread() workers is not captured)."""
+    current = _active.get()
+    if not enabled or current is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        current.profile = profile